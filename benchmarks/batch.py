@@ -0,0 +1,47 @@
+"""Benchmark the full sow, grow and reap cycle of a Crop.
+"""
+import tempfile
+
+import numpy as np
+
+from xyzpy import Crop
+
+
+def _noop(a, b):
+    return a + b
+
+
+def _array_output(a, b):
+    return np.full(32, a + b)
+
+
+class CropCycle:
+    params = ([16, 256, 1024], ['scalars', 'arrays'])
+    param_names = ['num_cases', 'results']
+    timeout = 240
+
+    def setup(self, num_cases, results):
+        side = int(round(num_cases**0.5))
+        self.combos = {'a': list(range(side)), 'b': list(range(side))}
+        self.fn = _noop if results == 'scalars' else _array_output
+        self.var_dims = {'x': () if results == 'scalars' else ('t',)}
+        self.var_coords = {} if results == 'scalars' else {'t': range(32)}
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def teardown(self, num_cases, results):
+        self.tmpdir.cleanup()
+
+    def _crop(self):
+        return Crop(fn=self.fn, parent_dir=self.tmpdir.name, batchsize=16)
+
+    def time_sow(self, num_cases, results):
+        crop = self._crop()
+        crop.sow_combos(self.combos, verbosity=0)
+        crop.delete_all()
+
+    def time_cycle(self, num_cases, results):
+        crop = self._crop()
+        crop.sow_combos(self.combos, verbosity=0)
+        crop.grow_missing(verbosity=0)
+        crop.reap_combos_to_ds(var_names='x', var_dims=self.var_dims,
+                               var_coords=self.var_coords)
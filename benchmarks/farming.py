@@ -0,0 +1,41 @@
+"""Benchmark merging new results into a Harvester's full dataset.
+"""
+import os
+import tempfile
+
+import numpy as np
+import xarray as xr
+
+from xyzpy import Runner, Harvester
+
+
+def _noop(a, b):
+    return a + b
+
+
+def _block_ds(a_vals, b_vals):
+    rng = np.random.RandomState(42)
+    return xr.Dataset({'x': (('a', 'b'), rng.randn(len(a_vals), len(b_vals)))},
+                      coords={'a': a_vals, 'b': b_vals})
+
+
+class HarvesterAddDs:
+    params = ([16, 128, 512], [False, True])
+    param_names = ['size', 'sync']
+    timeout = 120
+
+    def setup(self, size, sync):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        data_name = (os.path.join(self.tmpdir.name, 'full_ds.h5') if sync
+                     else None)
+        self.harvester = Harvester(Runner(_noop, 'x'), data_name=data_name)
+
+        # a full dataset already in place, then a new block to merge in
+        self.harvester.add_ds(_block_ds(range(size), range(size)))
+        self.new_ds = _block_ds(range(size, 2 * size), range(size))
+
+    def teardown(self, size, sync):
+        self.tmpdir.cleanup()
+
+    def time_add_ds(self, size, sync):
+        self.harvester.add_ds(self.new_ds, overwrite=True)
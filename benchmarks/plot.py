@@ -0,0 +1,35 @@
+"""Benchmark the data preparation done by the plotters, before any drawing.
+"""
+import numpy as np
+import xarray as xr
+
+from xyzpy.plot.plotter_matplotlib import LinePlot, HeatMap
+
+
+def _lines_ds(num_lines, num_points):
+    rng = np.random.RandomState(42)
+    return xr.Dataset(
+        {'y': (('z', 'x'), rng.randn(num_lines, num_points).cumsum(axis=1))},
+        coords={'z': range(num_lines), 'x': np.linspace(0, 1, num_points)})
+
+
+class LinePlotPrepare:
+    params = ([1, 16, 128], [64, 1024, 16384])
+    param_names = ['num_lines', 'num_points']
+
+    def setup(self, num_lines, num_points):
+        self.ds = _lines_ds(num_lines, num_points)
+
+    def time_prepare_data(self, num_lines, num_points):
+        LinePlot(self.ds, 'x', 'y', 'z').prepare_data_single()
+
+
+class HeatMapPrepare:
+    params = [32, 256, 1024]
+    param_names = ['size']
+
+    def setup(self, size):
+        self.ds = _lines_ds(size, size)
+
+    def time_prepare_data(self, size):
+        HeatMap(self.ds, 'x', 'z', 'y').prepare_data_single()
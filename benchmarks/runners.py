@@ -0,0 +1,92 @@
+"""Benchmark the overhead of running and collecting combos and cases.
+"""
+import itertools
+
+import numpy as np
+import xarray as xr
+
+from xyzpy import combo_runner
+from xyzpy.gen.combo_runner import _combos_to_ds
+from xyzpy.gen.case_runner import _cases_to_ds, find_missing_cases
+
+
+def _noop(a, b):
+    return a + b
+
+
+def _array_output(a, b):
+    return np.full(32, a + b)
+
+
+def _square_combos(num_cases):
+    side = int(round(num_cases**0.5))
+    return (('a', list(range(side))), ('b', list(range(side))))
+
+
+class ComboRunner:
+    params = ([16, 256, 4096], ['sequential', 'parallel'])
+    param_names = ['num_cases', 'mode']
+    timeout = 120
+
+    def setup(self, num_cases, mode):
+        self.combos = _square_combos(num_cases)
+        self.opts = {'verbosity': 0}
+        if mode == 'parallel':
+            self.opts['num_workers'] = 2
+            # start the workers up front, to only time the per-task overhead
+            combo_runner(_noop, self.combos, **self.opts)
+
+    def time_combo_runner(self, num_cases, mode):
+        combo_runner(_noop, self.combos, **self.opts)
+
+
+class CombosToDS:
+    params = ([16, 256, 4096], ['scalars', 'arrays'])
+    param_names = ['num_cases', 'results']
+
+    def setup(self, num_cases, results):
+        self.combos = _square_combos(num_cases)
+        fn = _noop if results == 'scalars' else _array_output
+        self.results = combo_runner(fn, self.combos, verbosity=0)
+        self.var_dims = {'x': () if results == 'scalars' else ('t',)}
+        self.var_coords = {} if results == 'scalars' else {'t': range(32)}
+
+    def time_combos_to_ds(self, num_cases, results):
+        _combos_to_ds(self.results, self.combos, var_names=('x',),
+                      var_dims=self.var_dims, var_coords=self.var_coords)
+
+
+class CasesToDS:
+    params = ([16, 256, 1024], ['scalars', 'arrays'])
+    param_names = ['num_cases', 'results']
+    timeout = 120
+
+    def setup(self, num_cases, results):
+        combos = _square_combos(num_cases)
+        self.cases = list(itertools.product(*(v for _, v in combos)))
+        fn = _noop if results == 'scalars' else _array_output
+        self.results = [fn(*case) for case in self.cases]
+        self.var_dims = {'x': () if results == 'scalars' else ('t',)}
+        self.var_coords = {} if results == 'scalars' else {'t': range(32)}
+
+    def time_cases_to_ds(self, num_cases, results):
+        _cases_to_ds(self.results, fn_args=('a', 'b'), cases=self.cases,
+                     var_names=('x',), var_dims=self.var_dims,
+                     var_coords=self.var_coords)
+
+
+class FindMissingCases:
+    params = ([16, 256, 1024], [0.1, 0.5])
+    param_names = ['num_cases', 'missing_fraction']
+    timeout = 120
+
+    def setup(self, num_cases, missing_fraction):
+        combos = _square_combos(num_cases)
+        shape = tuple(len(v) for _, v in combos)
+        rng = np.random.RandomState(42)
+        data = rng.randn(*shape)
+        data[rng.rand(*shape) < missing_fraction] = np.nan
+        self.ds = xr.Dataset({'x': (('a', 'b'), data)}, coords=dict(combos))
+
+    def time_find_missing_cases(self, num_cases, missing_fraction):
+        find_missing_cases(self.ds)
@@ -0,0 +1,51 @@
+"""Benchmark the formats available for writing crop batches and results.
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from xyzpy.gen.batch import _parse_serializer, _dump_obj, _load_obj
+
+
+def _array_results(num_cases, size):
+    rng = np.random.RandomState(42)
+    return tuple((rng.randn(size), rng.randn(size, size))
+                 for _ in range(num_cases))
+
+
+def _scalar_results(num_cases):
+    return tuple((float(i), i % 2 == 0) for i in range(num_cases))
+
+
+class Serializers:
+    params = ([None, 'zlib', 'lz4', 'pickle5'], ['scalars', 'arrays'])
+    param_names = ['serializer', 'results']
+
+    def setup(self, serializer, results):
+        try:
+            self.serializer = _parse_serializer(serializer)
+            if serializer == 'lz4':
+                import lz4  # noqa
+        except (ValueError, ImportError):
+            raise NotImplementedError
+
+        self.results = (_scalar_results(1000) if results == 'scalars' else
+                        _array_results(10, 256))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmpdir.name, 'xyz-result-1.jbdmp')
+        _dump_obj(self.results, self.fname, self.serializer)
+
+    def teardown(self, serializer, results):
+        self.tmpdir.cleanup()
+
+    def time_dump(self, serializer, results):
+        _dump_obj(self.results, self.fname, self.serializer)
+
+    def time_load(self, serializer, results):
+        _load_obj(self.fname)
+
+    def track_file_size(self, serializer, results):
+        return os.path.getsize(self.fname)
+
+    track_file_size.unit = 'bytes'
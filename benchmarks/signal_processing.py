@@ -0,0 +1,39 @@
+"""Benchmark the broadcasting signal processing gufuncs.
+"""
+import numpy as np
+import xarray as xr
+
+import xyzpy as xyz
+
+
+_SIGNAL_FNS = {
+    'diff_fornberg': lambda da: xyz.xr_diff_fornberg(da, 't'),
+    'diff_u': lambda da: xyz.xr_diff_u(da, 't'),
+    'interp': lambda da: xyz.xr_interp(da, 't'),
+    'interp_pchip': lambda da: xyz.xr_interp_pchip(da, 't'),
+    'filter_wiener': lambda da: xyz.xr_filter_wiener(da, 't'),
+    'filtfilt_butter': lambda da: xyz.xr_filtfilt_butter(da, 't'),
+    'unispline': lambda da: xyz.xr_unispline(da, 't'),
+    'polyfit': lambda da: xyz.xr_polyfit(da, 't', deg=8),
+}
+
+
+class SignalGufuncs:
+    params = (list(_SIGNAL_FNS), [(8, 64), (64, 256), (256, 1024)])
+    param_names = ['fn', 'shape']
+    timeout = 120
+
+    def setup(self, fn, shape):
+        num_signals, num_points = shape
+        rng = np.random.RandomState(42)
+        t = np.linspace(0, 1, num_points)
+        data = (np.sin(10 * t)[None, :] +
+                0.01 * rng.randn(num_signals, num_points))
+        self.da = xr.DataArray(data, dims=('signal', 't'),
+                               coords={'signal': range(num_signals), 't': t})
+        self.fn = _SIGNAL_FNS[fn]
+        # trigger any lazy compilation outside of the timing
+        self.fn(self.da.isel(signal=[0]))
+
+    def time_signal_fn(self, fn, shape):
+        self.fn(self.da)
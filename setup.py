@@ -21,7 +21,7 @@ setup(
     author='Johnnie Gray',
     author_email="john.gray.14@ucl.ac.uk",
     license='MIT',
-    packages=find_packages(exclude=['docs', 'test*']),
+    packages=find_packages(exclude=['docs', 'test*', 'benchmarks']),
     install_requires=[
         'numpy>=1.10.0',
         'scipy>=1.0',
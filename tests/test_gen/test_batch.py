@@ -1,23 +1,126 @@
 from tempfile import TemporaryDirectory
+import pickle
+import queue
+import sys
+import threading
+import time
+import types
+import warnings
 
 import pytest
 import os
 
-from xyzpy import combo_runner
+import numpy as np
+import joblib
+
+from xyzpy import combo_runner, Runner, Harvester
 from xyzpy.gen.batch import (
     XYZError,
     Crop,
     parse_crop_details,
     grow,
+    mpi_grow,
+    _load_checkpoint,
+    _load_obj,
+    _load_fn,
+    _load_resources,
+    _fit_cost_model,
+    DatasetReaper,
 )
 
-from . import foo3_scalar
+from . import foo3_scalar, foo2_array, foo3_float_bool
 
 
 def foo_add(a, b, c):
     return a + b
 
 
+def foo_alloc(mb):
+    x = np.ones(mb * 2**20 // 8)
+    time.sleep(0.05)
+    return float(x.sum())
+
+
+def foo_add_raise_at(a, b, c, when=(3, 30)):
+    if (a, b) == when:
+        raise ValueError("bad case")
+    return a + b
+
+
+class FakeStatus:
+
+    def __init__(self):
+        self.source = self.tag = None
+
+    def Get_source(self):
+        return self.source
+
+    def Get_tag(self):
+        return self.tag
+
+
+class FakeComm:
+    """Stand-in for an MPI communicator whose ranks are threads of this
+    process, each receiving its messages through a queue.
+    """
+
+    def __init__(self, rank, inboxes):
+        self.rank = rank
+        self.inboxes = inboxes
+
+    def Get_rank(self):
+        return self.rank
+
+    def Get_size(self):
+        return len(self.inboxes)
+
+    def send(self, obj, dest, tag):
+        self.inboxes[dest].put((self.rank, tag, obj))
+
+    def recv(self, source=None, tag=None, status=None):
+        src, tag, obj = self.inboxes[self.rank].get(timeout=60)
+        if status is not None:
+            status.source, status.tag = src, tag
+        return obj
+
+    def bcast(self, obj, root=0):
+        if self.rank != root:
+            return self.recv()
+        for dest in range(self.Get_size()):
+            if dest != root:
+                self.send(obj, dest, tag=0)
+        return obj
+
+
+@pytest.fixture
+def fake_mpi(monkeypatch):
+    """Mock ``mpi4py.MPI.COMM_WORLD`` as rank 0 of three, returning a function
+    that calls ``mpi_grow`` on every rank, the workers in threads.
+    """
+    inboxes = [queue.Queue() for _ in range(3)]
+    MPI = types.SimpleNamespace(COMM_WORLD=FakeComm(0, inboxes),
+                                Status=FakeStatus, ANY_SOURCE=-1, ANY_TAG=-1)
+    mpi4py = types.ModuleType('mpi4py')
+    mpi4py.MPI = MPI
+    monkeypatch.setitem(sys.modules, 'mpi4py', mpi4py)
+    monkeypatch.setitem(sys.modules, 'mpi4py.MPI', MPI)
+
+    def run(crop, **kwargs):
+        workers = [threading.Thread(target=mpi_grow, args=(crop,),
+                                    kwargs={**kwargs,
+                                            'comm': FakeComm(r, inboxes)})
+                   for r in range(1, len(inboxes))]
+        for w in workers:
+            w.start()
+        try:
+            mpi_grow(crop, **kwargs)
+        finally:
+            for w in workers:
+                w.join(timeout=60)
+
+    return run
+
+
 class TestSowerReaper:
     @pytest.mark.parametrize(
         "fn, crop_name, crop_loc, expected",
@@ -202,3 +305,681 @@ class TestSowerReaper:
             ds = crop.reap_combos_to_ds(var_names=['sum'])
 
         assert ds['sum'].sel(a=3, b=30, c=1100).data == 33
+
+    def test_reap_incremental(self):
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20, 30]),
+                  ('c', [100, 200, 300, 400]))
+
+        r = Runner(foo3_scalar, var_names='sum')
+
+        with TemporaryDirectory() as tdir:
+            crop = r.Crop(parent_dir=tdir, batchsize=5)
+            crop.sow_combos(combos)
+
+            for i in (2, 4):
+                crop.grow(i)
+
+            ds = crop.reap_available()
+            assert int(ds['sum'].notnull().sum()) == 10
+            assert ds['sum'].sel(a=1, b=20, c=200).data == 221
+            assert np.isnan(ds['sum'].sel(a=1, b=10, c=100).data)
+
+            crop.grow_missing()
+            ds = crop.reap_incremental(timeout=5)
+            assert not os.path.exists(crop.location)
+
+        assert int(ds['sum'].notnull().sum()) == 24
+        assert ds['sum'].sel(a=2, b=30, c=400).data == 432
+
+    def test_reap_incremental_dtypes(self):
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20, 30]),
+                  ('c', [100, 200, 300, 400]))
+        r = Runner(foo3_float_bool, var_names=['sum', 'even'])
+
+        with TemporaryDirectory() as tdir:
+            crop = r.Crop(parent_dir=tdir, batchsize=5)
+            crop.sow_combos(combos)
+            crop.grow((1, 3))
+
+            ds = crop.reap_available()
+            # upcast to hold the missing data
+            assert ds['sum'].dtype == float
+            assert ds['even'].dtype == float
+            assert ds['even'].sel(a=1, b=10, c=100).item() == 0.0
+            assert np.isnan(ds['even'].sel(a=1, b=20, c=400).item())
+
+            crop.grow_missing()
+            ds = crop.reap_incremental(timeout=5)
+
+        assert ds['sum'].dtype == int
+        assert ds['even'].dtype == bool
+        assert ds['even'].sel(a=2, b=30, c=400).item()
+        assert not ds['even'].sel(a=1).any()
+
+    def test_reap_incremental_corrupt_result(self, monkeypatch):
+        monkeypatch.setattr('xyzpy.gen.batch._MAX_RESULT_LOAD_FAILURES', 3)
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20]),
+                  ('c', [100, 200]))
+        r = Runner(foo3_scalar, var_names='sum')
+
+        with TemporaryDirectory() as tdir:
+            crop = r.Crop(parent_dir=tdir, num_batches=2)
+            crop.sow_combos(combos)
+            crop.grow(1)
+            with open(os.path.join(crop.location, 'results',
+                                   'xyz-result-2.jbdmp'), 'wb') as f:
+                f.write(b'garbage')
+
+            with pytest.raises(XYZError, match='batch 2'):
+                crop.reap_incremental(timeout=30, poll_interval=0.01)
+
+    def test_reap_incremental_harvester(self):
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20, 30]),
+                  ('c', [100, 200, 300, 400]))
+
+        h = Harvester(Runner(foo3_scalar, var_names='sum'))
+
+        with TemporaryDirectory() as tdir:
+            crop = h.Crop(parent_dir=tdir, num_batches=7)
+            crop.sow_combos(combos)
+            crop.grow((1, 7))
+            crop.reap_available()
+            assert int(crop.harvester.full_ds['sum'].notnull().sum()) == 7
+            crop.grow_missing()
+            crop.reap_incremental(timeout=5)
+
+        ds = crop.harvester.full_ds
+        assert int(ds['sum'].notnull().sum()) == 24
+        assert ds['sum'].sel(a=2, b=30, c=400).data == 432
+
+    @pytest.mark.parametrize("costs", ['profile', 'callable', 'array'])
+    def test_sow_by_cost(self, costs):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]),
+                  ('c', [100, 200, 300, 400]))
+
+        if costs == 'callable':
+            def costs(a, b, c):
+                return a**3
+
+        elif costs == 'array':
+            costs = np.broadcast_to(np.array([1, 8, 27]).reshape(3, 1, 1),
+                                    (3, 3, 4))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=6)
+            crop.sow_combos(combos, costs=costs)
+            assert crop.num_sown_batches == 6
+            assert sum(crop._batch_sizes) == 36
+
+            if not isinstance(costs, str):
+                # cheap cases should be packed into larger batches
+                assert crop._batch_sizes[0] > crop._batch_sizes[-1]
+                assert crop.estimate_walltime(safety_factor=1) == \
+                    pytest.approx(max(crop._batch_costs))
+                assert "#$ -l h_rt=0:" in crop.gen_qsub_script()
+
+            crop.grow_missing()
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert ds['sum'].sel(a=3, b=30, c=400).data == 33
+
+    def test_sow_by_target_time(self):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, target_time=2.0)
+            crop.sow_combos(combos, constants={'c': None}, costs=np.ones(9))
+            assert crop.num_batches == 5
+            assert crop.missing_results() == (1, 2, 3, 4, 5)
+
+            # the number of batches should be chosen afresh each sowing
+            crop.delete_all()
+            crop.sow_combos(combos, constants={'c': None},
+                            costs=np.full(9, 0.5))
+            assert crop.num_batches == 3
+            assert crop.missing_results() == (1, 2, 3)
+
+    def test_fit_cost_model_no_samples(self):
+        with pytest.raises(ValueError):
+            _fit_cost_model((('a', [1, 2, 3]),), [], [])
+
+    def test_metrics(self):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, batchsize=4)
+            crop.sow_combos(combos, constants={'c': None})
+            assert crop.metrics is None
+            crop.grow((1, 3))
+            df = crop.metrics
+            assert len(df) == 5
+            assert set(df['batch']) == {1, 3}
+            assert (df['wall_time'] >= 0).all()
+            assert df.loc[df['batch'] == 3, 'a'].item() == 3
+            crop.grow(2)
+
+            # learn batch costs from the metrics
+            crop2 = Crop(fn=foo_add, name='again', parent_dir=tdir,
+                         num_batches=2)
+            crop2.sow_combos(combos, constants={'c': None},
+                             costs=crop.metrics)
+            assert crop2.num_sown_batches == 2
+
+            crop.reap_combos_to_ds(var_names=['sum'])
+
+        # metrics are retained after reaping
+        assert len(crop.metrics) == 9
+        assert {'cpu_time', 'peak_rss', 'hostname'}.issubset(crop.metrics)
+
+    def test_metrics_peak_rss_per_case(self):
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_alloc, parent_dir=tdir, num_batches=1)
+            crop.sow_combos((('mb', [100, 1]),))
+            crop.grow(1)
+            df = crop.metrics.set_index('mb')
+
+        # the first case's memory is not attributed to the second
+        assert df.loc[100, 'peak_rss'] > 50e6
+        assert df.loc[1, 'peak_rss'] < 50e6
+
+    @pytest.mark.parametrize("serializer", [None, 'zlib', ('gzip', 1),
+                                            'pickle5'])
+    def test_serializers(self, serializer):
+        if serializer == 'pickle5' and pickle.HIGHEST_PROTOCOL < 5:
+            pytest.skip("Needs pickle protocol 5.")
+
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20, 30]),
+                  ('c', [100, 200, 300, 400]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo2_array, parent_dir=tdir, batchsize=5,
+                        serializer=serializer)
+            crop.sow_combos(combos[:2])
+            crop.grow_missing()
+            assert not crop.check_bad()
+            ds = crop.reap_combos_to_ds(var_names='x', var_dims='t',
+                                        var_coords={'t': range(10)})
+
+        assert ds['x'].sel(a=2, b=30, t=9).data == pytest.approx(32.9)
+
+    def test_bad_serializer(self):
+        with pytest.raises(ValueError):
+            Crop(fn=foo_add, serializer='snappy')
+
+    @pytest.mark.parametrize("use_memmap", [False, True])
+    def test_reap_to_ds_dtypes(self, use_memmap):
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20, 30]),
+                  ('c', [100, 200, 300, 400]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo3_float_bool, parent_dir=tdir, num_batches=5)
+            crop.sow_combos(combos)
+            crop.grow_missing()
+            memmap_dir = os.path.join(tdir, 'mm') if use_memmap else None
+            ds = crop.reap_combos_to_ds(var_names=['sum', 'even'],
+                                        memmap_dir=memmap_dir)
+            if use_memmap:
+                assert len(os.listdir(memmap_dir)) == 2
+
+            assert ds['sum'].dtype == int
+            assert ds['even'].dtype == bool
+            assert ds['sum'].sel(a=2, b=30, c=400).data == 432
+            assert ds['even'].sel(a=2, b=30, c=400).data
+            assert not ds['even'].sel(a=1).any()
+
+    def test_reap_to_ds_memmap_shared_dir(self):
+        with TemporaryDirectory() as tdir:
+            memmap_dir = os.path.join(tdir, 'mm')
+            dss = []
+            for i, bs in enumerate(([11, 21, 31], [10, 20, 30])):
+                crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=2,
+                            name='crop{}'.format(i))
+                crop.sow_combos((('a', [1, 2]), ('b', bs)),
+                                constants={'c': None})
+                crop.grow_missing()
+                dss.append(crop.reap_combos_to_ds(var_names=['sum'],
+                                                  memmap_dir=memmap_dir))
+
+            assert len(os.listdir(memmap_dir)) == 2
+            # reaping the second crop must not overwrite the first
+            assert dss[0]['sum'].values.tolist() == [[12, 22, 32],
+                                                     [13, 23, 33]]
+            assert dss[1]['sum'].values.tolist() == [[11, 21, 31],
+                                                     [12, 22, 32]]
+
+    @pytest.mark.parametrize("use_memmap", [False, True])
+    def test_reaper_missing_dtypes(self, use_memmap):
+        combos = (('a', [1, 2]), ('b', [10, 20]))
+        with TemporaryDirectory() as tdir:
+            reaper = DatasetReaper(
+                combos, ((0, 2), (2, 4)), var_names=('x', 'even', 'z'),
+                var_dims={'x': (), 'even': (), 'z': ()}, var_coords={},
+                constants={}, attrs={},
+                memmap_dir=os.path.join(tdir, 'mm') if use_memmap else None)
+
+            reaper.add_batch(2, [(np.float32(1.5), True, np.complex64(1j)),
+                                 (np.float32(2.5), False, np.complex64(2))])
+            ds = reaper.ds
+            assert ds['x'].dtype == np.float32
+            assert ds['even'].dtype == float
+            assert ds['z'].dtype == np.complex64
+            assert ds['x'].isnull().sel(a=1).all()
+            assert ds['even'].isnull().sel(a=1).all()
+            assert ds['z'].isnull().sel(a=1).all()
+
+            reaper.add_batch(1, [(np.float32(0.5), True, np.complex64(0)),
+                                 (np.float32(0.5), False, np.complex64(0))])
+            ds = reaper.finalize()
+            assert ds['x'].dtype == np.float32
+            assert ds['even'].dtype == bool
+            assert ds['even'].values.tolist() == [[True, False],
+                                                  [True, False]]
+            if use_memmap:
+                assert len(os.listdir(os.path.join(tdir, 'mm'))) == 3
+
+    @pytest.mark.parametrize("scheduler, task_id, header", [
+        ('sge', '$SGE_TASK_ID', '#$ -t 1-3'),
+        ('slurm', '$SLURM_ARRAY_TASK_ID', '#SBATCH --array=1-3'),
+        ('pbs', '$PBS_ARRAY_INDEX', '#PBS -J 1-3'),
+        ('torque', '$PBS_ARRAYID', '#PBS -t 1-3'),
+        ('local', '$XYZ_TASK_ID', '$(seq 1 3)'),
+    ])
+    def test_gen_cluster_script(self, scheduler, task_id, header):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=5)
+            crop.sow_combos(combos, constants={'c': None})
+            script = crop.gen_cluster_script(scheduler, batches_per_task=2,
+                                             hours=2, minutes=30)
+            crop.grow(1)
+            partial = crop.gen_cluster_script(scheduler)
+
+        assert header in script
+        assert task_id in script
+        assert "range(1, 6)" in script
+        assert "batch_ids = (2, 3, 4, 5)" in partial
+        if scheduler in ('slurm', 'pbs', 'torque'):
+            assert "02:30:00" in script
+
+    def test_bad_scheduler(self):
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=5)
+            crop.sow_combos((('a', [1, 2, 3]),), constants={'b': 1, 'c': 2})
+            with pytest.raises(ValueError):
+                crop.gen_cluster_script('condor')
+
+    def test_grow_cluster_local(self):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+        repo_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=5)
+            crop.sow_combos(combos, constants={'c': None})
+            proc = crop.grow_cluster(
+                'local', batches_per_task=2, num_workers=2,
+                launcher=sys.executable,
+                setup="import sys; sys.path.insert(0, {!r})".format(repo_dir))
+            proc.wait(timeout=60)
+            assert crop.is_ready_to_reap()
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert ds['sum'].sel(a=3, b=30).data == 33
+
+    def test_grow_cluster_submit(self, monkeypatch):
+        import subprocess
+
+        submitted = []
+
+        def fake_run(args, check=False):
+            submitted.append(args)
+            if check and len(submitted) > 1:
+                raise subprocess.CalledProcessError(1, args)
+
+        monkeypatch.setattr(subprocess, 'run', fake_run)
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=5)
+            crop.sow_combos((('a', [1, 2, 3]),), constants={'b': 1, 'c': 2})
+            logs = os.path.join(tdir, 'some', 'logs')
+
+            crop.grow_cluster('slurm', output_directory=logs)
+            assert submitted[0][0] == 'sbatch'
+            assert os.path.isdir(logs)
+            assert not os.path.exists(submitted[0][1])
+
+            with pytest.raises(subprocess.CalledProcessError):
+                crop.grow_cluster('slurm', output_directory=logs)
+            assert os.path.exists(submitted[1][1])
+
+    def test_batches_per_task_from_target_walltime(self):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=9)
+            crop.sow_combos(combos, constants={'c': None}, costs=np.ones(9))
+            script = crop.gen_qsub_script(target_walltime=3.5)
+            assert "#$ -t 1-3" in script
+            assert "task_id * 3" in script
+            assert "h_rt=0:0:5" in script
+            assert "fn=fn" in script
+
+            crop = Crop(fn=foo_add, parent_dir=tdir, name='nocosts',
+                        num_batches=9)
+            crop.sow_combos(combos, constants={'c': None})
+            with pytest.raises(XYZError):
+                crop.gen_qsub_script(target_walltime=3.5)
+
+    def test_resources_saved_once_and_cached(self):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        def foo_with_big(a, b, big):
+            return a + b + big[-1]
+
+        r = Runner(foo_with_big, var_names='sum',
+                   resources={'big': np.arange(10000.0)})
+
+        with TemporaryDirectory() as tdir:
+            crop = r.Crop(parent_dir=tdir, num_batches=3)
+            crop.sow_combos(combos)
+
+            cases = _load_obj(os.path.join(crop.location, 'batches',
+                                           'xyz-batch-1.jbdmp'))
+            assert all('big' not in case for case in cases)
+
+            resources = _load_resources(crop.location)
+            assert isinstance(resources['big'], np.memmap)
+            assert _load_resources(crop.location) is resources
+            assert _load_fn(crop.location) is _load_fn(crop.location)
+
+            crop.grow_missing()
+            ds = crop.reap()
+
+        assert ds['sum'].sel(a=3, b=30).data == 10032
+
+    def test_resources_mutable_and_resown(self):
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20]))
+
+        def foo_mutate(a, b, big=None):
+            if big is None:
+                return a + b
+            big[0] += 1
+            return a + b + big[0]
+
+        r = Runner(foo_mutate, var_names='sum',
+                   resources={'big': np.zeros(10)})
+
+        with TemporaryDirectory() as tdir:
+            crop = r.Crop(parent_dir=tdir, num_batches=2)
+            crop.sow_combos(combos)
+            crop.grow_missing()
+            # modified in memory only, not on disk
+            rfile = os.path.join(crop.location, 'xyz-resources.jbdmp')
+            assert joblib.load(rfile)['big'][0] == 0.0
+            crop.reap()
+
+            # re-sowing without resources doesn't leave the old ones around
+            crop = Crop(fn=foo_mutate, name=crop.name, parent_dir=tdir,
+                        num_batches=2)
+            crop.sow_combos(combos)
+            assert _load_resources(crop.location) == {}
+            crop.grow_missing()
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert ds['sum'].sel(a=2, b=20).data == 22
+
+    def test_mpi_grow_single_process(self):
+        pytest.importorskip('mpi4py')
+        from xyzpy import mpi_grow
+
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=4)
+            crop.sow_combos(combos, constants={'c': None})
+            mpi_grow(crop, verbosity=0)
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert ds['sum'].sel(a=3, b=30).data == 33
+
+    @pytest.mark.parametrize("granularity", ['batch', 'case'])
+    def test_mpi_grow(self, granularity):
+        pytest.importorskip('mpi4py')
+        import shutil
+        import subprocess
+
+        mpiexec = shutil.which('mpiexec')
+        if mpiexec is None:
+            pytest.skip("No mpiexec found.")
+
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+        repo_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, name='mpi',
+                        num_batches=4)
+            crop.sow_combos(combos, constants={'c': None})
+
+            script = os.path.join(tdir, 'run_mpi.py')
+            with open(script, 'w') as f:
+                f.write(
+                    "import sys\n"
+                    "sys.path.insert(0, {!r})\n"
+                    "from xyzpy import Crop, mpi_grow\n"
+                    "crop = Crop(name='mpi', parent_dir={!r})\n"
+                    "mpi_grow(crop, granularity={!r}, verbosity=0)\n"
+                    "".format(repo_dir, tdir, granularity))
+
+            subprocess.run([mpiexec, '-n', '4', sys.executable, script],
+                           check=True, timeout=120)
+
+            assert crop.is_ready_to_reap()
+            metrics = crop.metrics
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert len(metrics) == 9
+        assert ds['sum'].sel(a=3, b=30).data == 33
+
+    @pytest.mark.parametrize("granularity", ['batch', 'case'])
+    def test_mpi_grow_mocked(self, fake_mpi, granularity):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=4)
+            crop.sow_combos(combos, constants={'c': None})
+            fake_mpi(crop, granularity=granularity, verbosity=0)
+            assert crop.is_ready_to_reap()
+            metrics = crop.metrics
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert len(metrics) == 9
+        assert ds['sum'].sel(a=3, b=30).data == 33
+
+    @pytest.mark.parametrize("granularity", ['batch', 'case'])
+    def test_mpi_grow_mocked_errors(self, fake_mpi, granularity):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add_raise_at, parent_dir=tdir, num_batches=2)
+            crop.sow_combos(combos, constants={'c': None})
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                fake_mpi(crop, granularity=granularity, verbosity=0,
+                         errors='nan')
+            metrics = crop.metrics
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert metrics['error'].notnull().sum() == 1
+        assert metrics['error'].dropna().iloc[0] == 'ValueError: bad case'
+        assert np.isnan(ds['sum'].sel(a=3, b=30).data)
+        assert ds['sum'].sel(a=3, b=20).data == 23
+
+    def test_mpi_grow_mocked_raise_checkpoint(self, fake_mpi):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add_raise_at, parent_dir=tdir, num_batches=1,
+                        checkpoint=True)
+            crop.sow_combos(combos, constants={'c': None})
+
+            with pytest.raises(ValueError, match='bad case'):
+                fake_mpi(crop, granularity='case', verbosity=0)
+            assert tuple(crop.missing_results()) == (1,)
+
+            # the cases gathered before the error are kept
+            ckpt_file = os.path.join(crop.location, 'checkpoints',
+                                     'xyz-checkpoint-1.pkl')
+            assert len(_load_checkpoint(ckpt_file)) == 8
+
+            fake_mpi(crop, granularity='case', verbosity=0, fn=foo_add)
+            assert not os.path.exists(ckpt_file)
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert ds['sum'].sel(a=3, b=30).data == 33
+        assert ds['sum'].sel(a=1, b=10).data == 11
+
+    def test_progress_index(self):
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=5)
+            crop.sow_combos(combos, constants={'c': None})
+            pfile = os.path.join(crop.location, 'xyz-progress.bin')
+            assert os.path.isfile(pfile)
+            assert crop.missing_results() == (1, 2, 3, 4, 5)
+
+            crop.grow((2, 4))
+            assert crop.num_results == 2
+            assert crop.missing_results() == (1, 3, 5)
+
+            # results removed behind the index's back
+            os.remove(os.path.join(crop.location, 'results',
+                                   'xyz-result-4.jbdmp'))
+            assert crop.missing_results() == (1, 3, 5)
+            crop.calc_progress(rescan=True)
+            assert crop.missing_results() == (1, 3, 4, 5)
+
+            # bad results are cleared from the index
+            with open(os.path.join(crop.location, 'results',
+                                   'xyz-result-2.jbdmp'), 'wb') as f:
+                f.write(b'garbage')
+            assert crop.check_bad() == ('2',)
+            assert crop.missing_results() == (1, 2, 3, 4, 5)
+
+            # falls back to scanning the results if there is no index
+            crop.grow((1, 3))
+            os.remove(pfile)
+            assert crop.missing_results() == (2, 4, 5)
+            crop.grow_missing()
+            assert crop.is_ready_to_reap()
+
+    def test_checkpoint_resume(self):
+        combos = (('a', [1, 2, 3, 4]),
+                  ('b', [10, 20]))
+        calls = []
+        preempt = [True]
+
+        def fn(a, b, c):
+            if a == 3 and preempt[0]:
+                preempt[0] = False
+                raise RuntimeError("Preempted!")
+            calls.append((a, b))
+            return a + b
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=1,
+                        checkpoint=True)
+            crop.sow_combos(combos, constants={'c': None})
+
+            with pytest.raises(RuntimeError):
+                grow(1, crop=crop, fn=fn, verbosity=0)
+            assert len(calls) == 4
+
+            ckpt_file = os.path.join(crop.location, 'checkpoints',
+                                     'xyz-checkpoint-1.pkl')
+            assert os.path.isfile(ckpt_file)
+
+            # simulate a record only partially written when killed
+            with open(ckpt_file, 'ab') as f:
+                f.write(b'\x80\x05\x95')
+
+            grow(1, crop=crop, fn=fn, verbosity=0)
+            assert len(calls) == 8
+            assert not os.path.exists(ckpt_file)
+            assert len(crop.metrics) == 8
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert ds['sum'].sel(a=4, b=20).data == 24
+        assert ds['sum'].sel(a=1, b=10).data == 11
+
+    def test_grow_errors(self):
+        combos = (('a', [1, 2, 3, 4]),
+                  ('b', [10, 20]))
+
+        def fn(a, b, c):
+            if a == 3 or c == 'fail':
+                raise ValueError("bad a")
+            return a + b
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=2)
+            crop.sow_combos(combos, constants={'c': None})
+
+            with pytest.warns(UserWarning):
+                grow(2, crop=crop, fn=fn, verbosity=0, errors='nan')
+            metrics = crop.metrics
+            assert metrics['error'].notnull().sum() == 2
+            assert metrics['error'].iloc[0] == 'ValueError: bad a'
+
+            # every case failing leaves the batch missing
+            fn_args = {'c': 'fail'}
+            with pytest.warns(UserWarning):
+                grow(1, crop=crop, fn=lambda **kw: fn(**{**kw, **fn_args}),
+                     verbosity=0, errors='retry', retries=1)
+            assert tuple(crop.missing_results()) == (1,)
+
+            grow(1, crop=crop, fn=fn, verbosity=0)
+            ds = crop.reap_combos_to_ds(var_names=['sum'])
+
+        assert ds['sum'].isnull().sum() == 2
+        assert ds['sum'].sel(a=4, b=20).data == 24
+
+    def test_grow_events(self):
+        combos = (('a', [1, 2, 3, 4]),
+                  ('b', [10, 20]))
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, num_batches=2)
+            crop.sow_combos(combos, constants={'c': True})
+
+            events = []
+            crop.grow_missing(events=events.append)
+
+        kinds = [e['event'] for e in events]
+        assert kinds.count('run_started') == 2
+        assert kinds.count('task_started') == 8
+        assert kinds.count('task_finished') == 8
+        assert {e['batch'] for e in events} == {1, 2}
+        assert all(e['source'] == 'grow' for e in events)
+        assert events[-1]['status'] == 'completed'
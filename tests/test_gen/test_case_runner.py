@@ -20,6 +20,12 @@ from . import (
 )
 
 
+def foo3_scalar_fail_c(a, b, c, fail_c=None):
+    if c == fail_c:
+        raise ValueError("bad c")
+    return a + b + c
+
+
 # --------------------------------------------------------------------------- #
 # CASE_RUNNER tests                                                           #
 # --------------------------------------------------------------------------- #
@@ -54,6 +60,15 @@ class TestCaseRunner:
         xs = case_runner(foo3_scalar, ('a', 'b', 'c'), cases, num_workers=1)
         assert xs == (111, 222, 333)
 
+    def test_errors_nan(self):
+        cases = ((1, 10, 100),
+                 (2, 20, 200),
+                 (3, 30, 300))
+        with pytest.warns(UserWarning):
+            xs = case_runner(foo3_scalar_fail_c, ('a', 'b', 'c'), cases,
+                             constants={'fail_c': 200}, errors='nan')
+        assert_allclose(xs, (111, np.nan, 333))
+
     def test_split(self):
         cases = ((1, 10, 100),
                  (2, 20, 200),
@@ -349,7 +364,40 @@ class TestFindMissingCases:
         assert all(m_config in t_configs for m_config in m_configs)
 
 
+class TestCaseRunnerToDSErrors:
+    def test_all_failed_array_var(self):
+        cases = [(1, 10, 600), (2, 20, 600)]
+        with pytest.warns(UserWarning):
+            ds = case_runner_to_ds(foo3_scalar_fail_c, ('a', 'b', 'c'), cases,
+                                   var_names='x', var_dims={'x': ['t']},
+                                   var_coords={'t': [0, 1, 2]}, errors='nan',
+                                   constants={'fail_c': 600})
+        assert ds['x'].dims == ('a', 'b', 'c', 't')
+        assert ds['x'].isnull().all()
+        assert ds['__error__'].sel(a=2, b=20, c=600).item() == (
+            'ValueError: bad c')
+        assert ds['__error__'].sel(a=1, b=20, c=600).item() is None
+
+
 class TestFillMissingCases:
+    def test_failed_cases_refilled(self):
+        cases = [(a, b, c) for a in [1, 2] for b in [40, 50] for c in [600]]
+        with pytest.warns(UserWarning):
+            ds = case_runner_to_ds(foo3_scalar_fail_c, ('a', 'b', 'c'), cases,
+                                   var_names='x', errors='nan',
+                                   constants={'fail_c': 600})
+        assert ds['x'].isnull().all()
+        assert ds['__error__'].sel(a=1, b=40, c=600).item() == (
+            'ValueError: bad c')
+
+        # errors count as missing, and are cleared once filled
+        fn_args, missing = find_missing_cases(ds)
+        assert len(missing) == 4
+        fill_missing_cases(ds, fn=foo3_scalar_fail_c, var_names='x',
+                           constants={'fail_c': None}, errors='nan')
+        assert_allclose(ds['x'].sel(c=600).data, [[641, 651], [642, 652]])
+        assert ds['__error__'].isnull().all()
+
     def test_simple(self):
         ds = xr.Dataset(coords={'a': [1, 2, 3], 'b': [40, 50]})
         ds['x'] = (('a', 'b'), np.array([[641, np.nan],
@@ -1,5 +1,8 @@
 from collections import OrderedDict
 from functools import partial
+import signal
+import time
+import warnings
 import pytest
 import numpy as np
 from numpy.testing import assert_allclose
@@ -9,6 +12,7 @@ from xyzpy.gen.combo_runner import (
     combo_runner,
     _combos_to_ds,
     combo_runner_to_ds,
+    RunProfile,
 )
 from . import (
     foo3_scalar,
@@ -21,6 +25,47 @@ from . import (
 )
 
 
+def foo_raise_at(a, b, c, when, err):
+    if (a, b, c) == when:
+        raise err
+    return a + b + c
+
+
+def foo_always_raise(a, b):
+    raise ValueError("bad case")
+
+
+def foo_sleep_raise_at(a, b, when):
+    if (a, b) == when:
+        raise ValueError("bad case")
+    time.sleep(0.5)
+    return a + b
+
+
+def foo_hang_at(a, b, c, when, block=False):
+    if (a, b, c) == when:
+        if block:
+            # simulate being stuck somewhere signals can't interrupt
+            signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])
+        time.sleep(60)
+    return a + b + c
+
+
+class FooFlaky:
+    """Fail the first ``num_fails`` calls for each case.
+    """
+
+    def __init__(self, num_fails):
+        self.num_fails = num_fails
+        self.calls = {}
+
+    def __call__(self, a, b, c):
+        n = self.calls[a, b, c] = self.calls.get((a, b, c), 0) + 1
+        if n <= self.num_fails:
+            raise RuntimeError("flaky")
+        return a + b + c
+
+
 # --------------------------------------------------------------------------- #
 # COMBO_RUNNER tests                                                          #
 # --------------------------------------------------------------------------- #
@@ -34,6 +79,16 @@ _test_expect1 = (np.array([1, 2]).reshape((2, 1, 1)) +
                  np.array([100, 200, 300, 400]).reshape((1, 1, 4)))
 
 
+@pytest.fixture(scope='module')
+def dask_client(tmp_path_factory):
+    distributed = pytest.importorskip('distributed')
+    with distributed.LocalCluster(
+            n_workers=2, threads_per_worker=1, processes=False,
+            local_directory=str(tmp_path_factory.mktemp('dask'))
+    ) as cluster, distributed.Client(cluster) as client:
+        yield client
+
+
 class TestComboRunner:
     def test_simple(self):
         x = combo_runner(foo3_scalar, _test_combos1)
@@ -88,6 +143,126 @@ class TestComboRunner:
         x = combo_runner(fn, _test_combos1, executor=executor)
         assert_allclose(x, _test_expect1)
 
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_error_cancels_and_raises(self, parallel):
+        import concurrent.futures as cf
+        kws = ({'num_workers': 2} if parallel else
+               {'executor': cf.ThreadPoolExecutor(2)})
+        with pytest.raises(ValueError):
+            combo_runner(foo_raise_at, _test_combos1,
+                         constants={'when': (2, 30, 400),
+                                    'err': ValueError}, **kws)
+
+    def test_interrupt_returns_partial_results(self):
+        import concurrent.futures as cf
+        with pytest.warns(UserWarning):
+            ds = combo_runner_to_ds(
+                foo_raise_at, _test_combos1, var_names='x',
+                constants={'when': (2, 30, 400), 'err': KeyboardInterrupt},
+                executor=cf.ThreadPoolExecutor(1))
+        assert ds['x'].shape == (2, 3, 4)
+        assert ds['x'].isnull().sel(a=2, b=30, c=400)
+        assert ds['x'].notnull().sum() <= 23
+
+    def test_errors_nan(self):
+        with pytest.warns(UserWarning):
+            x = combo_runner(foo_raise_at, _test_combos1, errors='nan',
+                             constants={'when': (2, 30, 400),
+                                        'err': ValueError})
+        x = np.asarray(x, dtype=float)
+        assert np.isnan(x[1, 2, 3])
+        assert np.isnan(x).sum() == 1
+
+    def test_errors_retry(self):
+        x = combo_runner(FooFlaky(2), _test_combos1, errors='retry')
+        assert_allclose(x, _test_expect1)
+
+        with pytest.raises(RuntimeError):
+            combo_runner(FooFlaky(2), _test_combos1, retries=1)
+
+    @pytest.mark.skipif(not hasattr(signal, 'setitimer'),
+                        reason='needs SIGALRM')
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_timeout(self, parallel):
+        t0 = time.time()
+        with pytest.warns(UserWarning):
+            ds = combo_runner_to_ds(
+                foo_hang_at, _test_combos1, var_names='x', timeout=0.5,
+                constants={'when': (2, 30, 400)}, parallel=parallel)
+        assert time.time() - t0 < 30
+        assert ds['x'].isnull().sum() == 1
+        assert ds['__error__'].sel(a=2, b=30, c=400).item().startswith(
+            'CaseTimeoutError')
+
+    @pytest.mark.skipif(not hasattr(signal, 'pthread_sigmask'),
+                        reason='needs POSIX signals')
+    def test_timeout_kills_stuck_workers(self):
+        t0 = time.time()
+        with pytest.warns(UserWarning):
+            x = combo_runner(foo_hang_at, _test_combos1, timeout=0.5,
+                             num_workers=2,
+                             constants={'when': (2, 30, 400), 'block': True})
+        assert time.time() - t0 < 30
+        x = np.asarray(x, dtype=float)
+        assert np.isnan(x[1, 2, 3])
+        assert np.isnan(x).sum() == 1
+
+    def test_bad_errors(self):
+        with pytest.raises(ValueError):
+            combo_runner(foo3_scalar, _test_combos1, errors='ignore')
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_profile(self, parallel):
+        x, profile = combo_runner(foo3_scalar, _test_combos1,
+                                  parallel=parallel, profile=True)
+        assert_allclose(x, _test_expect1)
+        assert isinstance(profile, RunProfile)
+        assert len(profile.task_times) == 24
+        assert profile.task_stats()['count'] == 24
+        expected = ({'parse', 'setup', 'submit', 'gather', 'collect'}
+                    if parallel else {'parse', 'run', 'collect'})
+        assert set(profile.phases) == expected
+        assert profile.total > 0.0
+        counts, edges = profile.histogram(bins=4)
+        assert counts.sum() == 24
+        assert len(edges) == 5
+
+    def test_profile_fill_existing(self):
+        profile = RunProfile()
+        x = combo_runner(foo3_scalar, _test_combos1, profile=profile,
+                         split=False)
+        assert_allclose(x, _test_expect1)
+        assert len(profile.task_times) == 24
+
+    def test_dask_client(self, dask_client):
+        x = combo_runner(foo3_scalar, _test_combos1, executor=dask_client)
+        assert_allclose(x, _test_expect1)
+
+    def test_dask_client_error_cancels(self, dask_client):
+        combos = (('a', range(10)), ('b', range(10)))
+        with pytest.raises(ValueError):
+            combo_runner(foo_sleep_raise_at, combos, executor=dask_client,
+                         constants={'when': (0, 0)})
+
+        # the queued cases should have been cancelled rather than run
+        t0 = time.time()
+        while any(dask_client.processing().values()):
+            assert time.time() - t0 < 2.0
+            time.sleep(0.05)
+
+    def test_dask_client_constants_multires(self, dask_client):
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20, 30]))
+        x, y = combo_runner(foo3_float_bool, combos, constants={'c': 100},
+                            split=True, executor=dask_client)
+        assert_allclose(x, _test_expect1[:, :, 0])
+        assert np.all(np.asarray(y)[1, ...])
+
+    def test_lazy_requires_dask(self):
+        with pytest.raises(ValueError):
+            combo_runner_to_ds(foo3_scalar, _test_combos1, var_names='x',
+                               lazy=True)
+
     @pytest.mark.parametrize('parallel', [False, True])
     def test_parallel_multires(self, parallel):
         x = combo_runner(foo3_float_bool, _test_combos1, num_workers=2,
@@ -137,6 +312,167 @@ class TestComboRunnerToDS:
         assert ds.sel(a=2, b=30, c=400)['cakes'].data
         assert not ds.sel(a=1, b=10, c=100)['cakes'].data
 
+    @pytest.mark.parametrize('lazy', [False, True])
+    def test_dask_client(self, dask_client, lazy):
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20, 30]))
+        ds = combo_runner_to_ds(foo2_array_bool, combos,
+                                var_names=['bananas', 'ripe'],
+                                var_dims=(['sugar'], []),
+                                var_coords={'sugar': [*range(10, 20)]},
+                                executor=dask_client, lazy=lazy)
+        if lazy:
+            assert ds['bananas'].chunks is not None
+            ds = ds.compute()
+        assert ds.ripe.data.dtype == bool
+        assert ds.sel(a=2, b=30, sugar=14)['bananas'].data == 32.4
+        assert ds.sel(a=2, b=30)['ripe'].data
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_errors_recorded(self, parallel):
+        with pytest.warns(UserWarning):
+            ds = combo_runner_to_ds(
+                foo_raise_at, _test_combos1, var_names='x', errors='nan',
+                constants={'when': (2, 30, 400), 'err': ValueError},
+                parallel=parallel)
+        assert ds['x'].isnull().sum() == 1
+        assert ds['x'].isnull().sel(a=2, b=30, c=400)
+        assert ds['__error__'].sel(a=2, b=30, c=400).item() == 'ValueError: '
+        assert ds['__error__'].sel(a=1, b=10, c=100).item() is None
+
+    def test_errors_all_failed_array_vars(self):
+        combos = (('a', [1, 2]), ('b', [10, 20, 30]))
+        with pytest.warns(UserWarning):
+            ds = combo_runner_to_ds(foo_always_raise, combos,
+                                    var_names=['x', 'y'],
+                                    var_dims={'x': ['t'], 'y': []},
+                                    var_coords={'t': np.arange(5)},
+                                    errors='nan')
+        assert ds['x'].dims == ('a', 'b', 't')
+        assert ds['x'].isnull().all()
+        assert ds['y'].isnull().all()
+        assert ds['__error__'].notnull().all()
+
+    def test_profile(self):
+        profile = RunProfile()
+        ds = combo_runner_to_ds(foo3_scalar, _test_combos1, var_names='x',
+                                profile=profile)
+        assert 'to_ds' in profile.phases
+        assert ds.attrs['profile_task_count'] == 24
+        assert ds.attrs['profile_to_ds'] == profile.phases['to_ds']
+        assert 'tasks: 24' in repr(profile)
+
+    def test_no_errors_no_variable(self):
+        ds = combo_runner_to_ds(foo3_scalar, _test_combos1, var_names='x',
+                                errors='nan')
+        assert '__error__' not in ds
+
+    def test_reduce_over(self):
+        ds = combo_runner_to_ds(foo3_scalar, _test_combos1, var_names='x',
+                                reduce_over='c')
+        assert set(ds.data_vars) == {'x_mean', 'x_var', 'x_count'}
+        assert ds['x_mean'].dims == ('a', 'b')
+        assert_allclose(ds['x_mean'], _test_expect1.mean(axis=2))
+        assert_allclose(ds['x_var'], _test_expect1.var(axis=2))
+        assert (ds['x_count'] == 4).all()
+
+    def test_reduce_over_multi_array(self):
+        combos = (('a', [1, 2, 3]), ('b', [10, 20, 30]))
+        ds = combo_runner_to_ds(foo2_array_array, combos, var_names=['x', 'y'],
+                                var_dims={('x', 'y'): ['time']},
+                                var_coords={'time': np.arange(5) / 10},
+                                reduce_over=['a'], parallel=True)
+        full = combo_runner_to_ds(foo2_array_array, combos,
+                                  var_names=['x', 'y'],
+                                  var_dims={('x', 'y'): ['time']},
+                                  var_coords={'time': np.arange(5) / 10})
+        assert ds['x_mean'].dims == ('b', 'time')
+        assert_allclose(ds['x_mean'].transpose('b', 'time'),
+                        full['x'].mean('a').transpose('b', 'time'))
+        assert_allclose(ds['y_var'].transpose('b', 'time'),
+                        full['y'].var('a').transpose('b', 'time'))
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_reduce_over_chunks(self, parallel):
+        combos = (('a', [1, 2]), ('b', [10, 20, 30]))
+        ds = combo_runner_to_ds(foo2_array_array, combos, var_names=['x', 'y'],
+                                var_dims={('x', 'y'): ['time']},
+                                var_coords={'time': np.arange(5) / 10},
+                                reduce_over='b', reduce_chunks=2,
+                                parallel=parallel)
+        full = combo_runner_to_ds(foo2_array_array, combos,
+                                  var_names=['x', 'y'],
+                                  var_dims={('x', 'y'): ['time']},
+                                  var_coords={'time': np.arange(5) / 10})
+        assert ds['x_mean'].dims == ('a', 'time')
+        assert_allclose(ds['x_mean'].transpose('a', 'time'),
+                        full['x'].mean('b').transpose('a', 'time'))
+        assert_allclose(ds['y_var'].transpose('a', 'time'),
+                        full['y'].var('b').transpose('a', 'time'))
+        assert (ds['x_count'] == 3).all()
+
+    @pytest.mark.parametrize('reduce_chunks', [1, 3])
+    def test_reduce_over_skips_failed_repeats(self, reduce_chunks):
+        fn = partial(foo_raise_at, when=(1, 10, 200), err=ValueError)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UserWarning)
+            ds = combo_runner_to_ds(fn, _test_combos1, var_names='x',
+                                    reduce_over='c',
+                                    reduce_chunks=reduce_chunks, errors='nan')
+        assert '__error__' not in ds
+        assert ds['x_count'].sel(a=1, b=10).item() == 3
+        assert ds['x_mean'].sel(a=1, b=10).item() == pytest.approx(
+            np.mean([111, 311, 411]))
+        assert (ds['x_count'].sel(a=2) == 4).all()
+
+    def test_reduce_over_all_repeats_fail(self):
+        combos = (('a', [1, 2]), ('b', [10]), ('c', [100, 200, 300]))
+
+        def fn(a, b, c):
+            if a == 1:
+                raise ValueError("bad a")
+            return a + b + c
+
+        with pytest.warns(UserWarning, match='1 of 2 cases'):
+            ds = combo_runner_to_ds(fn, combos, var_names='x',
+                                    reduce_over='c', reduce_chunks=2,
+                                    errors='nan')
+        assert np.isnan(ds['x_mean'].sel(a=1, b=10).item())
+        assert ds['x_mean'].sel(a=2, b=10).item() == 212
+        assert ds['__error__'].sel(a=1, b=10).item() == 'ValueError: bad a'
+        assert ds['__error__'].sel(a=2, b=10).item() is None
+
+    @pytest.mark.skipif(not hasattr(signal, 'setitimer'),
+                        reason='soft timeout needs SIGALRM')
+    @pytest.mark.parametrize('reduce_chunks', [1, 2])
+    def test_reduce_over_timeout_per_repeat(self, reduce_chunks):
+        fn = partial(foo_hang_at, when=(1, 10, 200))
+        t0 = time.time()
+        ds = combo_runner_to_ds(fn, _test_combos1, var_names='x',
+                                reduce_over='c', reduce_chunks=reduce_chunks,
+                                timeout=0.5)
+        assert time.time() - t0 < 30
+        # only the stuck repeat is lost, not the rest of its chunk
+        assert '__error__' not in ds
+        assert ds['x_count'].sel(a=1, b=10).item() == 3
+        assert ds['x_mean'].sel(a=1, b=10).item() == pytest.approx(
+            np.mean([111, 311, 411]))
+        assert (ds['x_count'].sel(a=2) == 4).all()
+
+    def test_reduce_over_retries_per_repeat(self):
+        ds = combo_runner_to_ds(FooFlaky(1), _test_combos1, var_names='x',
+                                reduce_over='c', reduce_chunks=1,
+                                errors='retry', retries=1)
+        assert (ds['x_count'] == 4).all()
+
+    def test_reduce_over_bad(self):
+        with pytest.raises(ValueError):
+            combo_runner_to_ds(foo3_scalar, _test_combos1, var_names='x',
+                               reduce_over='d')
+        with pytest.raises(ValueError):
+            combo_runner_to_ds(foo3_scalar, _test_combos1, var_names=None,
+                               reduce_over='c')
+
     def test_arrayresult(self):
         combos = (('a', [1, 2]),
                   ('b', [10, 20, 30]))
@@ -0,0 +1,155 @@
+import os
+import json
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from xyzpy import (
+    combo_runner,
+    case_runner,
+    EventSink,
+    CallbackSink,
+    JSONLinesSink,
+    PrometheusSink,
+)
+from xyzpy.gen.events import _parse_events, _MultiSink
+from . import foo3_scalar
+
+
+_test_combos = (('a', [1, 2]),
+                ('b', [10, 20, 30]),
+                ('c', [100, 200]))
+
+
+def foo_raise_at_b(a, b, c):
+    if b == 20:
+        raise ValueError("bad b")
+    return a + b + c
+
+
+def load_events(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestParseEvents:
+
+    def test_paths(self):
+        assert _parse_events(None) is None
+        assert isinstance(_parse_events('run.jsonl'), JSONLinesSink)
+        assert isinstance(_parse_events('run.prom'), PrometheusSink)
+
+    def test_callback_and_multi(self):
+        sink = _parse_events([print, 'run.jsonl'])
+        assert isinstance(sink, _MultiSink)
+        assert isinstance(sink.sinks[0], CallbackSink)
+        sink = PrometheusSink('run.prom')
+        assert _parse_events(sink) is sink
+
+    def test_bad(self):
+        with pytest.raises(ValueError):
+            _parse_events(42)
+
+
+class TestRunnerEvents:
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_jsonlines(self, parallel):
+        with TemporaryDirectory() as tdir:
+            path = os.path.join(tdir, 'events.jsonl')
+            combo_runner(foo3_scalar, _test_combos, parallel=parallel,
+                         events=path, verbosity=0)
+            events = load_events(path)
+
+        kinds = [e['event'] for e in events]
+        assert kinds[0] == 'run_started'
+        assert kinds[-1] == 'run_finished'
+        assert kinds.count('task_finished') == 12
+        assert kinds.count('task_started') == (0 if parallel else 12)
+        assert len({e['run'] for e in events}) == 1
+        assert events[0]['total'] == 12
+
+        cases = [e['case'] for e in events if e['event'] == 'task_finished']
+        assert {'a': 2, 'b': 30, 'c': 200} in cases
+
+        end = events[-1]
+        assert end['status'] == 'completed'
+        assert end['done'] == 12
+        assert end['failed'] == 0
+        assert end['pending'] == 0
+        assert end['throughput'] > 0
+
+    def test_failures(self):
+        events = []
+        with pytest.warns(UserWarning):
+            combo_runner(foo_raise_at_b, _test_combos, errors='nan',
+                         events=events.append, verbosity=0)
+        failed = [e for e in events if e['event'] == 'task_failed']
+        assert len(failed) == 4
+        assert failed[0]['error'] == 'ValueError: bad b'
+        assert events[-1]['failed'] == 4
+
+    def test_run_error(self):
+        events = []
+        with pytest.raises(ValueError):
+            combo_runner(foo_raise_at_b, _test_combos, events=events.append,
+                         verbosity=0)
+        assert events[-1]['event'] == 'run_finished'
+        assert events[-1]['status'] == 'failed'
+        assert events[-1]['error'] == 'ValueError: bad b'
+
+    def test_case_runner(self):
+        events = []
+        case_runner(foo3_scalar, ('a', 'b', 'c'),
+                    [(1, 10, 100), (2, 20, 200)],
+                    events=CallbackSink(events.append), verbosity=0)
+        assert events[0]['source'] == 'case_runner'
+        cases = [e['case'] for e in events if e['event'] == 'task_finished']
+        assert cases == [{'a': 1, 'b': 10, 'c': 100},
+                         {'a': 2, 'b': 20, 'c': 200}]
+
+    def test_prometheus(self):
+        with TemporaryDirectory() as tdir:
+            path = os.path.join(tdir, 'xyzpy.prom')
+            combo_runner(foo3_scalar, _test_combos, events=path, verbosity=0)
+            with open(path) as f:
+                text = f.read()
+
+        assert "# TYPE xyzpy_tasks_done gauge" in text
+        done = next(ln for ln in text.splitlines()
+                    if ln.startswith('xyzpy_tasks_done{'))
+        assert 'source="combo_runner"' in done
+        assert float(done.split()[-1]) == 12
+        running = next(ln for ln in text.splitlines()
+                       if ln.startswith('xyzpy_running{'))
+        assert float(running.split()[-1]) == 0
+
+    def test_prometheus_fixed_series(self):
+        with TemporaryDirectory() as tdir:
+            path = os.path.join(tdir, 'xyzpy.prom')
+            sink = PrometheusSink(path)
+            for _ in range(3):
+                combo_runner(foo3_scalar, _test_combos, events=sink,
+                             verbosity=0)
+            with open(path) as f:
+                text = f.read()
+
+        done = [ln for ln in text.splitlines()
+                if ln.startswith('xyzpy_tasks_done{')]
+        assert done == ['xyzpy_tasks_done{source="combo_runner"} 12.0']
+
+    def test_custom_sink(self):
+
+        class CountingSink(EventSink):
+
+            def __init__(self):
+                self.counts = {}
+
+            def emit(self, event):
+                k = event['event']
+                self.counts[k] = self.counts.get(k, 0) + 1
+
+        sink = CountingSink()
+        combo_runner(foo3_scalar, _test_combos, events=sink, verbosity=0)
+        assert sink.counts['task_finished'] == 12
+        assert sink.counts['run_finished'] == 1
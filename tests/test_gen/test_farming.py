@@ -184,6 +184,19 @@ class TestHarvester:
         assert h.full_ds.identical(fn3_fba_ds)
         assert hds.identical(fn3_fba_ds)
 
+    def test_harvest_combos_events(self, fn3_fba_runner):
+        events = []
+        h = Harvester(fn3_fba_runner, events=events.append)
+        h.harvest_combos((('a', (1, 2)), ('b', (3, 4))))
+        h.harvest_combos((('a', (3,)), ('b', (3, 4))))
+
+        merged = [e for e in events if e['event'] == 'ds_merged']
+        assert len(merged) == 2
+        assert merged[-1]['full_sizes']['a'] == 3
+        assert merged[-1]['new_sizes']['a'] == 1
+        finished = [e for e in events if e['event'] == 'run_finished']
+        assert len(finished) == 2
+
     def test_harvest_combos_new_sow_reap_separate(self, fn3_fba_runner,
                                                   fn3_fba_ds):
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -1,7 +1,11 @@
 import functools
+import os
+import time
+from tempfile import TemporaryDirectory
 
 import pytest
 import numpy as np
+from numpy.testing import assert_allclose
 from dask import delayed
 
 import xyzpy as xyz
@@ -74,6 +78,34 @@ class TestBenchmark:
         )
         assert t > 0
 
+    def test_stats_and_noise_control(self):
+        stats = xyz.benchmark(
+            fn=lambda X: np.linalg.eig(X),
+            setup=lambda n: np.random.randn(n, n), n=10,
+            get='stats', repeats=5, min_t=0.01, warmup=2, enable_gc=True,
+            cpus=0 if hasattr(os, 'sched_setaffinity') else None)
+        assert stats['repeats'] == 5
+        assert 0 < stats['min'] <= stats['median']
+        assert stats['iqr'] >= 0
+        assert stats['stderr'] >= 0
+
+    def test_measure_memory(self):
+        res = xyz.benchmark(lambda n: np.ones(n), n=10**6, min_t=0.01,
+                            measure=('time', 'peak_mem', 'allocs',
+                                     'peak_rss'))
+        assert res['time'] > 0
+        assert res['peak_mem'] >= 8 * 10**6
+        assert res['allocs'] >= 1
+        assert 'peak_rss' in res
+
+        with pytest.raises(ValueError):
+            xyz.benchmark(lambda: None, measure='flops')
+
+    def test_isolate(self):
+        t = xyz.benchmark(lambda: np.random.randn(10).sum(),
+                          min_t=0.01, isolate=True)
+        assert t > 0
+
 
 class TestBenchmarker:
 
@@ -94,17 +126,114 @@ class TestBenchmarker:
             b = np.random.randn(n)
             return a, b
 
-        benchmark_opts = {'starmap': True, 'min_t': 0.01, 'repeats': 3}
+        benchmark_opts = {'starmap': True, 'min_t': 0.01, 'repeats': 3,
+                          'measure': ('time', 'peak_mem', 'allocs')}
 
         b = xyz.Benchmarker(kernels, setup, benchmark_opts=benchmark_opts)
 
         ns = [2**i for i in range(1, 6)]
 
         b.run(ns, verbosity=2)
+        assert (b.ds['time'] <= b.ds['time_median']).all()
+        assert 'time_stderr' in b.ds
+        assert (b.ds['peak_mem'] > 0).all()
+        assert 'allocs' in b.ds
         b.lineplot()
+        b.lineplot('peak_mem')
         b.ilineplot()
 
 
+class TestBenchmarkerVersions:
+
+    def test_compare(self):
+
+        def kernel(n):
+            return np.random.randn(n).sum()
+
+        def slow_kernel(n):
+            time.sleep(0.002)
+            return np.random.randn(n).sum()
+
+        opts = {'min_t': 0.01, 'repeats': 5}
+        with TemporaryDirectory() as tdir:
+            data_name = os.path.join(tdir, 'bench.h5')
+
+            b1 = xyz.Benchmarker([kernel], names=['k'], benchmark_opts=opts,
+                                 data_name=data_name, version='v1')
+            b1.run([10, 100])
+            b2 = xyz.Benchmarker([slow_kernel], names=['k'],
+                                 benchmark_opts=opts, data_name=data_name,
+                                 version='v2')
+            b2.run([10, 100])
+
+            assert set(b2.ds['version'].values) == {'v1', 'v2'}
+            assert b2.ds['env'].values[0] == xyz.environment_fingerprint()
+
+            res = b2.compare('v1')
+            assert (res['speedup'] < 1).all()
+            assert res['regressed'].all()
+            assert (res['speedup_lo'] <= res['speedup']).all()
+            with pytest.raises(RuntimeError):
+                b2.compare('v1', raise_on_regression=True)
+
+            res = b2.compare('v2', 'v1', baseline_ds=data_name)
+            assert not res['regressed'].any()
+
+            # per version scaling fits
+            assert b2.fit_scaling(min_n=10)['exponent'].isnull().all()
+
+
+class TestBenchmarkerScaling:
+
+    @staticmethod
+    def fake_benchmarker(scales):
+        import xarray as xr
+
+        ns = np.array([2**i for i in range(4, 14)])
+        b = xyz.Benchmarker([lambda: None] * len(scales),
+                            names=list(scales))
+        # same noise for each call, so identical kernels give identical data
+        rng = np.random.RandomState(7)
+        noise = 1 + 1e-3 * rng.randn(len(ns), len(scales))
+        times = np.stack([f(ns) for f in scales.values()], axis=1) * noise
+        ds = xr.Dataset({'time': (('n', 'kernel'), times),
+                         'time_stderr': (('n', 'kernel'), 1e-3 * times)},
+                        coords={'n': ns, 'kernel': list(scales)})
+        b.harvester.add_ds(ds)
+        return b
+
+    def test_fit_and_crossovers(self):
+        b = self.fake_benchmarker({
+            'quad': lambda n: 1e-9 * n**2,
+            'nlogn': lambda n: 1e-6 * n * np.log(n),
+        })
+        fit = b.fit_scaling(min_n=16)
+        assert fit['exponent'].sel(kernel='quad') == pytest.approx(2, 0.05)
+        assert fit['model'].sel(kernel='quad') == 'power'
+        assert fit['model'].sel(kernel='nlogn') == 'nlogn'
+        assert fit['exponent'].sel(kernel='nlogn') == pytest.approx(1, 0.05)
+        assert fit['exponent_err'].notnull().all()
+
+        fit = b.fit_scaling(model='power')
+        assert fit['exponent'].sel(kernel='nlogn') > 1
+
+        # 1e-9 n^2 = 1e-6 n log(n) => n ~ 9100
+        n_cross = b.crossovers(min_n=16).sel(kernel='quad',
+                                             kernel_other='nlogn')
+        assert float(n_cross) == pytest.approx(9100, rel=0.2)
+
+    def test_check_scaling(self):
+        base = self.fake_benchmarker({'a': lambda n: 1e-9 * n**2,
+                                      'b': lambda n: 1e-9 * n})
+        b = self.fake_benchmarker({'a': lambda n: 1e-9 * n**2,
+                                   'b': lambda n: 1e-9 * n**1.5})
+        res = b.check_scaling(base.ds)
+        assert not res['regressed'].sel(kernel='a')
+        assert res['regressed'].sel(kernel='b')
+        with pytest.raises(RuntimeError):
+            b.check_scaling(base.ds, raise_on_regression=True)
+
+
 class TestRunningStatistics:
 
     def test_basic(self):
@@ -126,6 +255,47 @@ class TestRunningStatistics:
         assert rs.std == pytest.approx(1.0)
         assert rs.rel_err == pytest.approx(1. / (43 * 8**0.5))
 
+    def test_update_from_array_and_merge(self):
+        xs = np.random.randn(100, 3)
+        rs = xyz.RunningStatistics()
+        rs.update_from_it(xs.ravel()[:10])
+        rs.update_from_array(xs.ravel()[10:])
+        assert rs.count == 300
+        assert rs.mean == pytest.approx(xs.mean())
+        assert rs.var == pytest.approx(xs.var())
+
+        rs1, rs2 = xyz.RunningStatistics(), xyz.RunningStatistics()
+        rs1.update_from_array(xs[:30])
+        rs2.update_from_array(xs[30:])
+        rs1.merge(rs2)
+        assert rs1.count == 300
+        assert rs1.mean == pytest.approx(xs.mean())
+        assert rs1.var == pytest.approx(xs.var())
+
+        # merging empty stats is a no-op
+        rs1.merge(xyz.RunningStatistics())
+        assert rs1.count == 300
+
+
+class TestRunningArrayStatistics:
+
+    def test_basic(self):
+        xs = np.random.randn(50, 4, 2)
+        rs = xyz.RunningArrayStatistics()
+        rs.update_from_it(xs[:5])
+        rs.update_from_array(xs[5:20])
+        other = xyz.RunningArrayStatistics()
+        other.update_from_array(np.moveaxis(xs[20:], 0, -1), axis=-1)
+        rs.merge(other)
+
+        assert rs.count == 50
+        assert rs.mean.shape == (4, 2)
+        assert_allclose(rs.mean, xs.mean(axis=0))
+        assert_allclose(rs.var, xs.var(axis=0))
+        assert_allclose(rs.err, xs.std(axis=0) / 50**0.5)
+        assert not rs.converged(1e-9, 1e-9)
+        assert rs.converged(1e9, 1e9)
+
 
 class TestFromRepeats:
 
@@ -136,3 +306,39 @@ class TestFromRepeats:
 
         rs = xyz.estimate_from_repeats(fn, 10, verbosity=2)
         assert rs.mean == pytest.approx(5, rel=0.1)
+
+    def test_parallel(self):
+
+        def fn(n):
+            return np.random.rand(n).sum()
+
+        rs, xs = xyz.estimate_from_repeats(fn, 10, num_workers=2,
+                                           batch_size=8, get='samples',
+                                           verbosity=2)
+        assert rs.mean == pytest.approx(5, rel=0.1)
+        assert rs.count == len(xs)
+        assert rs.mean == pytest.approx(np.mean(xs))
+        assert rs.var == pytest.approx(np.var(xs))
+
+    def test_parallel_merges_running_batches(self):
+
+        def fn():
+            time.sleep(0.01)
+            return 1.0
+
+        # converges after the first batch, but the batch running on the
+        # other worker at the same time should be kept as well
+        rs, xs = xyz.estimate_from_repeats(fn, num_workers=2, batch_size=8,
+                                           get='samples')
+        assert rs.count > 8
+        assert rs.count % 8 == 0
+        assert rs.count == len(xs)
+
+    def test_parallel_max_samples(self):
+
+        def fn():
+            return np.random.rand()
+
+        rs = xyz.estimate_from_repeats(fn, rtol=1e-9, parallel=True,
+                                       batch_size=10, max_samples=95)
+        assert rs.count == 95
@@ -10,11 +10,20 @@ from .utils import (
     benchmark,
     Benchmarker,
     RunningStatistics,
+    RunningArrayStatistics,
     estimate_from_repeats,
+    environment_fingerprint,
 )
 from .gen.combo_runner import (
     combo_runner,
     combo_runner_to_ds,
+    RunProfile,
+)
+from .gen.events import (
+    EventSink,
+    CallbackSink,
+    JSONLinesSink,
+    PrometheusSink,
 )
 from .gen.case_runner import (
     case_runner,
@@ -28,6 +37,7 @@ from .gen.case_runner import (
 from .gen.batch import (
     Crop,
     grow,
+    mpi_grow,
 )
 from .gen.farming import (
     Runner,
@@ -107,6 +117,11 @@ __all__ = [
     "label",
     "combo_runner",
     "combo_runner_to_ds",
+    "RunProfile",
+    "EventSink",
+    "CallbackSink",
+    "JSONLinesSink",
+    "PrometheusSink",
     "case_runner",
     "find_union_coords",
     "all_missing_ds",
@@ -116,6 +131,7 @@ __all__ = [
     "fill_missing_cases",
     "Crop",
     "grow",
+    "mpi_grow",
     "cache_to_disk",
     "save_ds",
     "load_ds",
@@ -156,7 +172,9 @@ __all__ = [
     "benchmark",
     "Benchmarker",
     "RunningStatistics",
+    "RunningArrayStatistics",
     "estimate_from_repeats",
+    "environment_fingerprint",
     "xr_diff_fornberg",
     "xr_diff_u",
     "xr_diff_u_err",
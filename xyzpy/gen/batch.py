@@ -1,31 +1,216 @@
 import os
 import shutil
+import socket
 from itertools import chain
-from time import sleep
+from time import sleep, time, perf_counter, process_time
 from glob import glob
 import warnings
 import pickle
 import copy
 import math
-
+import random
+import numbers
+import itertools
+import collections
+import uuid
+import contextlib
+
+import numpy as np
+import pandas as pd
+import xarray as xr
 import joblib
 from joblib.externals import cloudpickle
 
-from ..utils import _get_fn_name, prod, progbar
-from .prepare import _parse_combos, _parse_constants, _parse_attrs
-from .combo_runner import _combo_runner, combo_runner_to_ds
+from ..utils import _get_fn_name, prod, progbar, _RSSSampler
+from .prepare import (
+    _parse_combos,
+    _parse_constants,
+    _parse_attrs,
+    _parse_var_names,
+    _parse_var_dims,
+    _parse_var_coords,
+)
+from .combo_runner import (
+    _combo_runner,
+    combo_runner_to_ds,
+    ErrorPolicyFn,
+    _CaseError,
+    _parse_errors,
+    _nan_like,
+)
+from .events import _parse_events, _RunMonitor, _monitoring
 
 
 BTCH_NM = "xyz-batch-{}.jbdmp"
 RSLT_NM = "xyz-result-{}.jbdmp"
 FNCT_NM = "xyz-function.clpkl"
 INFO_NM = "xyz-settings.jbdmp"
+MTRC_NM = "xyz-metrics-{}.jbdmp"
+RSRC_NM = "xyz-resources.jbdmp"
+PRGS_NM = "xyz-progress.bin"
+CKPT_NM = "xyz-checkpoint-{}.pkl"
 
 
 class XYZError(Exception):
     pass
 
 
+# ------------------------------ serialization ------------------------------ #
+
+_PICKLE5_MAGIC = b'XYZPKL5\x00'
+_JOBLIB_COMPRESSORS = {'zlib', 'gzip', 'bz2', 'lzma', 'xz', 'lz4'}
+
+
+def _parse_serializer(serializer):
+    """Check ``serializer`` is one of the supported formats:
+
+    - ``None`` or ``'joblib'``: plain ``joblib.dump``.
+    - ``'zlib'``, ``'gzip'``, ``'bz2'``, ``'lzma'``, ``'xz'`` or ``'lz4'``:
+      ``joblib.dump`` with this compressor at level 3, or as a tuple
+      ``(compressor, level)``.
+    - ``'pickle5'``: pickle protocol 5 with out-of-band buffers, such that
+      numpy arrays are written and read without any intermediate copies.
+    """
+    if serializer == 'pickle5' and pickle.HIGHEST_PROTOCOL < 5:
+        raise ValueError("The 'pickle5' serializer needs python>=3.8.")
+
+    if serializer in (None, 'joblib', 'pickle5'):
+        return serializer
+
+    if isinstance(serializer, str):
+        serializer = (serializer, 3)
+
+    if serializer[0] not in _JOBLIB_COMPRESSORS:
+        raise ValueError("Unknown serializer: {}.".format(serializer))
+
+    return tuple(serializer)
+
+
+def _dump_obj(obj, file, serializer=None):
+    """Dump ``obj`` to ``file`` using ``serializer``, see
+    ``_parse_serializer`` for the options.
+    """
+    if serializer in (None, 'joblib'):
+        joblib.dump(obj, file)
+
+    elif serializer == 'pickle5':
+        buffers = []
+        data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+        raws = [b.raw() for b in buffers]
+
+        with open(file, 'wb') as f:
+            f.write(_PICKLE5_MAGIC)
+            pickle.dump((len(data), [r.nbytes for r in raws]), f)
+            f.write(data)
+            for raw in raws:
+                f.write(raw)
+
+    else:
+        joblib.dump(obj, file, compress=tuple(serializer))
+
+
+def _load_obj(file):
+    """Load an object written by ``_dump_obj``, whatever the serializer.
+    """
+    with open(file, 'rb') as f:
+        if f.read(len(_PICKLE5_MAGIC)) == _PICKLE5_MAGIC:
+            data_size, buffer_sizes = pickle.load(f)
+            data = f.read(data_size)
+
+            buffers = []
+            for size in buffer_sizes:
+                buffer = bytearray(size)
+                f.readinto(buffer)
+                buffers.append(buffer)
+
+            return pickle.loads(data, buffers=buffers)
+
+    # joblib detects any compression itself
+    return joblib.load(file)
+
+
+# per-process caches of deserialized functions and resources, so that a worker
+#     growing many batches of the same crop only has to load them once
+_FN_CACHE = {}
+_RESOURCES_CACHE = {}
+
+
+def _file_key(file):
+    """Key identifying a specific version of ``file`` on disk.
+    """
+    stat = os.stat(file)
+    return os.path.abspath(file), stat.st_mtime_ns, stat.st_size
+
+
+def _load_fn(crop_location):
+    """Load the function saved in the crop at ``crop_location``, reusing the
+    version already loaded by this process if the file hasn't changed.
+    """
+    key = _file_key(os.path.join(crop_location, FNCT_NM))
+    try:
+        return _FN_CACHE[key]
+    except KeyError:
+        fn = cloudpickle.loads(joblib.load(key[0]))
+        _FN_CACHE.clear()
+        _FN_CACHE[key] = fn
+        return fn
+
+
+def _scan_batch_numbers(directory, template):
+    """Find which batch numbers have a file in ``directory`` matching
+    ``template``, using a single directory listing.
+    """
+    prefix, suffix = template.split("{}")
+    numbers_found = set()
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith(prefix) and name.endswith(suffix):
+                    try:
+                        numbers_found.add(int(name[len(prefix):-len(suffix)]))
+                    except ValueError:
+                        pass
+    except FileNotFoundError:
+        pass
+
+    return numbers_found
+
+
+def _mark_progress(crop_location, batch_number, grown=True):
+    """Flag ``batch_number`` as grown, or not, in the crop's progress index.
+    Each batch has its own byte which is written in place, so that processes
+    growing different batches never clash.
+    """
+    try:
+        with open(os.path.join(crop_location, PRGS_NM), 'r+b') as f:
+            f.seek(batch_number - 1)
+            f.write(b'\x01' if grown else b'\x00')
+    except FileNotFoundError:
+        # crop sown before the progress index existed
+        pass
+
+
+def _load_resources(crop_location):
+    """Load the resources saved in the crop at ``crop_location``, with any
+    arrays memory-mapped copy-on-write, and cache them like ``_load_fn``.
+    Functions can thus still modify array resources in place, without the
+    changes reaching the file on disk or other processes.
+    """
+    file = os.path.join(crop_location, RSRC_NM)
+    if not os.path.exists(file):
+        return {}
+
+    key = _file_key(file)
+    try:
+        return _RESOURCES_CACHE[key]
+    except KeyError:
+        resources = joblib.load(key[0], mmap_mode='c')
+        _RESOURCES_CACHE.clear()
+        _RESOURCES_CACHE[key] = resources
+        return resources
+
+
 # --------------------------------- parsing --------------------------------- #
 
 def parse_crop_details(fn, crop_name, crop_parent):
@@ -61,6 +246,150 @@ def parse_crop_details(fn, crop_name, crop_parent):
     return crop_location, crop_name, crop_parent
 
 
+def _batch_bounds(num_cases, batchsize, num_batches, batch_remainder,
+                  batch_sizes=None):
+    """Work out the range of flat case indices, ``(start, stop)``, that each
+    batch covers - this mirrors exactly how the ``Sower`` divides cases.
+    """
+    if batch_remainder is None:
+        batch_remainder = 0
+
+    if batch_sizes is None:
+        batch_sizes = (batchsize + int(i < batch_remainder)
+                       for i in range(num_batches))
+
+    bounds = []
+    start = 0
+    for size in batch_sizes:
+        stop = min(start + size, num_cases)
+        bounds.append((start, stop))
+        start = stop
+
+    return tuple(bounds)
+
+
+# ------------------------------ cost estimation ---------------------------- #
+
+def _is_positive_real(vals):
+    return all(isinstance(v, numbers.Real) and not isinstance(v, bool) and
+               v > 0 for v in vals)
+
+
+def _fit_cost_model(combos, cases, times):
+    """Fit a power-law model, ``t = c * prod(x_i**a_i)``, of the cost of each
+    case in ``combos``, given the measured ``times`` of the sample ``cases``.
+    Only arguments whose values are all positive real numbers are used, any
+    others are assumed not to affect the cost.
+
+    Returns
+    -------
+    costs : numpy.ndarray
+        The flat array of expected cost of every case, in sown order.
+    """
+    if len(cases) == 0:
+        raise ValueError("At least one timed case is needed to fit the cost "
+                         "model.")
+
+    shape = tuple(len(vals) for _, vals in combos)
+    usable = [(i, arg, vals) for i, (arg, vals) in enumerate(combos)
+              if _is_positive_real(vals) and arg in cases[0]]
+
+    times = np.maximum(np.asarray(times, dtype=float), 1e-9)
+    X = np.array([[1.0] + [math.log(case[arg]) for _, arg, _ in usable]
+                  for case in cases])
+    coeffs = np.linalg.lstsq(X, np.log(times), rcond=None)[0]
+
+    log_costs = np.full(shape, coeffs[0])
+    for a, (i, _, vals) in zip(coeffs[1:], usable):
+        bshape = tuple(len(vals) if j == i else 1 for j in range(len(shape)))
+        log_costs = log_costs + a * np.log(np.asarray(vals, dtype=float)
+                                           ).reshape(bshape)
+
+    return np.exp(log_costs).ravel()
+
+
+def estimate_costs(fn, combos, constants=None, num_samples=8, seed=None):
+    """Estimate the cost, in seconds, of every case in ``combos`` by timing
+    ``fn`` on a random sample of cases and fitting a power-law model to the
+    arguments with positive numeric values.
+
+    Parameters
+    ----------
+    fn : callable
+        The function to profile.
+    combos : tuple[tuple[str, list]]
+        The combos to estimate the cost of.
+    constants : dict, optional
+        Constant arguments to supply to ``fn``.
+    num_samples : int, optional
+        How many cases to actually time.
+    seed : int, optional
+        Random seed for choosing the sample cases.
+
+    Returns
+    -------
+    costs : numpy.ndarray
+        The flat array of expected cost of every case, in sown order.
+    """
+    combos = _parse_combos(combos)
+    constants = _parse_constants(constants)
+
+    rng = random.Random(seed)
+    num_cases = prod(len(vals) for _, vals in combos)
+    flat_ids = rng.sample(range(num_cases), min(num_samples, num_cases))
+
+    shape = tuple(len(vals) for _, vals in combos)
+    cases, times = [], []
+    for i in flat_ids:
+        case = {arg: vals[j] for (arg, vals), j in
+                zip(combos, np.unravel_index(i, shape))}
+        t0 = perf_counter()
+        fn(**case, **constants)
+        times.append(perf_counter() - t0)
+        cases.append(case)
+
+    return _fit_cost_model(combos, cases, times)
+
+
+def _parse_costs(costs, combos, fn=None, constants=None):
+    """Turn the various ways of specifying the case costs into a flat array
+    in sown order.
+    """
+    fn_args = tuple(arg for arg, _ in combos)
+    num_cases = prod(len(vals) for _, vals in combos)
+
+    # time a sample of cases
+    if isinstance(costs, str):
+        if costs != 'profile':
+            raise ValueError("Unknown cost specifier '{}'.".format(costs))
+        if fn is None:
+            raise ValueError("Need the crop function to profile costs.")
+        return estimate_costs(fn, combos, constants)
+
+    # learn from the metrics recorded by a previous crop
+    if isinstance(costs, pd.DataFrame):
+        cases = costs[[a for a in fn_args if a in costs]].to_dict('records')
+        return _fit_cost_model(combos, cases, costs['wall_time'])
+
+    # learn from already gathered data, e.g. timings from a previous run
+    if isinstance(costs, xr.DataArray):
+        known = costs.to_dataframe(name='__cost__').dropna().reset_index()
+        cases = known[[a for a in fn_args if a in known]].to_dict('records')
+        return _fit_cost_model(combos, cases, known['__cost__'])
+
+    # explicit function of each case
+    if callable(costs):
+        return np.array([costs(**dict(zip(fn_args, case))) for case in
+                         itertools.product(*(vals for _, vals in combos))],
+                        dtype=float)
+
+    costs = np.asarray(costs, dtype=float).ravel()
+    if costs.size != num_cases:
+        raise ValueError("Got {} costs for {} cases.".format(costs.size,
+                                                             num_cases))
+    return costs
+
+
 def parse_fn_runner_harvester(fn, runner, harvester):
     """
     """
@@ -114,6 +443,20 @@ class Crop(object):
     num_batches : int, optional
         How many total batches to aim for, cannot be specified if
         `batchsize` is.
+    target_time : float, optional
+        When sowing with ``costs``, aim for batches that each take roughly
+        this many seconds, rather than a fixed number of batches.
+    serializer : {None, 'zlib', 'lz4', 'pickle5', ...}, optional
+        How to write the batches and results to disk. ``None`` (default) is
+        plain ``joblib.dump``, the name of any compressor supported by
+        ``joblib`` (or a tuple of name and level) compresses them, and
+        ``'pickle5'`` writes numpy arrays out-of-band without copying.
+        Reading detects the format automatically.
+    checkpoint : bool, optional
+        Whether :func:`~xyzpy.gen.batch.grow` should append each case's
+        result to a checkpoint stream as soon as it is computed, so that if
+        a batch is killed part way through, growing it again skips the cases
+        already done.
     runner : xyzpy.Runner, optional
         A Runner instance, from which the `fn` can be inferred and
         which can also allow the Crop to reap itself straight to a
@@ -138,6 +481,9 @@ class Crop(object):
                  save_fn=None,
                  batchsize=None,
                  num_batches=None,
+                 target_time=None,
+                 serializer=None,
+                 checkpoint=False,
                  runner=None,
                  harvester=None,
                  autoload=True):
@@ -150,7 +496,18 @@ class Crop(object):
         self.save_fn = save_fn
         self.batchsize = batchsize
         self.num_batches = num_batches
+        self.target_time = target_time
+        # the settings asked for, as batching by cost overwrites the above
+        self._requested_batching = (batchsize, num_batches)
+        self.serializer = _parse_serializer(serializer)
+        self.checkpoint = checkpoint
         self._batch_remainder = None
+        self._batch_sizes = None
+        self._batch_costs = None
+        self._partial_reaper = None
+        self._reaped_metrics = None
+        self._info_key = None
+        self._progress = None
 
         # Work out the full directory for the crop
         self.location, self.name, self.parent_dir = \
@@ -163,13 +520,27 @@ class Crop(object):
 
     # ------------------------------- methods ------------------------------- #
 
-    def choose_batch_settings(self, combos):
+    def choose_batch_settings(self, combos, costs=None):
         """Work out how to divide all cases into batches, i.e. ensure
-        that ``batchsize * num_batches >= num_cases``.
+        that ``batchsize * num_batches >= num_cases``. If the flat array of
+        expected ``costs`` of each case is given, batches are instead chosen
+        to have roughly equal total cost.
         """
         n = prod(len(x) for _, x in combos)
 
-        if (self.batchsize is not None) and (self.num_batches is not None):
+        if self._batch_sizes is not None:
+            # previously batched by cost - start again from what was asked for
+            self.batchsize, self.num_batches = self._requested_batching
+        self._batch_sizes = None
+        self._batch_costs = None
+
+        if costs is not None:
+            (self.num_batches, self._batch_sizes,
+             self._batch_costs) = self._choose_cost_batch_settings(n, costs)
+            self.batchsize = max(self._batch_sizes)
+            self._batch_remainder = 0
+
+        elif (self.batchsize is not None) and (self.num_batches is not None):
             # Check that they are set correctly
             pos_tot = self.batchsize * self.num_batches
             if not (n <= pos_tot < n + self.batchsize):
@@ -199,11 +570,58 @@ class Crop(object):
 
             self.batchsize, self._batch_remainder = divmod(n, self.num_batches)
 
+    def _choose_cost_batch_settings(self, n, costs):
+        """Divide the cases into contiguous batches of roughly equal total
+        cost, without changing the crop.
+
+        Returns
+        -------
+        num_batches : int
+            The number of batches.
+        batch_sizes : tuple[int]
+            The number of cases in each batch.
+        batch_costs : tuple[float]
+            The total expected cost of each batch.
+        """
+        costs = np.asarray(costs, dtype=float)
+        total = costs.sum()
+        batchsize, num_batches = self._requested_batching
+
+        if num_batches is None:
+            if self.target_time is not None:
+                num_batches = math.ceil(total / self.target_time)
+            elif batchsize is not None:
+                num_batches = math.ceil(n / batchsize)
+            else:
+                raise ValueError("One of `num_batches`, `batchsize` or "
+                                 "`target_time` must be given to batch by "
+                                 "cost.")
+        num_batches = min(max(int(num_batches), 1), n)
+
+        # where the cumulative cost crosses each multiple of the target
+        cum_costs = np.cumsum(costs)
+        targets = total * np.arange(1, num_batches) / num_batches
+        stops = [int(x) + 1 for x in np.searchsorted(cum_costs, targets)]
+        stops.append(n)
+
+        # make sure every batch has at least one case
+        start = 0
+        for i in range(num_batches):
+            stops[i] = min(max(stops[i], start + 1), n - (num_batches - 1 - i))
+            start = stops[i]
+
+        starts = [0] + stops[:-1]
+        batch_sizes = tuple(b - a for a, b in zip(starts, stops))
+        batch_costs = tuple(float(costs[a:b].sum())
+                            for a, b in zip(starts, stops))
+        return num_batches, batch_sizes, batch_costs
+
     def ensure_dirs_exists(self):
         """Make sure the directory structure for this crop exists.
         """
         os.makedirs(os.path.join(self.location, "batches"), exist_ok=True)
         os.makedirs(os.path.join(self.location, "results"), exist_ok=True)
+        os.makedirs(os.path.join(self.location, "metrics"), exist_ok=True)
 
     def save_info(self, combos):
         """Save information about the sowed cases.
@@ -213,6 +631,7 @@ class Crop(object):
         if self.harvester is not None:
             harvester_copy = copy.deepcopy(self.harvester)
             harvester_copy.runner.fn = None
+            harvester_copy.events = None
             hrvstr_pkl = pickle.dumps(harvester_copy)
             runner_pkl = None
         elif self.runner is not None:
@@ -229,9 +648,14 @@ class Crop(object):
             'batchsize': self.batchsize,
             'num_batches': self.num_batches,
             '_batch_remainder': self._batch_remainder,
+            '_batch_sizes': self._batch_sizes,
+            '_batch_costs': self._batch_costs,
+            'serializer': self.serializer,
+            'checkpoint': self.checkpoint,
             'harvester': hrvstr_pkl,
             'runner': runner_pkl,
         }, os.path.join(self.location, INFO_NM))
+        self._info_key = None
 
     def load_info(self):
         """Load the full settings from disk.
@@ -244,12 +668,26 @@ class Crop(object):
             return joblib.load(sfile)
 
     def _sync_info_from_disk(self):
-        """Load information about the saved cases.
+        """Load information about the saved cases, unless it hasn't changed
+        since last loaded.
         """
+        sfile = os.path.join(self.location, INFO_NM)
+        try:
+            info_key = _file_key(sfile)
+        except FileNotFoundError:
+            raise XYZError("Settings can't be found at {}.".format(sfile))
+
+        if info_key == self._info_key:
+            return
+
         settings = self.load_info()
         self.batchsize = settings['batchsize']
         self.num_batches = settings['num_batches']
         self._batch_remainder = settings['_batch_remainder']
+        self._batch_sizes = settings.get('_batch_sizes', None)
+        self._batch_costs = settings.get('_batch_costs', None)
+        self.serializer = settings.get('serializer', None)
+        self.checkpoint = settings.get('checkpoint', False)
 
         hrvstr_pkl = settings['harvester']
         harvester = None if hrvstr_pkl is None else pickle.loads(hrvstr_pkl)
@@ -259,18 +697,26 @@ class Crop(object):
         self._fn, self.runner, self.harvester = \
             parse_fn_runner_harvester(None, runner, harvester)
 
+        self._info_key = info_key
+
     def save_function_to_disk(self):
         """Save the base function to disk using cloudpickle
         """
         joblib.dump(cloudpickle.dumps(self._fn),
                     os.path.join(self.location, FNCT_NM))
 
+    def save_resources_to_disk(self, resources):
+        """Save the resources to disk once, uncompressed so that any arrays
+        can be memory-mapped by every process that grows this crop, rather
+        than copying them into every case of every batch.
+        """
+        joblib.dump(dict(resources), os.path.join(self.location, RSRC_NM))
+
     def load_function(self):
         """Load the saved function from disk, and try to re-insert it back into
         Harvester or Runner if present.
         """
-        self._fn = cloudpickle.loads(joblib.load(
-            os.path.join(self.location, FNCT_NM)))
+        self._fn = _load_fn(self.location)
 
         if self.harvester is not None:
             if self.harvester.runner.fn is None:
@@ -305,16 +751,69 @@ class Crop(object):
         """
         return os.path.exists(os.path.join(self.location, INFO_NM))
 
-    def calc_progress(self):
+    def save_progress(self, progress=None):
+        """Write the progress index - one byte per batch flagging whether it
+        has been grown - which :func:`~xyzpy.gen.batch.grow` then updates.
+
+        Parameters
+        ----------
+        progress : array_like of bool, optional
+            Which batches have been grown, defaults to none.
+        """
+        if progress is None:
+            progress = np.zeros(self.num_batches, dtype=bool)
+
+        pfile = os.path.join(self.location, PRGS_NM)
+        with open(pfile + ".tmp", 'wb') as f:
+            f.write(np.asarray(progress, dtype=np.uint8).tobytes())
+        os.replace(pfile + ".tmp", pfile)
+
+    def _load_progress(self):
+        """Read the progress index, if there is one.
+        """
+        try:
+            with open(os.path.join(self.location, PRGS_NM), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        return np.frombuffer(data, dtype=np.uint8).astype(bool)
+
+    def calc_progress(self, rescan=False):
         """Calculate how much progressed has been made in growing the cases.
+        This reads the progress index maintained by
+        :func:`~xyzpy.gen.batch.grow`, and the settings only if they have
+        changed, falling back to a single scan of the results directory.
+
+        Parameters
+        ----------
+        rescan : bool, optional
+            Ignore the progress index and rebuild it by scanning the results
+            directory, e.g. if result files have been manually removed.
         """
         if self.is_prepared():
             self._sync_info_from_disk()
-            self._num_sown_batches = len(glob(
-                os.path.join(self.location, "batches", BTCH_NM.format("*"))))
-            self._num_results = len(glob(
-                os.path.join(self.location, "results", RSLT_NM.format("*"))))
+
+            progress = None if rescan else self._load_progress()
+
+            if progress is None:
+                # the index is written once sowing is complete
+                self._num_sown_batches = len(_scan_batch_numbers(
+                    os.path.join(self.location, "batches"), BTCH_NM))
+                grown = _scan_batch_numbers(
+                    os.path.join(self.location, "results"), RSLT_NM)
+                progress = np.zeros(self.num_batches, dtype=bool)
+                progress[[i - 1 for i in grown
+                          if 0 < i <= self.num_batches]] = True
+                if rescan and (self._num_sown_batches == self.num_batches):
+                    self.save_progress(progress)
+            else:
+                self._num_sown_batches = self.num_batches
+
+            self._progress = progress
+            self._num_results = int(np.count_nonzero(progress))
         else:
+            self._progress = None
             self._num_sown_batches = -1
             self._num_results = -1
 
@@ -326,19 +825,54 @@ class Crop(object):
         )
 
     def missing_results(self):
-        """
+        """The numbers of the batches which have not been grown yet.
         """
         self.calc_progress()
+        return tuple(int(i) + 1 for i in np.flatnonzero(~self._progress))
+
+    def estimate_walltime(self, batch_ids=None, safety_factor=1.5,
+                          batches_per_task=1):
+        """Estimate how many seconds are needed to grow any single one of
+        ``batch_ids`` - or any run of ``batches_per_task`` consecutive ones -
+        if the crop was sown with ``costs`` in seconds.
+
+        Parameters
+        ----------
+        batch_ids : sequence of int, optional
+            The batches to consider, defaults to all missing batches.
+        safety_factor : float, optional
+            Multiply the expected cost of the most expensive task by this.
+        batches_per_task : int, optional
+            How many batches are grown one after another by each task.
 
-        def no_result_exists(x):
-            return not os.path.isfile(
-                os.path.join(self.location, "results", RSLT_NM.format(x)))
+        Returns
+        -------
+        float
+        """
+        if batch_ids is None:
+            batch_ids = self.missing_results()
+        else:
+            self.calc_progress()
 
-        return tuple(filter(no_result_exists, range(1, self.num_batches + 1)))
+        if self._batch_costs is None:
+            raise XYZError("This crop was not sown with any case costs.")
+
+        batch_ids = tuple(batch_ids)
+        task_costs = (
+            sum(self._batch_costs[i - 1]
+                for i in batch_ids[j:j + batches_per_task])
+            for j in range(0, len(batch_ids), batches_per_task)
+        )
+        return safety_factor * max(task_costs)
 
     def delete_all(self):
-        # delete everything
+        # keep hold of any metrics before deleting everything
+        metrics_dir = os.path.join(self.location, "metrics")
+        if os.path.isdir(metrics_dir) and os.listdir(metrics_dir):
+            self._reaped_metrics = self.metrics
+
         shutil.rmtree(self.location)
+        self._info_key = None
 
     def __str__(self):
         # Location and name, underlined
@@ -382,32 +916,76 @@ class Crop(object):
         msg = "<Crop(name='{}', progress={}, batchsize={})>"
         return msg.format(self.name, progress, self.batchsize)
 
-    def sow_combos(self, combos, constants=None, verbosity=1):
+    def sow_combos(self, combos, constants=None, costs=None, verbosity=1):
         """Sow to disk.
+
+        Parameters
+        ----------
+        combos : mapping_like
+            The combos to sow.
+        constants : dict, optional
+            Constant arguments to supply to the function.
+        costs : {'profile', callable, DataArray, DataFrame, array}, optional
+            If given, form batches of roughly equal expected cost (see
+            ``target_time``) rather than equal numbers of cases, where the
+            cost of each case is estimated by:
+
+            - ``'profile'``: timing the function on a random sample of cases
+              and fitting a power-law model to its numeric arguments.
+            - callable: calling ``costs(**case)``.
+            - ``xarray.DataArray``: fitting the same model to already
+              measured costs, e.g. timings from a previous, smaller run.
+            - ``pandas.DataFrame``: fitting the same model to the
+              ``'wall_time'`` of a previous crop's :attr:`~xyzpy.Crop.metrics`.
+            - array_like: the explicit cost of every combo.
+
+            If the costs are in seconds, they are also used to estimate the
+            walltime needed by :func:`~xyzpy.gen.batch.gen_qsub_script`.
+        verbosity : int, optional
+            How much information to show.
         """
         combos = _parse_combos(combos)
         constants = _parse_constants(constants)
 
         if self.runner is not None:
             constants = {**self.runner._constants, **constants}
-            constants = {**self.runner._resources, **constants}
+            # resources are saved once, separately, rather than in every case
+            resources = {k: v for k, v in self.runner._resources.items()
+                         if k not in constants}
+        else:
+            resources = {}
 
         # Sort to ensure order remains same for reaping results
         #   (don't want to hash kwargs)
         combos = sorted(combos, key=lambda x: x[0])
 
-        with Sower(self, combos) as sow_fn:
+        if costs is not None:
+            costs = _parse_costs(costs, combos, fn=self._fn,
+                                 constants={**resources, **constants})
+
+        with Sower(self, combos, costs=costs) as sow_fn:
+            if resources:
+                self.save_resources_to_disk(resources)
+            else:
+                # don't let grow pick up those from a previous sowing
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.location, RSRC_NM))
             _combo_runner(fn=sow_fn, combos=combos, constants=constants,
                           verbosity=verbosity)
 
-    def grow(self, batch_ids, **combo_runner_opts):
-        """Grow specific batch numbers using this process.
+    def grow(self, batch_ids, errors='raise', retries=None, timeout=None,
+             events=None, **combo_runner_opts):
+        """Grow specific batch numbers using this process. See
+        :func:`~xyzpy.gen.batch.grow` for ``errors``, ``retries``,
+        ``timeout`` and ``events``, which apply to each case.
         """
         if isinstance(batch_ids, int):
             batch_ids = (batch_ids,)
 
         _combo_runner(grow, combos=(('batch_number', batch_ids),),
-                      constants={'verbosity': 0, 'crop': self},
+                      constants={'verbosity': 0, 'crop': self,
+                                 'errors': errors, 'retries': retries,
+                                 'timeout': timeout, 'events': events},
                       **combo_runner_opts)
 
     def grow_missing(self, **combo_runner_opts):
@@ -456,8 +1034,12 @@ class Crop(object):
                           attrs=None,
                           parse=True,
                           wait=False,
-                          clean_up=True):
+                          clean_up=True,
+                          memmap_dir=None):
         """Reap a function over sowed combinations and output to a Dataset.
+        Each batch of results is written directly into the preallocated
+        output arrays and then dropped, so only a single batch of results is
+        held in memory at once.
 
         Parameters
         ----------
@@ -481,6 +1063,14 @@ class Crop(object):
         wait : bool, optional
             Whether to wait for results to appear. If false (default) all
             results need to be in place before the reap.
+        clean_up : bool, optional
+            Whether to delete all the batch files once the results have been
+            gathered.
+        memmap_dir : str, optional
+            If given, allocate the output arrays as numpy memory-mapped
+            ``.npy`` files in this directory, so that crops with results
+            larger than memory can be reaped. The directory should be outside
+            of the crop and the files must be kept while the dataset is used.
 
         Returns
         -------
@@ -495,30 +1085,66 @@ class Crop(object):
         settings = joblib.load(os.path.join(self.location, INFO_NM))
 
         if parse:
+            var_names = _parse_var_names(var_names)
+            var_dims = _parse_var_dims(var_dims, var_names=var_names)
+            var_coords = _parse_var_coords(var_coords)
             constants = _parse_constants(constants)
             attrs = _parse_attrs(attrs)
 
-        with Reaper(self, num_batches=settings['num_batches'],
-                    wait=wait) as reap_fn:
-
-            # Move constants into attrs, so as not to pass them to the Reaper
-            #   when if fact they were meant for the original function.
-            ds = combo_runner_to_ds(fn=reap_fn,
-                                    combos=settings['combos'],
-                                    var_names=var_names,
-                                    var_dims=var_dims,
-                                    var_coords=var_coords,
-                                    constants={},
-                                    resources={},
-                                    attrs={**attrs, **constants},
-                                    parse=parse)
+        if var_names == (None,):
+            # labelled xarray results are simply concatenated
+            with Reaper(self, num_batches=settings['num_batches'],
+                        wait=wait) as reap_fn:
+
+                # Move constants into attrs, so as not to pass them to the
+                #   Reaper when if fact they were meant for the original
+                #   function.
+                ds = combo_runner_to_ds(fn=reap_fn,
+                                        combos=settings['combos'],
+                                        var_names=var_names,
+                                        var_dims=var_dims,
+                                        var_coords=var_coords,
+                                        constants={},
+                                        resources={},
+                                        attrs={**attrs, **constants},
+                                        parse=False)
+        else:
+            # write each batch straight into the preallocated dataset
+            combos = settings['combos']
+            bounds = _batch_bounds(prod(len(x) for _, x in combos),
+                                   settings['batchsize'],
+                                   settings['num_batches'],
+                                   settings['_batch_remainder'],
+                                   settings.get('_batch_sizes', None))
+            reaper = DatasetReaper(combos, bounds, var_names=var_names,
+                                   var_dims=var_dims, var_coords=var_coords,
+                                   constants=constants, attrs=attrs,
+                                   allow_missing=False, memmap_dir=memmap_dir,
+                                   name=self.name)
+
+            for batch_id in range(1, settings['num_batches'] + 1):
+                rfile = os.path.join(self.location, "results",
+                                     RSLT_NM.format(batch_id))
+                while wait and not os.path.exists(rfile):
+                    sleep(0.2)
+
+                results = _load_obj(rfile)
+                if (results is None) or len(results) == 0:
+                    raise ValueError("Something not right: result {} contains"
+                                     " no data upon loading".format(rfile))
+
+                reaper.add_batch(batch_id, results)
+                del results
+
+            ds = reaper.finalize()
 
         if clean_up:
             self.delete_all()
 
         return ds
 
-    def reap_runner(self, runner, wait=False, clean_up=True):
+    def reap_runner(self, runner, wait=False, clean_up=True,
+                    memmap_dir=None):
         """Reap a Crop over sowed combos and save to a dataset defined by a
         Runner.
         """
@@ -532,22 +1158,25 @@ class Crop(object):
             attrs=runner._attrs,
             parse=False,
             wait=wait,
-            clean_up=clean_up)
+            clean_up=clean_up,
+            memmap_dir=memmap_dir)
         runner.last_ds = ds
         return ds
 
     def reap_harvest(self, harvester, wait=False, sync=True, overwrite=None,
-                     clean_up=True):
+                     clean_up=True, memmap_dir=None):
         """
         """
         if harvester is None:
             raise ValueError("Cannot reap and harvest if no Harvester is set.")
 
-        ds = self.reap_runner(harvester.runner, wait=wait, clean_up=clean_up)
+        ds = self.reap_runner(harvester.runner, wait=wait, clean_up=clean_up,
+                              memmap_dir=memmap_dir)
         self.harvester.add_ds(ds, sync=sync, overwrite=overwrite)
         return ds
 
-    def reap(self, wait=False, sync=True, overwrite=None, clean_up=True):
+    def reap(self, wait=False, sync=True, overwrite=None, clean_up=True,
+             memmap_dir=None):
         """Reap sown and grown combos from disk. Return a dataset if a runner
         or harvester is set, otherwise, the raw nested tuple.
 
@@ -567,6 +1196,9 @@ class Crop(object):
         clean_up : bool, optional
             Whether to delete all the batch files once the results have been
             gathered.
+        memmap_dir : str, optional
+            If reaping to a dataset, allocate its arrays as memory-mapped
+            files in this directory, see :meth:`~xyzpy.Crop.reap_combos_to_ds`.
 
         Returns
         -------
@@ -574,12 +1206,168 @@ class Crop(object):
         """
         if self.harvester is not None:
             return self.reap_harvest(self.harvester, clean_up=clean_up,
-                                     wait=wait, sync=sync, overwrite=overwrite)
+                                     wait=wait, sync=sync, overwrite=overwrite,
+                                     memmap_dir=memmap_dir)
         elif self.runner is not None:
-            return self.reap_runner(self.runner, wait=wait, clean_up=clean_up)
+            return self.reap_runner(self.runner, wait=wait, clean_up=clean_up,
+                                    memmap_dir=memmap_dir)
         else:
             return self.reap_combos(wait=wait, clean_up=clean_up)
 
+    def reap_incremental(self,
+                         var_names=None,
+                         var_dims=None,
+                         var_coords=None,
+                         constants=None,
+                         attrs=None,
+                         wait=True,
+                         timeout=None,
+                         poll_interval=0.2,
+                         sync=True,
+                         overwrite=None,
+                         clean_up=True,
+                         callback=None):
+        """Reap results batch by batch as they appear, merging each into an
+        in-memory partial dataset (``Crop.partial_ds``) and, if a harvester
+        is set, straight into its full dataset. Batches already merged by
+        a previous call are not reaped again.
+
+        Parameters
+        ----------
+        var_names : str, sequence of strings, or None
+            Variable name(s) of the output(s) of `fn`. Ignored if a runner or
+            harvester is set.
+        var_dims : sequence of either strings or string sequences, optional
+            'Internal' names of dimensions for each variable. Ignored if a
+            runner or harvester is set.
+        var_coords : mapping, optional
+            Mapping of extra coords the output variables may depend on.
+            Ignored if a runner or harvester is set.
+        constants : mapping, optional
+            Constants to record as attributes or coordinates. Ignored if a
+            runner or harvester is set.
+        attrs : mapping, optional
+            Any extra attributes to store. Ignored if a runner or harvester
+            is set.
+        wait : bool, optional
+            Whether to keep waiting for new results until all have been
+            reaped (default), or simply merge those present and return.
+        timeout : float, optional
+            If waiting, give up after this many seconds, returning the
+            partial dataset.
+        poll_interval : float, optional
+            How often to check for new results if inotify is not available.
+        sync : bool, optional
+            Whether to sync each merged batch with the harvester's on-disk
+            dataset.
+        overwrite : {None, False, True}, optional
+            How to merge each batch into the harvester's full dataset, see
+            :meth:`~xyzpy.Harvester.add_ds`.
+        clean_up : bool, optional
+            Whether to delete the crop once all results have been reaped.
+        callback : callable, optional
+            Called as ``callback(ds)`` with the partial dataset every time new
+            batches have been merged, e.g. to update a plot.
+
+        Returns
+        -------
+        xarray.Dataset
+            The (possibly still partial) dataset of results.
+        """
+        self._sync_info_from_disk()
+        settings = self.load_info()
+        combos = settings['combos']
+        num_batches = settings['num_batches']
+
+        if self.runner is not None:
+            var_names = self.runner._var_names
+            var_dims = self.runner._var_dims
+            var_coords = self.runner._var_coords
+            constants = self.runner._constants
+            attrs = self.runner._attrs
+        else:
+            var_names = _parse_var_names(var_names)
+            var_dims = _parse_var_dims(var_dims, var_names=var_names)
+            var_coords = _parse_var_coords(var_coords)
+            constants = _parse_constants(constants)
+            attrs = _parse_attrs(attrs)
+
+        if self._partial_reaper is None:
+            bounds = _batch_bounds(prod(len(x) for _, x in combos),
+                                   settings['batchsize'], num_batches,
+                                   settings['_batch_remainder'],
+                                   settings.get('_batch_sizes', None))
+            self._partial_reaper = DatasetReaper(
+                combos, bounds, var_names=var_names, var_dims=var_dims,
+                var_coords=var_coords, constants=constants, attrs=attrs)
+
+        reaper = self._partial_reaper
+        results_dir = os.path.join(self.location, "results")
+        watcher = _ResultWatcher(results_dir, poll_interval) if wait else None
+        t0 = time()
+        # batch_id -> (file stat, number of failed loads with that stat)
+        load_failures = {}
+
+        try:
+            while True:
+                present = set(os.listdir(results_dir))
+                new_batches = False
+
+                for batch_id in range(1, num_batches + 1):
+                    if ((batch_id in reaper.reaped) or
+                            (RSLT_NM.format(batch_id) not in present)):
+                        continue
+
+                    file = os.path.join(results_dir,
+                                        RSLT_NM.format(batch_id))
+                    try:
+                        results = _load_obj(file)
+                    except Exception as e:
+                        # probably still being written - try again later,
+                        # unless the file has stopped changing
+                        _check_load_failure(load_failures, batch_id, file, e)
+                        continue
+
+                    batch_ds = reaper.add_batch(batch_id, results)
+                    del results
+                    new_batches = True
+
+                    if self.harvester is not None:
+                        self.harvester.add_ds(batch_ds, sync=sync,
+                                              overwrite=overwrite)
+
+                if new_batches and (callback is not None):
+                    callback(reaper.ds)
+
+                if reaper.is_complete() or not wait:
+                    break
+
+                if (timeout is not None) and (time() - t0 > timeout):
+                    break
+
+                watcher.wait()
+        finally:
+            if watcher is not None:
+                watcher.close()
+
+        if reaper.is_complete():
+            reaper.finalize()
+            if self.runner is not None:
+                self.runner.last_ds = reaper.ds
+            if clean_up:
+                self.delete_all()
+                self._partial_reaper = None
+
+        return reaper.ds
+
+    def reap_available(self, **reap_opts):
+        """Merge any results that have already been grown into
+        ``Crop.partial_ds`` without waiting for the rest, or cleaning up.
+        See :meth:`~xyzpy.Crop.reap_incremental`.
+        """
+        reap_opts.setdefault('clean_up', False)
+        return self.reap_incremental(wait=False, **reap_opts)
+
     def check_bad(self, delete_bad=True):
         """Check that the result dumps are not bad -> sometimes length does not
         match the batch. Optionally delete these so that they can be re-grown.
@@ -607,10 +1395,10 @@ class Crop(object):
             batch_file = os.path.join(
                 self.location, "batches", BTCH_NM.format(result_num))
 
-            batch = joblib.load(batch_file)
+            batch = _load_obj(batch_file)
 
             try:
-                result = joblib.load(result_file)
+                result = _load_obj(result_file)
                 unloadable = False
             except Exception as e:
                 unloadable = True
@@ -624,6 +1412,7 @@ class Crop(object):
 
                 if delete_bad:
                     os.remove(result_file)
+                    _mark_progress(self.location, int(result_num), False)
 
                 bad_ids.append(result_num)
 
@@ -660,13 +1449,63 @@ class Crop(object):
         self.calc_progress()
         return self._num_results
 
+    @property
+    def metrics(self):
+        """A ``pandas.DataFrame`` of the wall time, CPU time, peak RSS and
+        hostname recorded by :func:`~xyzpy.gen.batch.grow` for every case
+        grown so far, labelled by the combo arguments and batch number. Once
+        the crop has been reaped, the last recorded metrics. The peak RSS,
+        ``'peak_rss'``, is the largest increase in the resident set size of
+        the process over its size when the case started, sampled in the
+        background every 10ms, so is specific to each case.
+        """
+        if not self.is_prepared():
+            return self._reaped_metrics
+
+        settings = self.load_info()
+        combos = settings['combos']
+        shape = tuple(len(vals) for _, vals in combos)
+        bounds = _batch_bounds(prod(shape), settings['batchsize'],
+                               settings['num_batches'],
+                               settings['_batch_remainder'],
+                               settings.get('_batch_sizes', None))
+
+        metrics_dir = os.path.join(self.location, "metrics")
+        frames = []
+        for batch_id, (start, stop) in enumerate(bounds, 1):
+            mfile = os.path.join(metrics_dir, MTRC_NM.format(batch_id))
+            if not os.path.isfile(mfile):
+                continue
+
+            idxs = np.unravel_index(np.arange(start, stop), shape)
+            frame = {arg: np.asarray(vals)[ix]
+                     for (arg, vals), ix in zip(combos, idxs)}
+            frame['batch'] = batch_id
+            frame.update(joblib.load(mfile))
+            frames.append(pd.DataFrame(frame))
+
+        if not frames:
+            return None
+
+        return pd.concat(frames, ignore_index=True)
+
+    @property
+    def partial_ds(self):
+        """The dataset of results reaped so far by
+        :meth:`~xyzpy.Crop.reap_incremental`, with missing data for cases
+        that have not been grown yet.
+        """
+        if self._partial_reaper is None:
+            return None
+        return self._partial_reaper.ds
+
 
 class Sower(object):
     """Class for sowing a 'crop' of batched combos to then 'grow' (on any
     number of workers sharing the filesystem) and then reap.
     """
 
-    def __init__(self, crop, combos):
+    def __init__(self, crop, combos, costs=None):
         """
         Parameters
         ----------
@@ -674,24 +1513,27 @@ class Sower(object):
                 Description of where and how to store the cases and results.
             combos : mapping_like
                 Description of combinations from which to sow cases from.
+            costs : array_like, optional
+                The flat, expected cost of each case, used to form batches of
+                roughly equal cost.
 
         """
         self.combos = combos
         self.crop = crop
-        self.crop.choose_batch_settings(combos)
+        self.crop.choose_batch_settings(combos, costs=costs)
         # Internal:
         self._batch_cases = []  # collects cases to be written in single batch
         self._counter = 0  # counts how many cases are in batch so far
         self._batch_counter = 0  # counts how many batches have been written
 
     def save_batch(self):
-        """Save the current batch of cases to disk using joblib.dump
+        """Save the current batch of cases to disk using the crop's serializer
          and start the next batch.
         """
         self._batch_counter += 1
-        joblib.dump(self._batch_cases, os.path.join(
-            self.crop.location, "batches", BTCH_NM.format(self._batch_counter))
-        )
+        _dump_obj(self._batch_cases, os.path.join(
+            self.crop.location, "batches", BTCH_NM.format(self._batch_counter)
+        ), self.crop.serializer)
         self._batch_cases = []
         self._counter = 0
 
@@ -705,6 +1547,12 @@ class Sower(object):
         self._batch_cases.append(kwargs)
         self._counter += 1
 
+        # batches formed by cost have explicit sizes
+        if self.crop._batch_sizes is not None:
+            if self._counter == self.crop._batch_sizes[self._batch_counter]:
+                self.save_batch()
+            return
+
         # when the number of cases doesn't divide the number of batches we
         #     distribute the remainder among the first crops.
         extra_batch = self._batch_counter < self.crop._batch_remainder
@@ -717,9 +1565,151 @@ class Sower(object):
         if self._batch_cases:
             self.save_batch()
 
+        # only index progress once every batch is in place
+        if exception_type is None:
+            self.crop.save_progress()
+
+
+def _grow_case(fn, resources, case):
+    """Compute a single case, timing it and sampling the peak increase in
+    resident set size during it.
+    """
+    t0, c0 = perf_counter(), process_time()
+    with _RSSSampler(interval=0.01) as rss:
+        result = fn(**resources, **case)
+    return result, perf_counter() - t0, process_time() - c0, rss.peak
+
+
+def _save_metrics(crop_location, batch_number, metrics):
+    """Write the metrics of a grown batch to disk.
+    """
+    metrics_dir = os.path.join(crop_location, "metrics")
+    os.makedirs(metrics_dir, exist_ok=True)
+    joblib.dump(metrics, os.path.join(
+        metrics_dir, MTRC_NM.format(batch_number)))
+
+
+def _save_grown(crop_location, batch_number, results, metrics):
+    """Write the results and metrics of a fully grown batch to disk.
+    """
+    # save metrics first so they are in place once the result appears
+    _save_metrics(crop_location, batch_number, metrics)
+
+    # save to results, in the same format as the batches
+    serializer = joblib.load(
+        os.path.join(crop_location, INFO_NM)).get('serializer', None)
+    _dump_obj(tuple(results), os.path.join(
+        crop_location, "results", RSLT_NM.format(batch_number)),
+        serializer)
+
+    # flag only once the result is definitely in place
+    _mark_progress(crop_location, batch_number)
+
+
+def _load_checkpoint(file):
+    """Load the results of the cases already completed from a checkpoint
+    stream, discarding any final record only partially written when the
+    process was killed.
+    """
+    done = {}
+    if not os.path.isfile(file):
+        return done
+
+    with open(file, 'r+b') as f:
+        good = 0
+        while True:
+            try:
+                i, *record = pickle.load(f)
+            except Exception:
+                break
+            done[i] = record
+            good = f.tell()
+
+        # make sure new records are appended after the last complete one
+        f.truncate(good)
+
+    return done
+
+
+def _start_batch(crop_location, batch_number, num_cases, checkpoint=None):
+    """Set up the results and metrics of a batch about to be grown. If
+    ``checkpoint`` (by default the crop's setting), fill in any cases already
+    computed by a previous attempt. Returns the results, the metrics, the
+    indices of the cases still to compute and the checkpoint file, or
+    ``None``.
+    """
+    results = [None] * num_cases
+    metrics = {'wall_time': [None] * num_cases,
+               'cpu_time': [None] * num_cases,
+               'peak_rss': [None] * num_cases}
+
+    if checkpoint is None:
+        checkpoint = joblib.load(
+            os.path.join(crop_location, INFO_NM)).get('checkpoint', False)
+
+    if not checkpoint:
+        return results, metrics, list(range(num_cases)), None
+
+    ckpt_dir = os.path.join(crop_location, "checkpoints")
+    os.makedirs(ckpt_dir, exist_ok=True)
+    ckpt_file = os.path.join(ckpt_dir, CKPT_NM.format(batch_number))
+
+    done = _load_checkpoint(ckpt_file)
+    for i, (result, wall_time, cpu_time, peak_rss) in done.items():
+        results[i] = result
+        metrics['wall_time'][i] = wall_time
+        metrics['cpu_time'][i] = cpu_time
+        metrics['peak_rss'][i] = peak_rss
+
+    todo = [i for i in range(num_cases) if i not in done]
+    return results, metrics, todo, ckpt_file
+
+
+def _checkpoint_case(ckpt, i, record):
+    """Append the ``record`` of case ``i`` to the open checkpoint stream,
+    unless it failed, so that a resumed attempt tries it again.
+    """
+    if (ckpt is None) or isinstance(record[0], _CaseError):
+        return
+    pickle.dump((i, *record), ckpt, protocol=pickle.HIGHEST_PROTOCOL)
+    ckpt.flush()
+
+
+def _finish_batch(crop_location, batch_number, results, metrics,
+                  ckpt_file=None):
+    """Save the results and metrics of a batch whose every case has been
+    computed. Failed cases are filled with missing data and their errors
+    recorded in the metrics - unless every case failed, in which case only
+    the metrics are saved, so that the batch stays missing. The checkpoint
+    stream, if any, is removed once the results are saved.
+    """
+    failed = [isinstance(r, _CaseError) for r in results]
+    if any(failed):
+        metrics['error'] = [r.error if f else None
+                            for r, f in zip(results, failed)]
+
+        if all(failed):
+            # leave the batch missing so that it can be grown again
+            _save_metrics(crop_location, batch_number, metrics)
+            warnings.warn("Every case in batch {} raised an error, no "
+                          "result has been saved.".format(batch_number))
+            return
+
+        warnings.warn("{} of {} cases in batch {} raised errors, these "
+                      "have been saved as missing data.".format(
+                          sum(failed), len(results), batch_number))
+        fill = _nan_like(next(r for r, f in zip(results, failed) if not f))
+        results = [fill if f else r for r, f in zip(results, failed)]
+
+    _save_grown(crop_location, batch_number, results, metrics)
+
+    if ckpt_file is not None:
+        os.remove(ckpt_file)
+
 
 def grow(batch_number, crop=None, fn=None, check_mpi=True,
-         verbosity=2, debugging=False):
+         verbosity=2, debugging=False, checkpoint=None, errors='raise',
+         retries=None, timeout=None, events=None):
     """Automatically process a batch of cases into results. Should be run in an
     ".xyz-{fn_name}" folder.
 
@@ -731,7 +1721,9 @@ def grow(batch_number, crop=None, fn=None, check_mpi=True,
         Description of where and how to store the cases and results.
     fn : callable, optional
         If specified, the function used to generate the results, otherwise
-        the function will be loaded from disk.
+        the function will be loaded from disk. Both the function and any
+        resources are cached per process, so growing further batches of the
+        same crop doesn't deserialize them again.
     check_mpi : bool, optional
         Whether to check if the process is rank 0 and only save results if
         so - allows mpi functions to be simply used. Defaults to true,
@@ -741,6 +1733,30 @@ def grow(batch_number, crop=None, fn=None, check_mpi=True,
         How much information to show.
     debugging : bool, optional
         Set logging level to DEBUG.
+    checkpoint : bool, optional
+        Whether to append each case's result to a checkpoint stream as soon as
+        it is computed, and skip any cases already in it, so that a batch
+        killed part way through can be resumed. The stream is removed once
+        the full result has been saved. Defaults to the crop's setting.
+    errors : {'raise', 'nan', 'retry'}, optional
+        What to do if a case raises an error, see
+        :func:`~xyzpy.combo_runner`. Failed cases are filled with missing
+        data and their error messages recorded in the ``'error'`` column of
+        :attr:`~xyzpy.Crop.metrics`. If every case in the batch fails, no
+        result is saved at all, so that the batch stays missing and can be
+        grown again.
+    retries : int, optional
+        How many times to retry a case that raises an error.
+    timeout : float, optional
+        The maximum time in seconds for a single case, which is otherwise
+        treated as failed in the same way, whatever ``errors`` is. Relies on
+        ``SIGALRM``, so is only enforced on POSIX systems.
+    events : EventSink, str, callable or sequence of these, optional
+        Where to send structured events as each case starts, finishes or
+        fails, with the progress of the batch, see
+        :func:`~xyzpy.combo_runner`. A file path is the simplest option when
+        growing on a cluster, since every job can append to the same one.
+        Each event is tagged with the ``'crop'`` name and ``'batch'`` number.
     """
     if debugging:
         import logging
@@ -759,11 +1775,18 @@ def grow(batch_number, crop=None, fn=None, check_mpi=True,
 
     # load function
     if fn is None:
-        fn = cloudpickle.loads(
-            joblib.load(os.path.join(crop_location, FNCT_NM)))
+        fn = _load_fn(crop_location)
+
+    errors, retries = _parse_errors(errors, retries)
+    if (errors != 'raise') or retries or timeout:
+        fn = ErrorPolicyFn(fn, errors=errors, retries=retries,
+                           timeout=timeout)
+
+    # shared arguments saved once rather than in every case
+    resources = _load_resources(crop_location)
 
     # load cases to evaluate
-    cases = joblib.load(
+    cases = _load_obj(
         os.path.join(crop_location, "batches", BTCH_NM.format(batch_number)))
 
     if len(cases) == 0:
@@ -781,30 +1804,309 @@ def grow(batch_number, crop=None, fn=None, check_mpi=True,
         rank = 0
 
     if rank == 0:
-        results = []
+        num_cases = len(cases)
+        results, metrics, todo, ckpt_file = _start_batch(
+            crop_location, batch_number, num_cases, checkpoint)
+        ckpt = None if ckpt_file is None else open(ckpt_file, 'ab')
 
         descr = "Batch {}".format(batch_number)
 
-        pbar = progbar(range(len(cases)), disable=verbosity <= 0, desc=descr)
-        for i in pbar:
-            if verbosity >= 2:
-                pbar.set_description(descr + ": {}".format(cases[i]))
-
-            # compute and store result!
-            results.append(fn(**cases[i]))
-
-        if len(results) != len(cases):
+        sink = _parse_events(events)
+        if sink is not None:
+            monitor = _RunMonitor(
+                sink, 'grow', total=len(todo), num_workers=1,
+                info={'crop': os.path.basename(crop_location)[5:],
+                      'batch': batch_number})
+        else:
+            monitor = None
+
+        pbar = progbar(todo, disable=verbosity <= 0, desc=descr,
+                       total=num_cases, initial=num_cases - len(todo))
+        try:
+            with _monitoring(monitor):
+                for i in pbar:
+                    if verbosity >= 2:
+                        pbar.set_description(descr + ": {}".format(cases[i]))
+                    if monitor is not None:
+                        monitor.submitted()
+                        monitor.task_started(cases[i])
+
+                    # compute and store result!
+                    record = _grow_case(fn, resources, cases[i])
+                    (results[i], metrics['wall_time'][i],
+                     metrics['cpu_time'][i], metrics['peak_rss'][i]) = record
+
+                    if monitor is not None:
+                        failed = isinstance(results[i], _CaseError)
+                        monitor.task_finished(
+                            cases[i], seconds=metrics['wall_time'][i],
+                            error=results[i].error if failed else None)
+
+                    _checkpoint_case(ckpt, i, record)
+        finally:
+            if ckpt is not None:
+                ckpt.close()
+
+        # results can legitimately be None, but every case run or restored
+        # from a checkpoint has a wall time
+        if any(t is None for t in metrics['wall_time']):
             raise ValueError("Something has gone wrong with processing "
                              "batch {} ".format(BTCH_NM.format(batch_number)) +
                              "for the crop at {}.".format(crop.location))
 
-        # save to results
-        joblib.dump(tuple(results), os.path.join(
-            crop_location, "results", RSLT_NM.format(batch_number)))
+        metrics['hostname'] = socket.gethostname()
+        _finish_batch(crop_location, batch_number, results, metrics,
+                      ckpt_file)
     else:
         for case in cases:
             # worker: just help compute the result!
-            fn(**case)
+            fn(**resources, **case)
+
+
+_MPI_TAG_TASK = 1
+_MPI_TAG_STOP = 2
+_MPI_TAG_ERROR = 3
+
+
+def _mpi_worker(comm, crop, fn, granularity, checkpoint=None,
+                errors='raise', retries=None, timeout=None):
+    """Compute tasks sent by rank 0 until told to stop.
+    """
+    from mpi4py import MPI
+
+    if granularity == 'case':
+        if fn is None:
+            fn = _load_fn(crop.location)
+        errors, retries = _parse_errors(errors, retries)
+        if (errors != 'raise') or retries or timeout:
+            fn = ErrorPolicyFn(fn, errors=errors, retries=retries,
+                               timeout=timeout)
+        resources = _load_resources(crop.location)
+
+    status = MPI.Status()
+    while True:
+        task = comm.recv(source=0, tag=MPI.ANY_TAG, status=status)
+        if status.Get_tag() == _MPI_TAG_STOP:
+            break
+
+        try:
+            if granularity == 'batch':
+                grow(task, crop=crop, fn=fn, check_mpi=False, verbosity=0,
+                     checkpoint=checkpoint, errors=errors, retries=retries,
+                     timeout=timeout)
+                out = task
+            else:
+                batch_number, i, case = task
+                out = (batch_number, i, socket.gethostname(),
+                       *_grow_case(fn, resources, case))
+        except Exception as e:
+            batch_number = task if granularity == 'batch' else task[0]
+            comm.send((batch_number, e), dest=0, tag=_MPI_TAG_ERROR)
+        else:
+            comm.send(out, dest=0, tag=_MPI_TAG_TASK)
+
+
+def _mpi_dispatcher(comm, crop, batch_ids, granularity, verbosity,
+                    checkpoint=None):
+    """Hand out tasks to each worker rank as soon as it is free, and in the
+    case of individual cases, gather, checkpoint and save the results of
+    each batch in the same way as ``grow``. After a worker raises an error,
+    no new batches are started, but the busy workers finish, as do the
+    batches already started, apart from the one that failed, before the
+    error is raised.
+    """
+    from mpi4py import MPI
+
+    # the batches being gathered case by case, and their cases left to send
+    grown = {}
+    queue = collections.deque()
+    batches = iter(batch_ids)
+    error = None
+
+    pbar = progbar(total=len(batch_ids), disable=verbosity <= 0,
+                   desc="MPI grow")
+
+    def finish(batch_number):
+        g = grown.pop(batch_number)
+        if g['ckpt'] is not None:
+            g['ckpt'].close()
+        _finish_batch(crop.location, batch_number, g['results'],
+                      g['metrics'], g['ckpt_file'])
+        pbar.update()
+
+    def start(batch_number):
+        cases = _load_obj(os.path.join(
+            crop.location, "batches", BTCH_NM.format(batch_number)))
+        results, metrics, todo, ckpt_file = _start_batch(
+            crop.location, batch_number, len(cases), checkpoint)
+        metrics['hostname'] = [None] * len(cases)
+        grown[batch_number] = {
+            'results': results,
+            'metrics': metrics,
+            'remaining': len(todo),
+            'failed': False,
+            'ckpt_file': ckpt_file,
+            'ckpt': None if ckpt_file is None else open(ckpt_file, 'ab'),
+        }
+        if not todo:
+            # every case restored from the checkpoint
+            finish(batch_number)
+        queue.extend((batch_number, i, cases[i]) for i in todo)
+
+    def next_task():
+        # after an error, only the batches already started are carried on
+        while (not queue) and (error is None):
+            batch_number = next(batches, None)
+            if batch_number is None:
+                break
+            if granularity == 'batch':
+                return batch_number
+            start(batch_number)
+        return queue.popleft() if queue else None
+
+    def gather(out):
+        if granularity == 'batch':
+            pbar.update()
+            return
+
+        batch_number, i, hostname, *record = out
+        g = grown[batch_number]
+        metrics = g['metrics']
+        (g['results'][i], metrics['wall_time'][i],
+         metrics['cpu_time'][i], metrics['peak_rss'][i]) = record
+        metrics['hostname'][i] = hostname
+        _checkpoint_case(g['ckpt'], i, record)
+
+        g['remaining'] -= 1
+        if (g['remaining'] == 0) and not g['failed']:
+            finish(batch_number)
+
+    def fail(batch_number):
+        if granularity == 'batch':
+            return
+
+        # keep checkpointing its cases still running, but never save it
+        grown[batch_number]['failed'] = True
+        remaining = [t for t in queue if t[0] != batch_number]
+        queue.clear()
+        queue.extend(remaining)
+
+    num_busy = 0
+    status = MPI.Status()
+    try:
+        # give every worker a first task
+        for worker in range(1, comm.Get_size()):
+            task = next_task()
+            if task is None:
+                break
+            comm.send(task, dest=worker, tag=_MPI_TAG_TASK)
+            num_busy += 1
+
+        while num_busy:
+            out = comm.recv(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG,
+                            status=status)
+            num_busy -= 1
+            worker = status.Get_source()
+
+            if status.Get_tag() == _MPI_TAG_ERROR:
+                batch_number, e = out
+                error = e if error is None else error
+                fail(batch_number)
+            else:
+                gather(out)
+
+            task = next_task()
+            if task is not None:
+                comm.send(task, dest=worker, tag=_MPI_TAG_TASK)
+                num_busy += 1
+    finally:
+        pbar.close()
+        for g in grown.values():
+            if g['ckpt'] is not None:
+                g['ckpt'].close()
+        for worker in range(1, comm.Get_size()):
+            comm.send(None, dest=worker, tag=_MPI_TAG_STOP)
+
+    if error is not None:
+        raise error
+
+
+def mpi_grow(crop, batch_ids=None, granularity='batch', fn=None, comm=None,
+             verbosity=1, checkpoint=None, errors='raise', retries=None,
+             timeout=None):
+    """Grow a crop using every process of an MPI allocation, e.g. launched
+    with ``mpiexec -n 4 python script.py``. Rank 0 hands out missing batches
+    - or individual cases - to the other ranks as soon as each becomes free,
+    so that one allocation can dynamically work through a whole crop.
+
+    Parameters
+    ----------
+    crop : Crop
+        The crop to grow, this should be sown already and visible to every
+        rank.
+    batch_ids : int or sequence of int, optional
+        Which batches to grow, defaults to all missing batches.
+    granularity : {'batch', 'case'}, optional
+        Whether to hand out whole batches, which each worker grows and saves
+        itself, or individual cases, whose results are gathered and saved by
+        rank 0. The latter balances the load better when there are few
+        batches of many cases.
+    fn : callable, optional
+        The function to use, otherwise loaded from disk.
+    comm : mpi4py.MPI.Comm, optional
+        The communicator to use, defaults to ``MPI.COMM_WORLD``.
+    verbosity : {0, 1}, optional
+        Whether to show progress on rank 0.
+    checkpoint : bool, optional
+        Whether to checkpoint each case as it is computed, see
+        :func:`~xyzpy.grow`. With ``granularity='case'``, rank 0 keeps the
+        checkpoint of each batch as it gathers the cases.
+    errors : {'raise', 'nan', 'retry'}, optional
+        What to do if a case raises an error, see :func:`~xyzpy.grow`. If an
+        error is raised, no new batches are started, but those already
+        started are finished - apart from the one that failed - before it
+        is raised on rank 0.
+    retries : int, optional
+        How many times to retry a case that raises an error.
+    timeout : float, optional
+        The maximum time in seconds for a single case.
+
+    Notes
+    -----
+    Requires ``mpi4py``. Every rank should call this function. With a single
+    process the batches are simply grown in turn.
+    """
+    from mpi4py import MPI
+
+    if granularity not in ('batch', 'case'):
+        raise ValueError("``granularity`` should be 'batch' or 'case', "
+                         "got {}.".format(granularity))
+
+    if comm is None:
+        comm = MPI.COMM_WORLD
+
+    rank = comm.Get_rank()
+
+    if batch_ids is None:
+        batch_ids = crop.missing_results() if rank == 0 else None
+        batch_ids = comm.bcast(batch_ids, root=0)
+    elif isinstance(batch_ids, numbers.Integral):
+        batch_ids = (batch_ids,)
+    batch_ids = tuple(batch_ids)
+
+    if comm.Get_size() == 1:
+        for batch_id in batch_ids:
+            grow(batch_id, crop=crop, fn=fn, check_mpi=False,
+                 verbosity=verbosity, checkpoint=checkpoint, errors=errors,
+                 retries=retries, timeout=timeout)
+        return
+
+    if rank == 0:
+        _mpi_dispatcher(comm, crop, batch_ids, granularity, verbosity,
+                        checkpoint)
+    else:
+        _mpi_worker(comm, crop, fn, granularity, checkpoint, errors,
+                    retries, timeout)
 
 
 # --------------------------------------------------------------------------- #
@@ -830,10 +2132,10 @@ class Reaper(object):
                  for i in range(1, num_batches + 1))
 
         def _load(x):
-            res = joblib.load(x)
+            res = _load_obj(x)
             if (res is None) or len(res) == 0:
                 raise ValueError("Something not right: result {} contains "
-                                 "no data upon joblib.load".format(x))
+                                 "no data upon loading".format(x))
             return res
 
         def wait_to_load(x):
@@ -860,11 +2162,312 @@ class Reaper(object):
             raise XYZError("Not all results reaped!")
 
 
+class DatasetReaper(object):
+    """Accumulate batches of results, in any order, directly into the
+    preallocated arrays of a dataset covering all the sown combos. Each
+    batch can be dropped as soon as it has been added.
+
+    Parameters
+    ----------
+    combos : tuple[tuple[str, list]]
+        The combos exactly as they were sown.
+    bounds : tuple[tuple[int, int]]
+        The flat case index range covered by each batch.
+    var_names : tuple[str] or (None,)
+        The output variable names, ``(None,)`` for labelled xarray output.
+    var_dims : dict
+        Mapping of output variables to their internal dimensions.
+    var_coords : dict
+        Mapping of internal dimensions to their coordinates.
+    constants : dict
+        Constants to record, as coordinates if they are internal dimensions
+        else as attributes.
+    attrs : dict
+        Extra attributes to record.
+    allow_missing : bool, optional
+        If True (the default), fill the dataset with missing data where
+        results have not been added yet, upcasting e.g. integers to floats.
+        If False, every result must be added, and the dataset keeps the
+        natural dtype of the results.
+    memmap_dir : str, optional
+        If given, allocate the arrays as memory-mapped ``.npy`` files in this
+        directory rather than in memory. Each reaper uses its own uniquely
+        named files, so several datasets can share the same directory.
+    name : str, optional
+        Name, such as the crop's, to prefix any memory-mapped files with.
+    """
+
+    def __init__(self, combos, bounds, var_names, var_dims,
+                 var_coords, constants, attrs, allow_missing=True,
+                 memmap_dir=None, name=None):
+        self.combos = combos
+        self.bounds = bounds
+        self.var_names = var_names
+        self.var_dims = var_dims
+        self.var_coords = var_coords
+        self.constants = constants
+        self.attrs = attrs
+        self.allow_missing = allow_missing
+        self.memmap_dir = memmap_dir
+        self._memmap_prefix = "{}-{}".format(name or 'reap',
+                                             uuid.uuid4().hex[:12])
+        self._memmap_files = {}
+
+        self.fn_args = tuple(x for x, _ in combos)
+        self.shape = tuple(len(x) for _, x in combos)
+        self.num_cases = prod(self.shape)
+        self.xobj_results = var_names == (None,)
+        self.reaped = set()
+        self.ds = None
+        self._flat_data = None
+        self._str_vars = set()
+        # the dtype each variable would have without any missing data
+        self._natural_dtypes = {}
+
+    def _new_array(self, name, shape, dtype):
+        if self.memmap_dir is None:
+            return np.empty(shape, dtype=dtype)
+
+        os.makedirs(self.memmap_dir, exist_ok=True)
+        fname = os.path.join(self.memmap_dir, "{}-{}-{}.npy".format(
+            self._memmap_prefix, name, np.dtype(dtype).name))
+        if os.path.exists(fname):
+            raise XYZError("Memory-mapped file {} already exists, refusing "
+                           "to overwrite it.".format(fname))
+        self._memmap_files[name] = fname
+        return np.lib.format.open_memmap(fname, mode='w+', dtype=dtype,
+                                         shape=shape)
+
+    def _recast(self, name, dtype):
+        """Replace the stored array of variable ``name`` with a copy of
+        ``dtype``, removing any memory-mapped file of the old one.
+        """
+        old_data = self.ds[name].data
+        old_fname = self._memmap_files.get(name)
+        data = self._new_array(name, old_data.shape, dtype)
+        data[...] = old_data
+        self._set_data(name, data)
+
+        # the old memory-mapped file is no longer referenced
+        if old_fname is not None:
+            del old_data
+            os.remove(old_fname)
+
+    def _set_data(self, name, data):
+        self.ds[name] = (self.fn_args + self.var_dims[name], data)
+        # make sure we write into exactly the array the dataset holds
+        data = self.ds[name].data
+        self._flat_data[name] = data.reshape((self.num_cases,) +
+                                             data.shape[len(self.shape):])
+
+    def _allocate(self, first_result):
+        """Allocate the full dataset based on the first result.
+        """
+        dim_constants = {k: v for k, v in self.constants.items()
+                         if any(k in dims for dims in self.var_dims.values())}
+
+        self.ds = xr.Dataset(
+            coords={**dict(self.combos), **self.var_coords, **dim_constants},
+            attrs={**self.attrs, **{k: v for k, v in self.constants.items()
+                                    if k not in dim_constants}})
+        self._flat_data = {}
+
+        for name, x in zip(self.var_names, first_result):
+            x = np.asarray(x)
+            shape = self.shape + x.shape
+            dtype = x.dtype
+
+            # fixed width strings might be too short for later results
+            if dtype.kind in 'SU':
+                self._str_vars.add(name)
+                dtype = object
+            self._natural_dtypes[name] = dtype
+
+            if self.allow_missing:
+                if dtype.kind == 'f':
+                    missing_dtype, missing = dtype, np.nan
+                elif dtype.kind == 'c':
+                    missing_dtype, missing = dtype, np.nan + np.nan * 1j
+                elif dtype.kind in 'iub':
+                    # upcast to a float that can hold NaN
+                    missing_dtype = np.result_type(dtype, float)
+                    missing = np.nan
+                else:
+                    missing_dtype, missing = object, None
+                data = self._new_array(name, shape, missing_dtype)
+                data[...] = missing
+            else:
+                data = self._new_array(name, shape, dtype)
+
+            self._set_data(name, data)
+
+    def _insert(self, name, start, stop, values):
+        """Insert the ``values`` of variable ``name`` for cases
+        ``start:stop``, upcasting the stored array if necessary.
+        """
+        flat = self._flat_data[name]
+
+        try:
+            array = np.asarray(values)
+            vectorized = array.shape == flat[start:stop].shape
+        except ValueError:
+            vectorized = False
+
+        if vectorized and flat.dtype != object:
+            self._natural_dtypes[name] = np.result_type(
+                self._natural_dtypes[name], array.dtype)
+            if not np.can_cast(array.dtype, flat.dtype, casting='safe'):
+                self._recast(name, np.result_type(array.dtype, flat.dtype))
+                flat = self._flat_data[name]
+
+            flat[start:stop] = array
+        else:
+            for i, x in enumerate(values, start):
+                flat[i] = x
+
+    def _add_xobj_batch(self, start, results):
+        """Label each xarray result with its combo and merge them in.
+        """
+        objs = []
+        for i, x in enumerate(results, start):
+            if isinstance(x, xr.DataArray):
+                x = x.to_dataset()
+            case = np.unravel_index(i, self.shape)
+            objs.append(x.expand_dims({
+                arg: [vals[j]] for (arg, vals), j in zip(self.combos, case)}))
+
+        batch_ds = xr.merge(objs)
+        self.ds = (batch_ds if self.ds is None else
+                   batch_ds.combine_first(self.ds))
+        return batch_ds
+
+    def add_batch(self, batch_id, results):
+        """Insert the results of a single batch.
+
+        Parameters
+        ----------
+        batch_id : int
+            The (1-based) batch number.
+        results : sequence
+            The results of each case in the batch.
+
+        Returns
+        -------
+        batch_ds : xarray.Dataset
+            The smallest block of the full dataset containing the new results.
+        """
+        start, stop = self.bounds[batch_id - 1]
+
+        if len(results) != stop - start:
+            raise XYZError("Result {} has {} cases, but {} were sown.".format(
+                batch_id, len(results), stop - start))
+
+        if self.xobj_results:
+            batch_ds = self._add_xobj_batch(start, results)
+            self.reaped.add(batch_id)
+            return batch_ds
+
+        if len(self.var_names) == 1:
+            results = tuple((r,) for r in results)
+
+        if self.ds is None:
+            self._allocate(results[0])
+
+        for k, name in enumerate(self.var_names):
+            self._insert(name, start, stop, [res[k] for res in results])
+
+        self.reaped.add(batch_id)
+
+        # find the block of the dataset that these cases live in
+        idxs = np.unravel_index(np.arange(start, stop), self.shape)
+        return self.ds.isel({arg: slice(ix.min(), ix.max() + 1)
+                             for arg, ix in zip(self.fn_args, idxs)})
+
+    def is_complete(self):
+        return len(self.reaped) == len(self.bounds)
+
+    def finalize(self):
+        """Check all results have been added and return the full dataset.
+        """
+        if not self.allow_missing and not self.is_complete():
+            raise XYZError("Not all results reaped!")
+
+        if not self.allow_missing:
+            for name in self._str_vars:
+                self._set_data(name, self.ds[name].data.astype(str))
+
+        elif self.is_complete() and not self.xobj_results:
+            # nothing is missing anymore, so undo any upcasting to hold NaN
+            for name, dtype in self._natural_dtypes.items():
+                if (dtype.kind in 'iub') and (self.ds[name].dtype != dtype):
+                    self._recast(name, dtype)
+
+        return self.ds
+
+
+_MAX_RESULT_LOAD_FAILURES = 10
+
+
+def _check_load_failure(failures, batch_id, file, error):
+    """Record that loading the result ``file`` of ``batch_id`` failed with
+    ``error``, raising once it has failed ``_MAX_RESULT_LOAD_FAILURES`` times
+    in a row without the file changing, i.e. it is not just still being
+    written but corrupt.
+    """
+    try:
+        st = os.stat(file)
+        sig = (st.st_size, st.st_mtime_ns)
+    except OSError:
+        sig = None
+
+    last_sig, count = failures.get(batch_id, (None, 0))
+    count = count + 1 if sig == last_sig else 1
+    failures[batch_id] = (sig, count)
+
+    if count >= _MAX_RESULT_LOAD_FAILURES:
+        raise XYZError("Could not load the result of batch {} from '{}' after "
+                       "{} attempts, it may be corrupt - see "
+                       "``Crop.check_bad``.".format(batch_id, file, count)
+                       ) from error
+
+
+class _ResultWatcher(object):
+    """Block until new files (probably) appear in ``directory``. Uses inotify
+    if the ``inotify_simple`` package is available, and otherwise simply
+    sleeps for ``poll_interval``. Since inotify cannot see changes made by
+    other hosts on network filesystems, ``rescan_interval`` caps how long
+    a single wait can block for.
+    """
+
+    def __init__(self, directory, poll_interval=0.2, rescan_interval=5.0):
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+
+        try:
+            from inotify_simple import INotify, flags
+            self._inotify = INotify()
+            self._inotify.add_watch(directory,
+                                    flags.CLOSE_WRITE | flags.MOVED_TO)
+        except (ImportError, OSError):
+            self._inotify = None
+
+    def wait(self):
+        if self._inotify is None:
+            sleep(self.poll_interval)
+        else:
+            self._inotify.read(timeout=int(1000 * self.rescan_interval))
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+
+
 # --------------------------------------------------------------------------- #
 #                     Automatic Batch Submission Scripts                      #
 # --------------------------------------------------------------------------- #
 
-_BASE_QSUB_SCRIPT = """#!/bin/bash -l
+_CLUSTER_SCRIPT_HEADERS = {
+    'sge': """#!/bin/bash -l
 #$ -S /bin/bash
 #$ -l h_rt={hours}:{minutes}:{seconds},mem={gigabytes}G
 #$ -l tmpfs={temp_gigabytes}G
@@ -874,47 +2477,142 @@ mkdir -p {output_directory}
 #$ -wd {output_directory}
 #$ -pe {pe} {num_procs}
 #$ -t {run_start}-{run_stop}
-cd {working_directory}
+""",
+    'slurm': """#!/bin/bash -l
+#SBATCH --job-name={name}
+#SBATCH --time={hours:02d}:{minutes:02d}:{seconds:02d}
+#SBATCH --mem={gigabytes}G
+#SBATCH --ntasks={num_tasks}
+#SBATCH --cpus-per-task={num_threads}
+#SBATCH --output={output_directory}/%x.o%A.%a
+#SBATCH --array={run_start}-{run_stop}
+{extra_resources}
+mkdir -p {output_directory}
+""",
+    'pbs': """#!/bin/bash -l
+#PBS -N {name}
+#PBS -l walltime={hours:02d}:{minutes:02d}:{seconds:02d}
+#PBS -l select=1:ncpus={num_procs}:mpiprocs={num_tasks}:mem={gigabytes}gb
+#PBS -J {run_start}-{run_stop}
+#PBS -j oe
+#PBS -o {output_directory}
+{extra_resources}
+mkdir -p {output_directory}
+""",
+    'torque': """#!/bin/bash -l
+#PBS -N {name}
+#PBS -l walltime={hours:02d}:{minutes:02d}:{seconds:02d}
+#PBS -l nodes=1:ppn={num_procs},mem={gigabytes}gb
+#PBS -t {run_start}-{run_stop}
+#PBS -j oe
+#PBS -o {output_directory}
+{extra_resources}
+mkdir -p {output_directory}
+""",
+    'local': """#!/bin/bash
+mkdir -p {output_directory}
+for XYZ_TASK_ID in $(seq {run_start} {run_stop}); do
+while [ $(jobs -rp | wc -l) -ge {num_workers} ]; do sleep 0.1; done
+(
+""",
+}
+
+# the environment variable holding the array task index for each scheduler
+_CLUSTER_TASK_IDS = {
+    'sge': '$SGE_TASK_ID',
+    'slurm': '$SLURM_ARRAY_TASK_ID',
+    'pbs': '$PBS_ARRAY_INDEX',
+    'torque': '$PBS_ARRAYID',
+    'local': '$XYZ_TASK_ID',
+}
+
+_CLUSTER_EXTRA_RESOURCES = {
+    'sge': '#$ -l {}',
+    'slurm': '#SBATCH {}',
+    'pbs': '#PBS -l {}',
+    'torque': '#PBS -l {}',
+    'local': '',
+}
+
+_CLUSTER_SUBMIT_CMDS = {
+    'sge': 'qsub',
+    'slurm': 'sbatch',
+    'pbs': 'qsub',
+    'torque': 'qsub',
+}
+
+_CLUSTER_SCRIPT_BODY = """cd {working_directory}
 export OMP_NUM_THREADS={num_threads}
 tmpfile=$(mktemp .xyzpy-qsub.XXXXXXXX)
 cat <<EOF > $tmpfile
 {setup}
-from xyzpy.gen.batch import grow, Crop
+from xyzpy.gen.batch import grow, Crop, _load_fn
 crop = Crop(name='{name}')
-"""
-
-_QSUB_GROW_ALL_SCRIPT = """grow($SGE_TASK_ID, crop=crop, debugging={debugging})
-"""
-
-_QSUB_GROW_PARTIAL_SCRIPT = """batch_ids = {batch_ids}
-grow(batch_ids[$SGE_TASK_ID - 1], crop=crop, debugging={debugging})
-"""
-
-_BASE_QSUB_SCRIPT_END = """EOF
+fn = _load_fn(crop.location)
+batch_ids = {batch_ids}
+task_id = {task_id}
+for batch_id in batch_ids[(task_id - 1) * {batches_per_task}:
+                          task_id * {batches_per_task}]:
+    grow(batch_id, crop=crop, fn=fn, debugging={debugging})
+EOF
 {launcher} $tmpfile
 rm $tmpfile
 """
 
+_LOCAL_SCRIPT_END = """) > {output_directory}/{name}.o.$XYZ_TASK_ID 2>&1 &
+done
+wait
+"""
 
-def gen_qsub_script(crop, batch_ids=None, *,
-                    hours=None,
-                    minutes=None,
-                    seconds=None,
-                    gigabytes=2,
-                    num_procs=1,
-                    launcher='python',
-                    setup="",
-                    mpi=False,
-                    temp_gigabytes=1,
-                    output_directory=None,
-                    extra_resources=None,
-                    debugging=False):
-    """Generate a qsub script to grow a Crop.
+
+def _choose_batches_per_task(crop, batch_ids, target_walltime):
+    """Find how many consecutive ``batch_ids`` can be grown by a single task
+    whilst keeping it expected to finish within ``target_walltime`` seconds.
+    """
+    if crop._batch_costs is None:
+        raise XYZError("Can only derive ``batches_per_task`` from a target "
+                       "walltime if the crop was sown with ``costs``.")
+
+    costs = [crop._batch_costs[i - 1] for i in batch_ids]
+
+    def max_task_cost(k):
+        return max(sum(costs[j:j + k]) for j in range(0, len(costs), k))
+
+    # the most expensive task only gets more expensive as k increases
+    k = 1
+    while (k < len(costs)) and (max_task_cost(k + 1) <= target_walltime):
+        k += 1
+
+    return k
+
+
+def gen_cluster_script(crop, scheduler='sge', batch_ids=None, *,
+                       hours=None,
+                       minutes=None,
+                       seconds=None,
+                       gigabytes=2,
+                       num_procs=1,
+                       launcher='python',
+                       setup="",
+                       mpi=False,
+                       temp_gigabytes=1,
+                       output_directory=None,
+                       extra_resources=None,
+                       debugging=False,
+                       batches_per_task=1,
+                       target_walltime=None,
+                       num_workers=None):
+    """Generate a script to grow a Crop as an array job on a cluster
+    scheduler, or as background processes on the local machine.
 
     Parameters
     ----------
     crop : Crop
         The crop to grow.
+    scheduler : {'sge', 'slurm', 'pbs', 'torque', 'local'}, optional
+        Which scheduler to generate the script for. ``'pbs'`` is for PBS Pro
+        and ``'torque'`` for Torque style array jobs, whereas ``'local'``
+        generates a bash script running each task as a background process.
     batch_ids : int or tuple[int]
         Which batch numbers to grow, defaults to all missing batches.
     hours : int
@@ -937,45 +2635,69 @@ def gen_qsub_script(crop, batch_ids=None, *,
     mpi : bool, optional
         Request MPI processes not threaded processes.
     temp_gigabytes : int, optional
-        How much temporary on-disk memory.
+        How much temporary on-disk memory (SGE only).
     output_directory : str, optional
-        What directory to write output to. Defaults to "$HOME/Scratch/output".
+        What directory to write output to. Defaults to "$HOME/Scratch/output",
+        or a 'logs' folder inside the crop for the local scheduler.
     extra_resources : str, optional
-        Extra "#$ -l" resources, e.g. 'gpu=1'
+        Extra resources to request, e.g. 'gpu=1' for SGE or '--gres=gpu:1'
+        for SLURM.
     debugging : bool, optional
         Set the python log level to debugging.
+    batches_per_task : int, optional
+        How many batches each array task should grow, one after another.
+        Packing several batches into each task means fewer, longer tasks for
+        the scheduler to handle, and the function is only loaded once per
+        task.
+    target_walltime : float, optional
+        If given, and the crop was sown with ``costs`` in seconds, derive
+        ``batches_per_task`` such that each task is expected to take at most
+        roughly this many seconds.
+    num_workers : int, optional
+        For the local scheduler, how many tasks to run at once, defaults to
+        the number of cpus.
 
     Returns
     -------
     str
+
+    Notes
+    -----
+    If no time is given and the crop was sown with ``costs``, the time
+    requested is estimated using :meth:`~xyzpy.Crop.estimate_walltime`,
+    otherwise it defaults to one hour.
     """
-    if hours is minutes is seconds is None:
-        hours, minutes, seconds = 1, 0, 0
-    else:
+    if scheduler not in _CLUSTER_SCRIPT_HEADERS:
+        raise ValueError("Unknown scheduler '{}', should be one of {}."
+                         "".format(scheduler, tuple(_CLUSTER_SCRIPT_HEADERS)))
+
+    auto_time = hours is minutes is seconds is None
+    if not auto_time:
         hours = 0 if hours is None else int(hours)
         minutes = 0 if minutes is None else int(minutes)
         seconds = 0 if seconds is None else int(seconds)
 
-    if output_directory is None:
-        from os.path import expanduser
-        home = expanduser("~")
-        output_directory = os.path.join(home, 'Scratch', 'output')
+    output_directory = _cluster_output_directory(crop, scheduler,
+                                                 output_directory)
+
+    if num_workers is None:
+        num_workers = os.cpu_count()
 
     crop.calc_progress()
 
     if extra_resources is None:
         extra_resources = ""
     else:
-        extra_resources = "#$ -l {}".format(extra_resources)
+        extra_resources = _CLUSTER_EXTRA_RESOURCES[scheduler].format(
+            extra_resources)
 
     opts = {
-        'hours': hours,
-        'minutes': minutes,
-        'seconds': seconds,
         'gigabytes': gigabytes,
         'name': crop.name,
         'num_procs': num_procs,
         'num_threads': 1 if mpi else num_procs,
+        'num_tasks': num_procs if mpi else 1,
+        'num_workers': num_workers,
         'run_start': 1,
         'launcher': launcher,
         'setup': setup,
@@ -985,34 +2707,207 @@ def gen_qsub_script(crop, batch_ids=None, *,
         'working_directory': crop.parent_dir,
         'extra_resources': extra_resources,
         'debugging': debugging,
+        'task_id': _CLUSTER_TASK_IDS[scheduler],
+        'batches_per_task': batches_per_task,
     }
 
-    script = _BASE_QSUB_SCRIPT
-
     # grow specific ids
     if batch_ids is not None:
-        script += _QSUB_GROW_PARTIAL_SCRIPT
+        if isinstance(batch_ids, numbers.Integral):
+            batch_ids = (batch_ids,)
         batch_ids = tuple(batch_ids)
-        opts['run_stop'] = len(batch_ids)
         opts['batch_ids'] = batch_ids
 
     # grow all ids
     elif crop.num_results == 0:
-        script += _QSUB_GROW_ALL_SCRIPT
-        opts['run_stop'] = crop.num_batches
+        batch_ids = range(1, crop.num_batches + 1)
+        opts['batch_ids'] = "range(1, {})".format(crop.num_batches + 1)
 
     # grow missing ids only
     else:
-        script += _QSUB_GROW_PARTIAL_SCRIPT
         batch_ids = crop.missing_results()
-        opts['run_stop'] = len(batch_ids)
         opts['batch_ids'] = batch_ids
 
-    script += _BASE_QSUB_SCRIPT_END
+    if target_walltime is not None:
+        batches_per_task = _choose_batches_per_task(
+            crop, batch_ids, target_walltime)
+        opts['batches_per_task'] = batches_per_task
+
+    opts['run_stop'] = math.ceil(len(batch_ids) / batches_per_task)
+
+    if auto_time:
+        if crop._batch_costs is not None:
+            walltime = math.ceil(crop.estimate_walltime(
+                batch_ids, batches_per_task=batches_per_task))
+            minutes, seconds = divmod(walltime, 60)
+            hours, minutes = divmod(minutes, 60)
+        else:
+            hours, minutes, seconds = 1, 0, 0
+
+    opts['hours'] = hours
+    opts['minutes'] = minutes
+    opts['seconds'] = seconds
+
+    script = _CLUSTER_SCRIPT_HEADERS[scheduler] + _CLUSTER_SCRIPT_BODY
+    if scheduler == 'local':
+        script += _LOCAL_SCRIPT_END
 
     return script.format(**opts)
 
 
+def _cluster_output_directory(crop, scheduler, output_directory=None):
+    """Get the directory the logs of a cluster job will be written to.
+    """
+    if output_directory is not None:
+        return output_directory
+
+    if scheduler == 'local':
+        return os.path.join(crop.location, 'logs')
+
+    from os.path import expanduser
+    home = expanduser("~")
+    return os.path.join(home, 'Scratch', 'output')
+
+
+def grow_cluster(crop, scheduler='sge', batch_ids=None, **script_opts):
+    """Automagically submit an array job to a cluster scheduler - or launch
+    local background processes - to grow all missing results.
+
+    Parameters
+    ----------
+    crop : Crop
+        The crop to grow.
+    scheduler : {'sge', 'slurm', 'pbs', 'torque', 'local'}, optional
+        Which scheduler to submit to.
+    batch_ids : int or tuple[int]
+        Which batch numbers to grow, defaults to all missing batches.
+    script_opts
+        Supplied to :func:`~xyzpy.gen.batch.gen_cluster_script`.
+
+    Returns
+    -------
+    subprocess.Popen or None
+        For the local scheduler, the process growing the batches, which can
+        be waited on.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If the submission command fails, in which case the script is left in
+        the crop directory for inspection.
+    """
+    if crop.is_ready_to_reap():
+        print("Crop ready to reap: nothing to submit.")
+        return
+
+    import subprocess
+
+    script = gen_cluster_script(crop, scheduler, batch_ids, **script_opts)
+
+    script_file = os.path.join(crop.location,
+                               "__{}_script__.sh".format(scheduler))
+
+    with open(script_file, mode='w') as f:
+        f.write(script)
+
+    # the scheduler opens the log files before the script itself runs
+    os.makedirs(_cluster_output_directory(
+        crop, scheduler, script_opts.get('output_directory', None)),
+        exist_ok=True)
+
+    if scheduler == 'local':
+        # the script is read as it runs, so leave it in place
+        return subprocess.Popen(['bash', script_file])
+
+    subprocess.run([_CLUSTER_SUBMIT_CMDS[scheduler], script_file],
+                   check=True)
+
+    os.remove(script_file)
+
+
+def gen_qsub_script(crop, batch_ids=None, *,
+                    hours=None,
+                    minutes=None,
+                    seconds=None,
+                    gigabytes=2,
+                    num_procs=1,
+                    launcher='python',
+                    setup="",
+                    mpi=False,
+                    temp_gigabytes=1,
+                    output_directory=None,
+                    extra_resources=None,
+                    debugging=False,
+                    batches_per_task=1,
+                    target_walltime=None):
+    """Generate a qsub script to grow a Crop.
+
+    Parameters
+    ----------
+    crop : Crop
+        The crop to grow.
+    batch_ids : int or tuple[int]
+        Which batch numbers to grow, defaults to all missing batches.
+    hours : int
+        How many hours to request, default=0.
+    minutes : int, optional
+        How many minutes to request, default=20.
+    seconds : int, optional
+        How many seconds to request, default=0.
+    gigabytes : int, optional
+        How much memory to request, default: 2.
+    num_procs : int, optional
+        How many processes to request (threaded cores or MPI), default: 1.
+    launcher : str, optional
+        How to launch the script, default: ``'python'``. But could for example
+        be ``'mpiexec python'`` for a MPI program.
+    setup : str, optional
+        Python script to run before growing, for things that shouldnt't be put
+        in the crop function itself, e.g. one-time imports with side-effects
+        like: ``"import tensorflow as tf; tf.enable_eager_execution()``".
+    mpi : bool, optional
+        Request MPI processes not threaded processes.
+    temp_gigabytes : int, optional
+        How much temporary on-disk memory.
+    output_directory : str, optional
+        What directory to write output to. Defaults to "$HOME/Scratch/output".
+    extra_resources : str, optional
+        Extra "#$ -l" resources, e.g. 'gpu=1'
+    debugging : bool, optional
+        Set the python log level to debugging.
+    batches_per_task : int, optional
+        How many batches each array task should grow.
+    target_walltime : float, optional
+        Derive ``batches_per_task`` from this many seconds per task, if the
+        crop was sown with ``costs``.
+
+    Returns
+    -------
+    str
+
+    See Also
+    --------
+    gen_cluster_script
+    """
+    return gen_cluster_script(
+        crop, 'sge', batch_ids,
+        hours=hours,
+        minutes=minutes,
+        seconds=seconds,
+        gigabytes=gigabytes,
+        num_procs=num_procs,
+        launcher=launcher,
+        setup=setup,
+        mpi=mpi,
+        temp_gigabytes=temp_gigabytes,
+        output_directory=output_directory,
+        extra_resources=extra_resources,
+        debugging=debugging,
+        batches_per_task=batches_per_task,
+        target_walltime=target_walltime,
+    )
+
+
 def qsub_grow(crop, batch_ids=None, *,
               hours=None,
               minutes=None,
@@ -1025,7 +2920,9 @@ def qsub_grow(crop, batch_ids=None, *,
               temp_gigabytes=1,
               output_directory=None,
               extra_resources=None,
-              debugging=False):  # pragma: no cover
+              debugging=False,
+              batches_per_task=1,
+              target_walltime=None):  # pragma: no cover
     """Automagically submit SGE jobs to grow all missing results.
 
     Parameters
@@ -1061,15 +2958,14 @@ def qsub_grow(crop, batch_ids=None, *,
         Extra "#$ -l" resources, e.g. 'gpu=1'
     debugging : bool, optional
         Set the python log level to debugging.
+    batches_per_task : int, optional
+        How many batches each array task should grow.
+    target_walltime : float, optional
+        Derive ``batches_per_task`` from this many seconds per task, if the
+        crop was sown with ``costs``.
     """
-    if crop.is_ready_to_reap():
-        print("Crop ready to reap: nothing to submit.")
-        return
-
-    import subprocess
-
-    script = gen_qsub_script(
-        crop,
+    grow_cluster(
+        crop, 'sge',
         batch_ids=batch_ids,
         hours=hours,
         minutes=minutes,
@@ -1083,17 +2979,13 @@ def qsub_grow(crop, batch_ids=None, *,
         mpi=mpi,
         extra_resources=extra_resources,
         debugging=debugging,
+        batches_per_task=batches_per_task,
+        target_walltime=target_walltime,
     )
 
-    script_file = os.path.join(crop.location, "__qsub_script__.sh")
-
-    with open(script_file, mode='w') as f:
-        f.write(script)
-
-    subprocess.run(['qsub', script_file])
-
-    os.remove(script_file)
-
 
 Crop.gen_qsub_script = gen_qsub_script
 Crop.qsub_grow = qsub_grow
+Crop.gen_cluster_script = gen_cluster_script
+Crop.grow_cluster = grow_cluster
+Crop.mpi_grow = mpi_grow
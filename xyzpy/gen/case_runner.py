@@ -21,7 +21,7 @@ from .prepare import (
 )
 
 
-from .combo_runner import _combo_runner
+from .combo_runner import _combo_runner, _missing_result
 
 
 class SingleArgFn:
@@ -39,6 +39,12 @@ def _case_runner(fn, fn_args, cases, constants,
                  num_workers=None,
                  executor=None,
                  verbosity=1,
+                 errors='raise',
+                 retries=None,
+                 timeout=None,
+                 return_errors=False,
+                 events=None,
+                 fill=None,
                  pool=None):
     """Core case runner, i.e. without parsing of arguments.
     """
@@ -58,7 +64,14 @@ def _case_runner(fn, fn_args, cases, constants,
                          parallel=parallel,
                          num_workers=num_workers,
                          executor=executor,
-                         verbosity=verbosity)
+                         verbosity=verbosity,
+                         errors=errors,
+                         retries=retries,
+                         timeout=timeout,
+                         return_errors=return_errors,
+                         events=events,
+                         events_source='case_runner',
+                         fill=fill)
 
 
 def case_runner(fn, fn_args, cases,
@@ -68,6 +81,10 @@ def case_runner(fn, fn_args, cases,
                 executor=None,
                 num_workers=None,
                 verbosity=1,
+                errors='raise',
+                retries=None,
+                timeout=None,
+                events=None,
                 pool=None):
     """Evaluate a function in many different configurations, optionally in
     parallel and or with live progress.
@@ -92,6 +109,15 @@ def case_runner(fn, fn_args, cases,
         See :func:`~xyzpy.combo_runner`.
     verbosity : {0, 1, 2}, optional
         See :func:`~xyzpy.combo_runner`.
+    errors : {'raise', 'nan', 'retry'}, optional
+        See :func:`~xyzpy.combo_runner`.
+    retries : int, optional
+        See :func:`~xyzpy.combo_runner`.
+    timeout : float, optional
+        See :func:`~xyzpy.combo_runner`.
+    events : EventSink, str, callable or sequence of these, optional
+        See :func:`~xyzpy.combo_runner`. Each case is reported as the
+        ``dict`` of its arguments.
 
     Returns
     -------
@@ -110,7 +136,11 @@ def case_runner(fn, fn_args, cases,
                         parallel=parallel,
                         num_workers=num_workers,
                         executor=executor,
-                        verbosity=verbosity)
+                        verbosity=verbosity,
+                        errors=errors,
+                        retries=retries,
+                        timeout=timeout,
+                        events=events)
 
 
 def find_union_coords(cases):
@@ -124,6 +154,19 @@ def find_union_coords(cases):
             yield list(set(x))
 
 
+def _missing_data(shape, var_type):
+    """Make an array of shape ``shape`` filled with the missing value
+    appropriate for ``var_type``.
+    """
+    if var_type == int or var_type == float:
+        # Warn about upcasting int to float?
+        return np.tile(np.nan, shape)
+    elif var_type == complex:
+        return np.tile(np.nan + np.nan * 1.0j, shape)
+    else:
+        return np.tile(None, shape).astype(object)
+
+
 def all_missing_ds(coords, var_names, all_dims, var_types, attrs=None):
     """Make a dataset whose data is all missing.
 
@@ -144,15 +187,41 @@ def all_missing_ds(coords, var_names, all_dims, var_types, attrs=None):
     for v_name, v_dims, v_type in zip(var_names, all_dims, var_types):
 
         shape = tuple(ds[d].size for d in v_dims)
+        ds[v_name] = (v_dims, _missing_data(shape, v_type))
+
+    return ds
+
 
-        if v_type == int or v_type == float:
-            # Warn about upcasting int to float?
-            nodata = np.tile(np.nan, shape)
-        elif v_type == complex:
-            nodata = np.tile(np.nan + np.nan * 1.0j, shape)
-        else:
-            nodata = np.tile(None, shape).astype(object)
-        ds[v_name] = (v_dims, nodata)
+def _set_case_errors(ds, fn_args, cases, case_errors):
+    """Record the error message, or ``None``, of each case in the
+    ``'__error__'`` variable of ``ds``.
+    """
+    if isinstance(cases[0], dict):
+        fn_args = tuple(cases[0].keys())
+        cases = tuple(tuple(c[a] for a in fn_args) for c in cases)
+
+    if '__error__' in ds:
+        dims = ds['__error__'].dims
+        errors = ds['__error__'].values.copy()
+    else:
+        dims = tuple(fn_args)
+        errors = np.full(tuple(ds[arg].size for arg in dims), None,
+                         dtype=object)
+
+    # find the position of every case along each dimension in one go
+    values = dict(zip(fn_args, zip(*cases)))
+    ix = []
+    for dim in dims:
+        dim_ix = ds.indexes[dim].get_indexer(list(values[dim]))
+        if (dim_ix < 0).any():
+            raise KeyError("Not all cases found along dimension "
+                           "'{}'.".format(dim))
+        ix.append(dim_ix)
+
+    messages = np.empty(len(cases), dtype=object)
+    messages[:] = case_errors
+    errors[tuple(ix)] = messages
+    ds['__error__'] = (dims, errors)
 
     return ds
 
@@ -318,9 +387,11 @@ def case_runner_to_ds(fn, fn_args, cases, var_names,
         var_coords = _parse_var_coords(var_coords)
 
     # Generate results
-    results = _case_runner(fn, fn_args, cases,
-                           constants={**constants, **resources},
-                           **case_runner_settings)
+    fill = _missing_result(var_names, var_dims, var_coords, constants)
+    results, case_errors = _case_runner(fn, fn_args, cases,
+                                        constants={**constants, **resources},
+                                        return_errors=True, fill=fill,
+                                        **case_runner_settings)
 
     if to_df:
         # Convert to pandas.DataFrame
@@ -330,6 +401,8 @@ def case_runner_to_ds(fn, fn_args, cases, var_names,
                           var_coords=var_coords,
                           constants=constants,
                           attrs=attrs)
+        if case_errors is not None:
+            ds['__error__'] = case_errors
     else:
         # Convert to xarray.Dataset
         ds = _cases_to_ds(results, fn_args, cases,
@@ -340,6 +413,9 @@ def case_runner_to_ds(fn, fn_args, cases, var_names,
                           attrs=attrs,
                           add_to_ds=add_to_ds,
                           overwrite=overwrite)
+        if (case_errors is not None) or ('__error__' in ds):
+            case_errors = case_errors or (None,) * len(cases)
+            ds = _set_case_errors(ds, fn_args, cases, case_errors)
     return ds
 
 
@@ -366,6 +442,11 @@ def find_missing_cases(ds, ignore_dims=None, show_progbar=False):
     -------
     missing_fn_args, missing_cases :
         Function arguments and missing cases.
+
+    Notes
+    -----
+    Any ``'__error__'`` variable, recording cases which failed, is ignored,
+    such that failed cases count as missing.
     """
     # Parse ignore_dims
     ignore_dims = ({ignore_dims} if isinstance(ignore_dims, str) else
@@ -373,7 +454,7 @@ def find_missing_cases(ds, ignore_dims=None, show_progbar=False):
 
     # Find all configurations
     fn_args = tuple(coo for coo in ds.dims if coo not in ignore_dims)
-    var_names = tuple(ds.data_vars)
+    var_names = tuple(v for v in ds.data_vars if v != '__error__')
     all_cases = itertools.product(*(ds[arg].data for arg in fn_args))
 
     # Only return those corresponding to all missing data
@@ -426,13 +507,22 @@ def fill_missing_cases(ds, fn, var_names,
     fn_args, missing_cases = find_missing_cases(ds, ignore_dims=ignore_dims)
 
     # Generate missing results
-    results = _case_runner(fn, fn_args, missing_cases,
-                           constants={**constants, **resources},
-                           **case_runner_settings)
+    fill = _missing_result(var_names, var_dims, var_coords, constants)
+    results, case_errors = _case_runner(fn, fn_args, missing_cases,
+                                        constants={**constants, **resources},
+                                        return_errors=True, fill=fill,
+                                        **case_runner_settings)
 
     # Add to dataset
-    return _cases_to_ds(results, fn_args, missing_cases,
-                        var_names=var_names,
-                        var_dims=var_dims,
-                        var_coords=var_coords,
-                        add_to_ds=ds)
+    ds = _cases_to_ds(results, fn_args, missing_cases,
+                      var_names=var_names,
+                      var_dims=var_dims,
+                      var_coords=var_coords,
+                      add_to_ds=ds)
+
+    # record any new errors, and clear those of cases now filled
+    if (case_errors is not None) or ('__error__' in ds):
+        case_errors = case_errors or (None,) * len(missing_cases)
+        ds = _set_case_errors(ds, fn_args, missing_cases, case_errors)
+
+    return ds
@@ -1,7 +1,16 @@
 """Functions for systematically evaluating a function over all combinations.
 """
 import functools
+import itertools
 import multiprocessing
+import concurrent.futures as cf
+import contextlib
+import os
+import signal
+import tempfile
+import threading
+import warnings
+from time import sleep, time, perf_counter
 
 import numpy as np
 import xarray as xr
@@ -13,6 +22,7 @@ from ..utils import (
     prod,
     progbar,
     _choose_executor_depr_pool,
+    RunningArrayStatistics,
 )
 from .prepare import (
     _parse_var_names,
@@ -23,6 +33,7 @@ from .prepare import (
     _parse_combos,
     _parse_combo_results,
 )
+from .events import _parse_events, _RunMonitor, _monitoring
 
 
 def _submit(executor, fn, *args, **kwds):
@@ -125,8 +136,521 @@ def nested_get(futures, ndim, getter):
             tuple(nested_get(fut, ndim - 1, getter) for fut in futures))
 
 
+def _future_done(future):
+    """Check if any kind of future has finished.
+    """
+    try:
+        return future.done()
+    except AttributeError:
+        # multiprocessing like API
+        return future.ready()
+
+
+def _cancel_future(future):
+    """Cancel any kind of future, if it supports it and hasn't started.
+    """
+    for method in ('cancel', 'abort'):
+        if hasattr(future, method):
+            try:
+                getattr(future, method)()
+            except Exception:
+                pass
+            return
+
+
+def _as_completed(futures, poll_interval=0.01):
+    """Yield ``(i, futures[i])`` for each future, in the order they complete,
+    using ``concurrent.futures.as_completed`` if possible, else polling.
+    """
+    if all(isinstance(f, cf.Future) for f in futures):
+        index = {f: i for i, f in enumerate(futures)}
+        for f in cf.as_completed(futures):
+            yield index[f], f
+        return
+
+    pending = dict(enumerate(futures))
+    while pending:
+        done = [i for i, f in pending.items() if _future_done(f)]
+        if not done:
+            sleep(poll_interval)
+        for i in done:
+            yield i, pending.pop(i)
+
+
+def _nan_like(x):
+    """Generate missing data with the same structure as the result ``x``.
+    """
+    if isinstance(x, _Timed):
+        return _nan_like(x.result)
+
+    if isinstance(x, tuple):
+        return tuple(_nan_like(y) for y in x)
+
+    if isinstance(x, (xr.Dataset, xr.DataArray)):
+        return xr.full_like(x, np.nan, dtype=float)
+
+    try:
+        x = np.asarray(x)
+    except Exception:
+        return np.nan
+
+    nan = np.nan + 1j * np.nan if np.iscomplexobj(x) else np.nan
+    return np.full(x.shape, nan) if x.ndim else nan
+
+
+_MISSING = object()
+
+
+def _fill_interrupted(results):
+    """Warn about, and fill with NaN, the results still missing after an
+    interrupt.
+    """
+    num_missing = sum(r is _MISSING for r in results)
+    warnings.warn("Interrupted: returning partial results with {} of {} "
+                  "missing, filled with NaN.".format(num_missing,
+                                                     len(results)))
+    fill = _nan_like(next((r for r in results if r is not _MISSING),
+                          np.nan))
+    return [fill if r is _MISSING else r for r in results]
+
+
+def _gather_in_completion_order(futures, combos, pbar, on_cancel=None,
+                                on_result=None):
+    """Retrieve the results of the nested ``futures`` as they complete,
+    updating ``pbar`` and calling ``on_result(i, result)`` if given. On the
+    first exception every outstanding future is cancelled before re-raising.
+    On a ``KeyboardInterrupt`` they are also cancelled, but the results
+    gathered so far are returned, with the missing ones filled with NaN.
+    """
+    shape = tuple(len(vals) for _, vals in combos)
+    flat = list(flatten(futures, len(shape)))
+    results = [_MISSING] * len(flat)
+    getter = default_getter()
+
+    def cancel_all():
+        for f in flat:
+            _cancel_future(f)
+        if on_cancel is not None:
+            on_cancel()
+
+    try:
+        for i, f in _as_completed(flat):
+            results[i] = getter(f)
+            pbar.update()
+            if on_result is not None:
+                on_result(i, results[i])
+
+    except KeyboardInterrupt:
+        cancel_all()
+        results = _fill_interrupted(results)
+
+    except BaseException:
+        cancel_all()
+        raise
+
+    return _nest(results, shape)
+
+
+# the least time a case can run for before its worker is killed, so that a
+#     short ``timeout`` can't leave slow but healthy cases repeatedly killed
+_HARD_TIMEOUT_MIN = 5.0
+
+
+def _run_case_marked(fn, marker, kwargs):
+    """Run a single case in a worker, first recording the time it actually
+    started in the file ``marker``.
+    """
+    with open(marker, 'w') as f:
+        f.write(repr(time()))
+    return fn(**kwargs)
+
+
+def _case_start_time(marker):
+    """Read the time a case started in its worker, or ``None`` if it hasn't
+    yet.
+    """
+    try:
+        with open(marker) as f:
+            return float(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _gather_with_hard_timeout(fn, combos, constants, num_workers, timeout,
+                              pbar, poll_interval=0.1, on_result=None):
+    """Run all combos on the loky executor, as they complete, killing the
+    workers if any case runs for more than twice ``timeout``, or
+    ``_HARD_TIMEOUT_MIN`` if longer - i.e. it is stuck somewhere the
+    in-worker soft timeout can't interrupt. The clock for each case starts
+    only once a worker has actually begun it, so time spent queued or
+    spawning workers doesn't count. Such cases are marked as failed and every
+    other unfinished case is resubmitted to a fresh set of workers.
+    """
+    shape = tuple(len(vals) for _, vals in combos)
+    args = tuple(arg for arg, _ in combos)
+    cases = [dict(zip(args, vals))
+             for vals in itertools.product(*(vals for _, vals in combos))]
+    results = [_MISSING] * len(cases)
+
+    limit = max(2 * timeout, _HARD_TIMEOUT_MIN)
+
+    marker_dir = tempfile.TemporaryDirectory(prefix='xyzpy-timeout-')
+    markers = [os.path.join(marker_dir.name, str(i))
+               for i in range(len(cases))]
+
+    def submit_all(idxs):
+        executor = loky.get_reusable_executor(num_workers)
+        futures = {}
+        for i in idxs:
+            # clear any start time left by a killed attempt
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(markers[i])
+            futures[executor.submit(_run_case_marked, fn, markers[i],
+                                    {**constants, **cases[i]})] = i
+        return executor, futures
+
+    executor, futures = submit_all(range(len(cases)))
+    started = {}
+
+    try:
+        while futures:
+            done, _ = cf.wait(futures, timeout=poll_interval,
+                              return_when=cf.FIRST_COMPLETED)
+            for f in done:
+                i = futures.pop(f)
+                results[i] = f.result()
+                pbar.update()
+                if on_result is not None:
+                    on_result(i, results[i])
+
+            now = time()
+            stuck = []
+            for f, i in futures.items():
+                if f.running() and (f not in started):
+                    t0 = _case_start_time(markers[i])
+                    if t0 is not None:
+                        started[f] = t0
+                if (f in started) and (now - started[f] > limit):
+                    stuck.append(f)
+
+            if stuck:
+                for f in stuck:
+                    i = futures.pop(f)
+                    results[i] = _CaseError(CaseTimeoutError(
+                        "case {} killed after {:.1f}s.".format(cases[i],
+                                                               limit)))
+                    pbar.update()
+                    if on_result is not None:
+                        on_result(i, results[i])
+
+                executor.shutdown(wait=False, kill_workers=True)
+                executor, futures = submit_all(futures.values())
+                started = {}
+
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, kill_workers=True)
+        results = _fill_interrupted(results)
+
+    except BaseException:
+        executor.shutdown(wait=False, kill_workers=True)
+        raise
+
+    finally:
+        marker_dir.cleanup()
+
+    return _nest(results, shape)
+
+
+class _CaseError:
+    """Marker for the result of a case which raised an error.
+    """
+
+    def __init__(self, error):
+        self.error = "{}: {}".format(type(error).__name__, error)
+
+
+class CaseTimeoutError(Exception):
+    """A single case ran for longer than its ``timeout``.
+    """
+
+
+@contextlib.contextmanager
+def _soft_timeout(timeout):
+    """Raise ``CaseTimeoutError`` inside the managed block if it runs for
+    longer than ``timeout`` seconds. Relies on ``SIGALRM``, so only has an
+    effect in the main thread of a process on a POSIX system - i.e.
+    sequentially, or in the workers of a process pool.
+    """
+    if (not timeout or not hasattr(signal, 'setitimer') or
+            threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+
+    def handler(signum, frame):
+        raise CaseTimeoutError("case timed out after {}s.".format(timeout))
+
+    old_handler = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, old_handler)
+
+
+class ErrorPolicyFn:
+    """Wrap a function to retry it if it raises an error, and then either
+    raise the error or return it as a ``_CaseError`` marker, depending on
+    ``errors``. A case which runs for longer than ``timeout`` is not retried
+    and always returned as a ``_CaseError``, so that a run is never held up
+    by a single stuck case. Picklable, so can be sent to any executor.
+    """
+
+    def __init__(self, fn, errors='raise', retries=0, timeout=None):
+        self.fn = fn
+        self.errors = errors
+        self.retries = retries
+        self.timeout = timeout
+
+    def __call__(self, *args, **kwargs):
+        for _ in range(self.retries + 1):
+            try:
+                with _soft_timeout(self.timeout):
+                    return self.fn(*args, **kwargs)
+            except CaseTimeoutError as e:
+                return _CaseError(e)
+            except Exception as e:
+                error = e
+
+        if self.errors == 'raise':
+            raise error
+
+        return _CaseError(error)
+
+
+def _parse_errors(errors, retries):
+    """Check the error policy and set the default number of retries.
+    """
+    if errors not in ('raise', 'nan', 'retry'):
+        raise ValueError("``errors`` should be one of 'raise', 'nan' or "
+                         "'retry', got {}.".format(errors))
+
+    if retries is None:
+        retries = 3 if errors == 'retry' else 0
+
+    return errors, retries
+
+
+_CASE_ERRORS_WARNING = ("{} of {} cases raised errors, these have been "
+                        "recorded as missing data.")
+
+
+def _missing_result(var_names, var_dims, var_coords, constants):
+    """Generate the missing data for a single case with the structure of the
+    outputs described by ``var_names`` and ``var_dims``, for when there is no
+    successful result to copy it from, or ``None`` if it can't be known.
+    """
+    if var_names == (None,):
+        return None
+
+    coords = {**constants, **var_coords}
+    try:
+        fill = tuple(np.full(tuple(np.size(coords[d]) for d in var_dims[v]),
+                             np.nan) if var_dims[v] else np.nan
+                     for v in var_names)
+    except KeyError:
+        return None
+
+    return fill if len(fill) > 1 else fill[0]
+
+
+def _fill_case_errors(results, shape, fill=None):
+    """Replace any ``_CaseError`` markers in the nested ``results`` with
+    missing data, returning the new results and the nested error messages, or
+    ``None`` if no case failed. The missing data copies the structure of a
+    successful result, or, if every case failed, is ``fill`` if given.
+    """
+    flat = list(flatten(results, len(shape)))
+    messages = [r.error if isinstance(r, _CaseError) else None for r in flat]
+    num_failed = sum(m is not None for m in messages)
+
+    if num_failed == 0:
+        return results, None
+
+    warnings.warn(_CASE_ERRORS_WARNING.format(num_failed, len(flat)))
+
+    good = next((r for r, m in zip(flat, messages) if m is None), None)
+    if good is not None:
+        fill = _nan_like(good)
+    elif fill is None:
+        fill = np.nan
+    flat = [fill if m is not None else r for r, m in zip(flat, messages)]
+
+    return _nest(flat, shape), _nest(messages, shape)
+
+
+class RunProfile:
+    """Timings of a single run, broken down into phases, plus the latency of
+    every individual task. Pass ``profile=True`` to
+    :func:`~xyzpy.combo_runner` or :func:`~xyzpy.combo_runner_to_ds` to
+    create one, or an existing instance to have it filled in.
+
+    The phases recorded, in seconds, are some of:
+
+        - ``'parse'``: parsing the combos, variables and constants,
+        - ``'setup'``: getting the pool of workers ready,
+        - ``'submit'``: submitting every task,
+        - ``'gather'``: waiting for and retrieving the results,
+        - ``'run'``: submitting and gathering combined, when they can't be
+          separated, such as for sequential runs,
+        - ``'collect'``: handling errors and splitting the outputs,
+        - ``'to_ds'``: constructing the dataset.
+
+    Attributes
+    ----------
+    phases : dict[str, float]
+        The time spent in each phase.
+    task_times : list[float]
+        The time spent inside the function for each task, as measured where
+        it ran, in order of combination.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.task_times = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager adding the time spent within it to phase ``name``.
+        """
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (self.phases.get(name, 0.0) +
+                                 perf_counter() - t0)
+
+    @property
+    def total(self):
+        """The total time spent across all phases.
+        """
+        return sum(self.phases.values())
+
+    def task_stats(self):
+        """Summary statistics of the task latencies: the number of tasks,
+        total, mean, min, median and max time.
+        """
+        ts = np.asarray(self.task_times, dtype=float)
+        if ts.size == 0:
+            return {'count': 0}
+        return {'count': ts.size, 'sum': ts.sum(), 'mean': ts.mean(),
+                'min': ts.min(), 'median': np.median(ts), 'max': ts.max()}
+
+    def histogram(self, bins=10, log=True):
+        """Histogram the task latencies.
+
+        Parameters
+        ----------
+        bins : int, optional
+            The number of bins.
+        log : bool, optional
+            Whether to space the bins logarithmically, since latencies often
+            span several orders of magnitude.
+
+        Returns
+        -------
+        counts : numpy.ndarray
+            The number of tasks in each bin.
+        edges : numpy.ndarray
+            The ``bins + 1`` edges of the bins, in seconds.
+        """
+        ts = np.asarray(self.task_times, dtype=float)
+        if log and ts.size and ts.min() > 0:
+            bins = np.geomspace(ts.min(), ts.max(), bins + 1)
+            # rounding can leave the extreme latencies just outside
+            bins[0], bins[-1] = ts.min(), ts.max()
+        return np.histogram(ts, bins=bins)
+
+    def to_attrs(self):
+        """Flatten the profile into a dict of numbers, suitable for storing
+        as the attributes of a dataset, with keys such as ``'profile_parse'``
+        and ``'profile_task_mean'``.
+        """
+        attrs = {'profile_{}'.format(k): v for k, v in self.phases.items()}
+        attrs.update({'profile_task_{}'.format(k): v
+                      for k, v in self.task_stats().items()})
+        return attrs
+
+    def __repr__(self):
+        lines = ["{}(total={:.4g}s)".format(self.__class__.__name__,
+                                            self.total)]
+        for k, v in self.phases.items():
+            lines.append("    {:<8} {:>10.4g}s {:>6.1%}".format(
+                k, v, v / self.total if self.total else 0.0))
+        stats = self.task_stats()
+        if stats['count']:
+            lines.append("    tasks: {count}, mean={mean:.4g}s, "
+                         "median={median:.4g}s, max={max:.4g}s"
+                         .format(**stats))
+        return "\n".join(lines)
+
+
+def _parse_profile(profile):
+    """Create a new ``RunProfile`` if ``profile is True``, else pass any
+    existing one through, or ``None`` if not profiling.
+    """
+    if profile is True:
+        return RunProfile()
+    return profile or None
+
+
+def _phase(profile, name):
+    """Time phase ``name`` if profiling, else do nothing.
+    """
+    if profile is None:
+        return contextlib.nullcontext()
+    return profile.phase(name)
+
+
+class _Timed:
+    """A result, along with the time its function took to run.
+    """
+    __slots__ = ('result', 'seconds')
+
+    def __init__(self, result, seconds):
+        self.result = result
+        self.seconds = seconds
+
+
+class _TimedFn:
+    """Wrap ``fn`` to also time each call, where it runs.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __call__(self, *args, **kwargs):
+        t0 = perf_counter()
+        result = self.fn(*args, **kwargs)
+        return _Timed(result, perf_counter() - t0)
+
+
+def _unwrap_timed(results, shape, profile):
+    """Strip the timings from the nested ``results``, recording them in
+    ``profile`` if given. Cases with no timing, e.g. killed or interrupted,
+    are left.
+    """
+    flat = list(flatten(results, len(shape)))
+    if profile is not None:
+        profile.task_times.extend(r.seconds for r in flat
+                                  if isinstance(r, _Timed))
+    return _nest([r.result if isinstance(r, _Timed) else r for r in flat],
+                 shape)
+
+
 def _combo_runner_executor(fn, combos, constants, n,
-                           ndim, executor, verbosity=1):
+                           ndim, executor, verbosity=1, profile=None,
+                           on_result=None):
     """Submit and retrieve combos from a generic pool-executor.
     """
     with progbar(total=n, disable=verbosity <= 0) as pbar:
@@ -134,16 +658,32 @@ def _combo_runner_executor(fn, combos, constants, n,
         if verbosity >= 2:
             pbar.set_description("Processing with pool")
 
-        futures = nested_submit(fn, combos, constants, executor=executor)
-        getter = default_getter(pbar)
-        return nested_get(futures, ndim, getter)
+        with _phase(profile, 'submit'):
+            futures = nested_submit(fn, combos, constants, executor=executor)
+        with _phase(profile, 'gather'):
+            return _gather_in_completion_order(futures, combos, pbar,
+                                               on_result=on_result)
 
 
 def _combo_runner_parallel(fn, combos, constants, n, ndim,
-                           num_workers, verbosity=1):
+                           num_workers, verbosity=1, timeout=None,
+                           profile=None, on_result=None):
     """Submit and retrieve combos from a ProcessPoolExecutor.
     """
-    executor = loky.get_reusable_executor(num_workers)
+    if timeout:
+        with progbar(total=n, disable=verbosity <= 0) as pbar, \
+                _phase(profile, 'run'):
+            return _gather_with_hard_timeout(fn, combos, constants,
+                                             num_workers, timeout, pbar,
+                                             on_result=on_result)
+
+    with _phase(profile, 'setup'):
+        executor = loky.get_reusable_executor(num_workers)
+
+    def kill_workers():
+        # stop anything already running too, a new executor is created on
+        #     the next call to ``get_reusable_executor``
+        executor.shutdown(wait=False, kill_workers=True)
 
     with progbar(total=n, disable=verbosity <= 0) as pbar:
 
@@ -151,10 +691,164 @@ def _combo_runner_parallel(fn, combos, constants, n, ndim,
             desc = "Processing with {} workers".format(executor._max_workers)
             pbar.set_description(desc)
 
-        futures = nested_submit(fn, combos, constants, executor=executor)
-        for f in loky.as_completed(flatten(futures, ndim)):
-            pbar.update()
-        return nested_get(futures, ndim, default_getter())
+        with _phase(profile, 'submit'):
+            futures = nested_submit(fn, combos, constants, executor=executor)
+        with _phase(profile, 'gather'):
+            return _gather_in_completion_order(futures, combos, pbar,
+                                               on_cancel=kill_workers,
+                                               on_result=on_result)
+
+
+def _is_dask_client(executor):
+    """Check if ``executor`` is a ``dask.distributed.Client``, without having
+    to import ``distributed``.
+    """
+    return (type(executor).__module__.split('.')[0] == 'distributed' and
+            hasattr(executor, 'scatter') and hasattr(executor, 'map'))
+
+
+def _dask_call_case(case, fn, constants):
+    """Evaluate a single case on a dask worker.
+    """
+    return fn(**constants, **case)
+
+
+def _dask_get_output(result, i=None):
+    """Select the ``i``th output, if any, of a result on a dask worker.
+    """
+    return np.asarray(result if i is None else result[i])
+
+
+def _nest(flat, shape):
+    """Turn the flat sequence ``flat`` into nested tuples of ``shape``.
+    """
+    if len(shape) == 1:
+        return tuple(flat)
+    step = len(flat) // shape[0]
+    return tuple(_nest(flat[i * step:(i + 1) * step], shape[1:])
+                 for i in range(shape[0]))
+
+
+def _nested_stack(blocks, shape):
+    """Stack the flat sequence of dask arrays ``blocks`` into a single array
+    with leading dimensions ``shape``.
+    """
+    import dask.array as da
+
+    if len(shape) == 1:
+        return da.stack(blocks)
+    step = len(blocks) // shape[0]
+    return da.stack([_nested_stack(blocks[i * step:(i + 1) * step], shape[1:])
+                     for i in range(shape[0])])
+
+
+def _dask_lazy_results(futures, shape, split):
+    """Assemble the results of ``futures``, left on the cluster, into one
+    lazy dask array per output, using the first result to infer each output's
+    shape and dtype.
+    """
+    import dask
+    import dask.array as da
+
+    first = futures[0].result()
+    outputs = tuple(first) if split else (first,)
+
+    arrays = []
+    for i, x in enumerate(outputs):
+        x = np.asarray(x)
+        get_output = dask.delayed(_dask_get_output, pure=True)
+        blocks = [da.from_delayed(get_output(f, i if split else None),
+                                  shape=x.shape, dtype=x.dtype)
+                  for f in futures]
+        arrays.append(_nested_stack(blocks, shape))
+
+    return tuple(arrays)
+
+
+def _combo_runner_dask(fn, combos, constants, n, ndim, executor,
+                       verbosity=1, lazy=False, split=False, on_result=None,
+                       on_submit=None):
+    """Submit and retrieve combos using a ``dask.distributed.Client``. The
+    function and constants, including any resources, are scattered to the
+    workers once, the cases are submitted in chunks with ``client.map``, and
+    the results gathered in batches as they complete. If any case raises an
+    error, or the run is interrupted, every outstanding case is cancelled.
+    If ``lazy``, the results are instead left on the cluster and returned as
+    lazy dask arrays.
+    ``on_submit(k)`` and ``on_result(i, result)`` are called, if given, as
+    each chunk of ``k`` cases is submitted and each result gathered.
+    """
+    from distributed import as_completed
+
+    client = executor
+    args = tuple(arg for arg, _ in combos)
+    shape = tuple(len(vals) for _, vals in combos)
+    cases = (dict(zip(args, vals))
+             for vals in itertools.product(*(vals for _, vals in combos)))
+
+    # send the function, constants and resources to every worker just once
+    fn = client.scatter(fn, broadcast=True)
+    constants = client.scatter(dict(constants), broadcast=True) \
+        if constants else {}
+
+    if lazy:
+        futures = client.map(_dask_call_case, list(cases), fn=fn,
+                             constants=constants, pure=False)
+        return _dask_lazy_results(futures, shape, split)
+
+    nthreads = sum(client.nthreads().values())
+    chunksize = max(16, 8 * nthreads)
+
+    results = [None] * n
+    index = {}
+    outstanding = {}
+    completed = as_completed(with_results=True)
+    cases = enumerate(cases)
+
+    def submit_chunk():
+        chunk = tuple(itertools.islice(cases, chunksize))
+        if not chunk:
+            return 0
+        ixs, chunk_cases = zip(*chunk)
+        futures = client.map(_dask_call_case, chunk_cases, fn=fn,
+                             constants=constants, pure=False)
+        for i, f in zip(ixs, futures):
+            index[f.key] = i
+            outstanding[f.key] = f
+        completed.update(futures)
+        if on_submit is not None:
+            on_submit(len(futures))
+        return len(futures)
+
+    with progbar(total=n, disable=verbosity <= 0) as pbar:
+
+        if verbosity >= 2:
+            pbar.set_description("Processing with dask")
+
+        try:
+            # keep two chunks in flight so workers are never left idle
+            num_submitted = submit_chunk() + submit_chunk()
+            num_done = 0
+
+            for batch in completed.batches():
+                for future, result in batch:
+                    i = index.pop(future.key)
+                    del outstanding[future.key]
+                    results[i] = result
+                    if on_result is not None:
+                        on_result(i, result)
+                num_done += len(batch)
+                pbar.update(len(batch))
+
+                if num_submitted - num_done < chunksize:
+                    num_submitted += submit_chunk()
+
+        except BaseException:
+            # don't leave the cluster working on a run that has failed
+            client.cancel(list(outstanding.values()))
+            raise
+
+    return _nest(results, shape)
 
 
 def update_upon_eval(fn, pbar, verbosity=1):
@@ -182,36 +876,144 @@ def _combo_runner_sequential(fn, combos, constants, n, ndim, verbosity=1):
         return nested_submit(fn, combos, constants)
 
 
+def _case_at(combos, i):
+    """Get the ``i``th case, in flat order, of ``combos`` as a ``dict``.
+    """
+    ix = np.unravel_index(i, tuple(len(vals) for _, vals in combos))
+    return {arg: vals[j] for (arg, vals), j in zip(combos, ix)}
+
+
+def _report_result(monitor, case, result):
+    """Emit the event for a finished ``case``, given its ``result``, as
+    returned by a ``_TimedFn``.
+    """
+    seconds = None
+    if isinstance(result, _Timed):
+        seconds, result = result.seconds, result.result
+    error = result.error if isinstance(result, _CaseError) else None
+    monitor.task_finished(case, seconds=seconds, error=error)
+
+
+def _num_workers_of(executor, parallel, num_workers):
+    """Work out how many workers will be used, if possible.
+    """
+    if _is_dask_client(executor):
+        return sum(executor.nthreads().values())
+    if executor is not None:
+        return (getattr(executor, '_max_workers', None) or
+                getattr(executor, '_processes', None))
+    if parallel or num_workers:
+        return num_workers or loky.cpu_count()
+    return 1
+
+
 def _combo_runner(fn, combos, constants, split=False, parallel=False,
-                  num_workers=None, executor=None, verbosity=1, pool=None):
-    """Core combo runner, i.e. no parsing of arguments.
+                  num_workers=None, executor=None, verbosity=1, pool=None,
+                  lazy=False, errors='raise', retries=None, timeout=None,
+                  return_errors=False, profile=None, events=None,
+                  events_source='combo_runner', fill=None):
+    """Core combo runner, i.e. no parsing of arguments. If ``return_errors``,
+    also return the nested error message of each case, or ``None`` if none
+    failed. If ``profile`` is a ``RunProfile``, record the timings in it.
+    ``events_source`` names what is running in any events emitted, and
+    ``fill`` is the missing data for failed cases if every case failed.
     """
     executor = _choose_executor_depr_pool(executor, pool)
 
     n = prod(len(x) for _, x in combos)
     ndim = len(combos)
+    shape = tuple(len(x) for _, x in combos)
+
+    errors, retries = _parse_errors(errors, retries)
+    if (errors != 'raise') or retries or timeout:
+        if lazy:
+            raise ValueError("Can't use ``lazy=True`` with an error policy "
+                             "or timeout.")
+        fn = ErrorPolicyFn(fn, errors=errors, retries=retries,
+                           timeout=timeout)
+
+    sink = _parse_events(events)
+    if sink is not None:
+        monitor = _RunMonitor(
+            sink, events_source, total=n, args=[arg for arg, _ in combos],
+            num_workers=_num_workers_of(executor, parallel, num_workers))
+
+        def on_result(i, result):
+            _report_result(monitor, monitor.describe(_case_at(combos, i)),
+                           result)
+    else:
+        monitor = on_result = None
+
+    # time each task where it runs, apart from when left on a cluster
+    timed = ((profile is not None) or (monitor is not None)) and not lazy
+    if timed:
+        fn = _TimedFn(fn)
 
     kws = {'fn': fn, 'combos': combos, 'constants': constants, 'n': n,
            'ndim': ndim, 'verbosity': verbosity}
 
-    # Custom pool supplied
-    if executor is not None:
-        results = _combo_runner_executor(executor=executor, **kws)
-
-    # Else for parallel, by default use a process pool-exceutor
-    elif parallel or num_workers:
-        results = _combo_runner_parallel(num_workers=num_workers, **kws)
-
-    # Evaluate combos sequentially
-    else:
-        results = _combo_runner_sequential(**kws)
-
-    return tuple(unzip(results, ndim)) if split else results
+    if lazy and not _is_dask_client(executor):
+        raise ValueError("``lazy=True`` requires a ``dask.distributed."
+                         "Client`` as the executor.")
+
+    with _monitoring(monitor):
+
+        # Dask distributed client supplied
+        if _is_dask_client(executor):
+            with _phase(profile, 'run'):
+                results = _combo_runner_dask(
+                    executor=executor, lazy=lazy, split=split,
+                    on_result=on_result,
+                    on_submit=None if monitor is None else monitor.submitted,
+                    **kws)
+            if lazy:
+                # already split into an array per output
+                results = results if split else results[0]
+                return (results, None) if return_errors else results
+
+        # Custom pool supplied
+        elif executor is not None:
+            if monitor is not None:
+                monitor.submitted(n)
+            results = _combo_runner_executor(
+                executor=executor, profile=profile, on_result=on_result,
+                **kws)
+
+        # Else for parallel, by default use a process pool-exceutor
+        elif parallel or num_workers:
+            if monitor is not None:
+                monitor.submitted(n)
+            results = _combo_runner_parallel(
+                num_workers=num_workers, timeout=timeout, profile=profile,
+                on_result=on_result, **kws)
+
+        # Evaluate combos sequentially
+        else:
+            if monitor is not None:
+                kws['fn'] = monitor.watch(
+                    fn, functools.partial(_report_result, monitor))
+            with _phase(profile, 'run'):
+                results = _combo_runner_sequential(**kws)
+
+    with _phase(profile, 'collect'):
+        if timed:
+            results = _unwrap_timed(results, shape, profile)
+
+        if (errors != 'raise') or timeout:
+            results, case_errors = _fill_case_errors(results, shape, fill)
+        else:
+            case_errors = None
+
+        if split:
+            results = tuple(unzip(results, ndim))
+
+    return (results, case_errors) if return_errors else results
 
 
 def combo_runner(fn, combos, *, constants=None, split=False,
                  parallel=False, executor=None, num_workers=None,
-                 verbosity=1, pool=None):
+                 verbosity=1, errors='raise', retries=None, timeout=None,
+                 profile=False, events=None, pool=None):
     """Take a function fn and analyse it over all combinations of named
     variables' values, optionally showing progress and in parallel.
 
@@ -232,7 +1034,9 @@ def combo_runner(fn, combos, *, constants=None, split=False,
         Submit all combos to this pool executor. Must have ``submit`` or
         ``apply_async`` methods and API matching either ``concurrent.futures``
         or an ``ipyparallel`` view. Pools from ``multiprocessing.pool`` are
-        also  supported.
+        also  supported. A ``dask.distributed.Client`` is also supported
+        natively: ``constants`` are scattered to the workers once, and the
+        combos submitted in chunks and gathered as they complete.
     num_workers : int, optional
         Explicitly choose how many workers to use, None for automatic.
     verbosity : {0, 1, 2}, optional
@@ -242,21 +1046,73 @@ def combo_runner(fn, combos, *, constants=None, split=False,
         - 1: just progress,
         - 2: all information.
 
+    errors : {'raise', 'nan', 'retry'}, optional
+        What to do if a case raises an error:
+
+        - 'raise': re-raise it, after any ``retries``,
+        - 'nan': record the case as missing data,
+        - 'retry': retry the case, by default 3 times, then record it as
+          missing data.
+
+        See :func:`~xyzpy.combo_runner_to_ds` for also recording the errors.
+    retries : int, optional
+        How many times to retry a case that raises an error.
+    timeout : float, optional
+        The maximum time in seconds for a single case. A case that runs for
+        longer is abandoned and recorded as missing data, whatever
+        ``errors`` is, and the run carries on. Sequentially and in the
+        workers of a process pool a ``CaseTimeoutError`` is raised inside
+        the case. For ``parallel`` runs, a case stuck somewhere that can't be
+        interrupted, e.g. in compiled code, has its worker killed once it
+        has run for twice ``timeout``. Not enforced for thread based
+        executors.
+    profile : bool or RunProfile, optional
+        Record how long each phase of the run took, and the latency of each
+        task, see :class:`~xyzpy.RunProfile`. If ``True``, a new profile is
+        returned along with the results, if a ``RunProfile``, it is filled in
+        instead.
+    events : EventSink, str, callable or sequence of these, optional
+        Where to send structured events for monitoring the run from
+        outside: when it starts and finishes, when each task finishes or
+        fails, and periodic progress with the throughput, ETA, number of
+        pending tasks and worker utilization. A path ending in ``'.prom'``
+        writes the progress in the Prometheus text format, any other path
+        appends JSON lines, and a callable is called with each event ``dict``.
+        See :class:`~xyzpy.EventSink`. Events for each task are emitted as
+        its result is collected, apart from ``'task_started'``, which is
+        only emitted for sequential runs.
+
     Returns
     -------
     data : nested tuple
         Nested tuple containing all combinations of running ``fn``.
+    profile : RunProfile
+        The timings of the run, only if ``profile=True``.
+
+    Notes
+    -----
+    When run in parallel or with an ``executor``, results are collected in
+    the order they complete. If one raises an error, all outstanding work is
+    cancelled before the error is re-raised. If interrupted with
+    ``KeyboardInterrupt``, outstanding work is likewise cancelled but the
+    results so far are returned, with the missing ones filled with NaN.
     """
     executor = _choose_executor_depr_pool(executor, pool)
+    run_profile = _parse_profile(profile)
 
     # Prepare combos
-    combos = _parse_combos(combos)
-    constants = _parse_constants(constants)
+    with _phase(run_profile, 'parse'):
+        combos = _parse_combos(combos)
+        constants = _parse_constants(constants)
 
     # Submit to core combo runner
-    return _combo_runner(fn, combos, constants=constants, split=split,
-                         parallel=parallel, executor=executor,
-                         num_workers=num_workers, verbosity=verbosity)
+    results = _combo_runner(fn, combos, constants=constants, split=split,
+                            parallel=parallel, executor=executor,
+                            num_workers=num_workers, verbosity=verbosity,
+                            errors=errors, retries=retries, timeout=timeout,
+                            profile=run_profile, events=events)
+
+    return (results, run_profile) if profile is True else results
 
 
 def multi_concat(results, dims):
@@ -294,14 +1150,16 @@ def _combos_to_ds(results, combos, var_names, var_dims, var_coords,
         for fn_arg, vals in combos:
             ds[fn_arg] = vals
     else:
-        # create a new dataset using the given arrays and var_names
+        # create a new dataset using the given arrays and var_names,
+        #     leaving any lazy dask arrays as they are
         ds = xr.Dataset(
             coords={
                 **dict(combos),
                 **dict(var_coords)
             },
             data_vars={
-                name: (fn_args + var_dims[name], np.asarray(data))
+                name: (fn_args + var_dims[name],
+                       data if hasattr(data, 'dask') else np.asarray(data))
                 for data, name in zip(results, var_names)
             })
 
@@ -318,6 +1176,169 @@ def _combos_to_ds(results, combos, var_names, var_dims, var_coords,
     return ds
 
 
+_REDUCED_STATS = ('mean', 'var', 'count')
+_REDUCE_CHUNK_ARG = '__reduce_chunk__'
+
+
+class _ReduceOverFn:
+    """Wrap ``fn`` to evaluate it for every combination of ``reduce_combos``
+    in turn, keeping only running statistics of each of its ``num_outputs``
+    outputs, so that memory use is independent of the number of repeats.
+    Returns the mean, variance and count of each output in turn.
+
+    If ``num_chunks > 1``, the repeats are split into that many chunks, and
+    each call only evaluates the chunk given by the extra keyword argument
+    ``_REDUCE_CHUNK_ARG``, so that the repeats can be spread over several
+    tasks and their statistics merged afterwards. The error policy and
+    ``timeout`` are applied to each repeat separately: repeats that time out,
+    or unless ``errors`` is ``'raise'`` raise an error, are left out of the
+    statistics, and a ``_CaseError`` is only returned if every repeat in the
+    chunk failed.
+    """
+
+    def __init__(self, fn, reduce_combos, num_outputs, num_chunks=1,
+                 errors='raise', retries=0, timeout=None):
+        if (errors != 'raise') or retries or timeout:
+            fn = ErrorPolicyFn(fn, errors=errors, retries=retries,
+                               timeout=timeout)
+        self.fn = fn
+        self.reduce_args = tuple(arg for arg, _ in reduce_combos)
+        self.reduce_vals = tuple(vals for _, vals in reduce_combos)
+        self.num_outputs = num_outputs
+        self.num_chunks = num_chunks
+
+    def __call__(self, **kwargs):
+        stats = [RunningArrayStatistics() for _ in range(self.num_outputs)]
+
+        repeats = itertools.product(*self.reduce_vals)
+        chunk = kwargs.pop(_REDUCE_CHUNK_ARG, 0)
+        if self.num_chunks > 1:
+            repeats = itertools.islice(repeats, chunk, None, self.num_chunks)
+
+        error = None
+        for vals in repeats:
+            out = self.fn(**kwargs, **dict(zip(self.reduce_args, vals)))
+            if isinstance(out, _CaseError):
+                error = out
+                continue
+
+            if self.num_outputs == 1:
+                out = (out,)
+            for rs, x in zip(stats, out):
+                rs.update(x)
+
+        if stats[0].count == 0 and error is not None:
+            return error
+
+        return tuple(itertools.chain.from_iterable(
+            (rs.mean, rs.var, rs.count) for rs in stats))
+
+
+def _num_reduce_chunks(reduce_chunks, combos, reduce_combos, executor=None,
+                       parallel=False, num_workers=None, lazy=False, **_):
+    """Work out how many tasks to split the repeats of each case into, by
+    default aiming for a few tasks per worker, given the other runner
+    settings.
+    """
+    num_repeats = prod(len(vals) for _, vals in reduce_combos)
+
+    if reduce_chunks is None:
+        if lazy:
+            return 1
+        num_cases = prod(len(vals) for _, vals in combos)
+        workers = _num_workers_of(executor, parallel, num_workers) or 1
+        reduce_chunks = -(-4 * workers // num_cases) if workers > 1 else 1
+
+    elif lazy and reduce_chunks > 1:
+        raise ValueError("Can't split the repeats into several tasks with "
+                         "``lazy=True``.")
+
+    return max(1, min(reduce_chunks, num_repeats))
+
+
+def _merge_reduce_chunks(results, case_errors, shape, num_chunks,
+                         num_outputs, fill=None):
+    """Merge the statistics computed by each chunk of ``_ReduceOverFn`` for
+    the cases, of ``shape``, in the nested ``results``, which have an extra
+    trailing dimension of size ``num_chunks``. Chunks that failed are left
+    out, and a case is only marked as failed, with the error of its first
+    chunk, if every chunk did, its missing data being ``fill`` if no case
+    succeeded. Returns the merged results and errors.
+    """
+    flat = list(flatten(results, len(shape) + 1))
+    if case_errors is None:
+        messages = [None] * len(flat)
+    else:
+        messages = list(flatten(case_errors, len(shape) + 1))
+
+    merged, merged_errors = [], []
+    for i in range(0, len(flat), num_chunks):
+        stats = [RunningArrayStatistics() for _ in range(num_outputs)]
+        for out, msg in zip(flat[i:i + num_chunks],
+                            messages[i:i + num_chunks]):
+            if msg is not None:
+                continue
+            for j, rs in enumerate(stats):
+                mean, var, count = out[3 * j:3 * j + 3]
+                rs.merge_moments(count, mean, var * count)
+
+        if stats[0].count == 0:
+            merged.append(None)
+            merged_errors.append(messages[i])
+        else:
+            merged.append(tuple(itertools.chain.from_iterable(
+                (rs.mean, rs.var, rs.count) for rs in stats)))
+            merged_errors.append(None)
+
+    good = next((r for r in merged if r is not None), None)
+    if good is not None:
+        fill = _nan_like(good)
+    elif fill is None:
+        fill = (np.nan,) * (3 * num_outputs)
+    merged = [fill if r is None else r for r in merged]
+
+    num_failed = sum(msg is not None for msg in merged_errors)
+    if num_failed == 0:
+        merged_errors = None
+    else:
+        warnings.warn(_CASE_ERRORS_WARNING.format(num_failed, len(merged)))
+        merged_errors = _nest(merged_errors, shape)
+
+    return _nest(merged, shape), merged_errors
+
+
+def _parse_reduce_over(reduce_over, combos, var_names, var_dims):
+    """Split the dimensions to reduce over from ``combos``, and work out the
+    names and dimensions of the reduced statistics variables.
+    """
+    if isinstance(reduce_over, str):
+        reduce_over = (reduce_over,)
+
+    bad = set(reduce_over) - {arg for arg, _ in combos}
+    if bad:
+        raise ValueError("Can only reduce over dimensions in ``combos``, "
+                         "got {}.".format(bad))
+    if var_names == (None,):
+        raise ValueError("Can't use ``reduce_over`` with automatic dataset "
+                         "output (``var_names=None``).")
+
+    reduce_combos = tuple((a, v) for a, v in combos if a in reduce_over)
+    combos = tuple((a, v) for a, v in combos if a not in reduce_over)
+    if not combos:
+        raise ValueError("At least one dimension in ``combos`` should be "
+                         "left after reducing over {}.".format(reduce_over))
+
+    new_var_names = tuple("{}_{}".format(v, stat)
+                          for v in var_names for stat in _REDUCED_STATS)
+    new_var_dims = {}
+    for v in var_names:
+        new_var_dims["{}_mean".format(v)] = var_dims[v]
+        new_var_dims["{}_var".format(v)] = var_dims[v]
+        new_var_dims["{}_count".format(v)] = ()
+
+    return combos, reduce_combos, new_var_names, new_var_dims
+
+
 def combo_runner_to_ds(fn, combos, var_names, *,
                        var_dims=None,
                        var_coords=None,
@@ -325,6 +1346,9 @@ def combo_runner_to_ds(fn, combos, var_names, *,
                        resources=None,
                        attrs=None,
                        parse=True,
+                       reduce_over=None,
+                       reduce_chunks=None,
+                       profile=False,
                        **combo_runner_settings):
     """Evaluate a function over all combinations and output to a Dataset.
 
@@ -351,31 +1375,116 @@ def combo_runner_to_ds(fn, combos, var_names, *,
         Like `constants` but they will not be recorded.
     attrs : mapping, optional
         Any extra attributes to store.
+    reduce_over : str or sequence of str, optional
+        Dimension(s) of ``combos``, such as a ``'seed'`` or ``'repeat'``
+        argument, to reduce over on the fly. For each combination of the
+        other dimensions, ``fn`` is run over these in turn while keeping only
+        running statistics, and each variable ``x`` is replaced by
+        ``x_mean``, ``x_var`` and ``x_count``. Memory use is thus
+        independent of the number of repeats. Any ``errors``, ``retries``
+        and ``timeout`` apply to each repeat rather than to the task running
+        it: repeats that time out, or unless ``errors`` is ``'raise'`` fail,
+        are left out of the statistics. Since a task may run many repeats,
+        the hard timeout of a process pool is not applied.
+    reduce_chunks : int, optional
+        How many tasks to split the repeats of each combination into when
+        using ``reduce_over``, their statistics being merged afterwards. By
+        default chosen to give a few tasks per worker, so that a parallel
+        run with few combinations but many repeats still uses every worker.
+    profile : bool or RunProfile, optional
+        Record how long each phase of the run took, including constructing
+        the dataset, and the latency of each task. The summary is stored in
+        the dataset's attributes as ``'profile_parse'``,
+        ``'profile_task_mean'`` etc. Supply a :class:`~xyzpy.RunProfile`
+        to also keep the full breakdown and every task latency.
     combo_runner_settings
-        Arguments supplied to :func:`~xyzpy.combo_runner`.
+        Arguments supplied to :func:`~xyzpy.combo_runner`. If ``executor`` is
+        a ``dask.distributed.Client``, ``lazy=True`` can also be given to
+        leave the results on the cluster and return a dataset backed by
+        lazy dask arrays. If ``errors`` is not ``'raise'``, the error message
+        of any failed case is recorded in an ``'__error__'`` variable.
 
     Returns
     -------
     ds : xarray.Dataset
         Multidimensional labelled dataset contatining all the results.
     """
-    if parse:
-        combos = _parse_combos(combos)
-        var_names = _parse_var_names(var_names)
-        var_dims = _parse_var_dims(var_dims, var_names=var_names)
-        var_coords = _parse_var_coords(var_coords)
-        constants = _parse_constants(constants)
-        resources = _parse_resources(resources)
+    profile = _parse_profile(profile)
+
+    with _phase(profile, 'parse'):
+        if parse:
+            combos = _parse_combos(combos)
+            var_names = _parse_var_names(var_names)
+            var_dims = _parse_var_dims(var_dims, var_names=var_names)
+            var_coords = _parse_var_coords(var_coords)
+            constants = _parse_constants(constants)
+            resources = _parse_resources(resources)
+
+        num_chunks = 1
+        if reduce_over is not None:
+            num_outputs = len(var_names)
+            combos, reduce_combos, var_names, var_dims = _parse_reduce_over(
+                reduce_over, combos, var_names, var_dims)
+            num_chunks = _num_reduce_chunks(reduce_chunks, combos,
+                                            reduce_combos,
+                                            **combo_runner_settings)
+            # the error policy and timeout apply to each repeat, not to
+            # the chunks of repeats that are the actual tasks
+            errors, retries = _parse_errors(
+                combo_runner_settings.pop('errors', 'raise'),
+                combo_runner_settings.pop('retries', None))
+            timeout = combo_runner_settings.pop('timeout', None)
+            if combo_runner_settings.get('lazy') and (
+                    (errors != 'raise') or retries or timeout):
+                raise ValueError("Can't use ``lazy=True`` with an error "
+                                 "policy or timeout.")
+            fn = _ReduceOverFn(fn, reduce_combos, num_outputs, num_chunks,
+                               errors, retries, timeout)
+
+    fill = _missing_result(var_names, var_dims, var_coords, constants)
 
     # Generate data for all combos
-    results = _combo_runner(fn, combos, constants={**resources, **constants},
-                            split=len(var_names) > 1,
-                            **combo_runner_settings)
+    if (reduce_over is not None) and not combo_runner_settings.get('lazy'):
+        shape = tuple(len(vals) for _, vals in combos)
+        chunks_shape = shape + (num_chunks,)
+        results = _combo_runner(
+            fn, combos + ((_REDUCE_CHUNK_ARG, range(num_chunks)),),
+            constants={**resources, **constants}, profile=profile,
+            **combo_runner_settings)
+
+        with _phase(profile, 'collect'):
+            case_errors = None
+            if (errors != 'raise') or timeout:
+                with warnings.catch_warnings():
+                    # only warn about cases whose every chunk failed
+                    warnings.filterwarnings(
+                        'ignore', message=r'\d+ of \d+ cases raised')
+                    results, case_errors = _fill_case_errors(
+                        results, chunks_shape, fill)
+            results, case_errors = _merge_reduce_chunks(
+                results, case_errors, shape, num_chunks, num_outputs, fill)
+            if len(var_names) > 1:
+                results = tuple(unzip(results, len(shape)))
+    else:
+        results, case_errors = _combo_runner(
+            fn, combos, constants={**resources, **constants},
+            split=len(var_names) > 1, return_errors=True, profile=profile,
+            fill=fill, **combo_runner_settings)
+
     # Convert to dataset
-    ds = _combos_to_ds(results, combos,
-                       var_names=var_names,
-                       var_dims=var_dims,
-                       var_coords=var_coords,
-                       constants=constants,
-                       attrs=attrs)
+    with _phase(profile, 'to_ds'):
+        ds = _combos_to_ds(results, combos,
+                           var_names=var_names,
+                           var_dims=var_dims,
+                           var_coords=var_coords,
+                           constants=constants,
+                           attrs=attrs)
+
+        if case_errors is not None:
+            ds['__error__'] = (tuple(arg for arg, _ in combos),
+                               np.asarray(case_errors, dtype=object))
+
+    if profile is not None:
+        ds.attrs.update(profile.to_attrs())
+
     return ds
@@ -0,0 +1,382 @@
+"""Structured events emitted while running, for monitoring long runs from
+outside, e.g. from batch jobs or dashboards, where a progress bar is no use.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import functools
+import contextlib
+
+
+class EventSink:
+    """Base class for somewhere to send events. Each event is a flat ``dict``
+    with at least the keys:
+
+        - ``'event'``: the kind of event, one of ``'run_started'``,
+          ``'task_started'``, ``'task_finished'``, ``'task_failed'``,
+          ``'progress'``, ``'run_finished'`` or ``'ds_merged'``,
+        - ``'time'``: the unix time it was emitted,
+        - ``'run'``: a unique identifier for the run it belongs to,
+        - ``'source'``: what emitted it, such as ``'combo_runner'``.
+
+    Subclasses should implement :meth:`emit`.
+    """
+
+    def emit(self, event):
+        """Handle a single event.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Flush or finalize anything outstanding.
+        """
+        pass
+
+
+class CallbackSink(EventSink):
+    """Call ``fn(event)`` with every event.
+
+    Parameters
+    ----------
+    fn : callable
+        Called with each event ``dict``.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def emit(self, event):
+        self.fn(event)
+
+
+def _json_default(x):
+    """Convert numpy scalars and arrays, and anything else, to something
+    JSON serializable.
+    """
+    if hasattr(x, 'tolist'):
+        return x.tolist()
+    return str(x)
+
+
+class JSONLinesSink(EventSink):
+    """Append every event as a line of JSON to a file, which can be followed
+    with ``tail -f`` or shipped to a log aggregator. The file is opened for
+    each event, so the sink is cheap to pickle and several processes, such as
+    different ``grow`` jobs, can safely append to the same file.
+
+    Parameters
+    ----------
+    path : str
+        The file to append to.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, event):
+        line = json.dumps(event, default=_json_default)
+        with open(self.path, 'a') as f:
+            f.write(line + "\n")
+
+
+# event field -> (metric name, help)
+_PROMETHEUS_GAUGES = {
+    'total': ('tasks', "Number of tasks in the run."),
+    'done': ('tasks_done', "Number of tasks finished, including failures."),
+    'failed': ('tasks_failed', "Number of tasks that failed."),
+    'pending': ('tasks_pending',
+                "Number of tasks submitted but not yet finished."),
+    'throughput': ('throughput_tasks_per_second',
+                   "Tasks finished per second."),
+    'eta': ('eta_seconds', "Estimated seconds until the run finishes."),
+    'utilization': ('worker_utilization',
+                    "Fraction of the available worker time spent in tasks."),
+    'running': ('running', "Whether the run is still going."),
+}
+
+
+class PrometheusSink(EventSink):
+    """Keep the progress of the latest run of each source, such as
+    ``'combo_runner'`` or ``'grow'``, as gauges in a file in the Prometheus
+    text exposition format, e.g. for the ``node_exporter`` textfile
+    collector. The file is replaced atomically, at most every
+    ``min_interval`` seconds and whenever a run starts or finishes. Series are
+    labelled by source only, so that the number of series stays fixed however
+    many runs a long-lived process performs.
+
+    Parameters
+    ----------
+    path : str
+        The file to write, conventionally ending in ``'.prom'``.
+    prefix : str, optional
+        Prefix for every metric name.
+    min_interval : float, optional
+        The minimum time in seconds between rewriting the file.
+    """
+
+    def __init__(self, path, prefix='xyzpy', min_interval=1.0):
+        self.path = path
+        self.prefix = prefix
+        self.min_interval = min_interval
+        self._gauges = {}
+        self._last_write = 0.0
+
+    def emit(self, event):
+        kind = event['event']
+        if kind not in ('run_started', 'progress', 'run_finished'):
+            return
+
+        labels = (('source', event['source']),)
+        if kind == 'run_started':
+            # forget the previous run of this source entirely
+            self._gauges[labels] = {}
+        gauges = self._gauges.setdefault(labels, {})
+        gauges['running'] = float(kind != 'run_finished')
+        for k in _PROMETHEUS_GAUGES:
+            if event.get(k) is not None and k != 'running':
+                gauges[k] = float(event[k])
+
+        now = time.time()
+        due = now - self._last_write >= self.min_interval
+        if (kind != 'progress') or due:
+            self._write()
+            self._last_write = now
+
+    def close(self):
+        self._write()
+
+    def _write(self):
+        lines = []
+        for k, (name, doc) in _PROMETHEUS_GAUGES.items():
+            name = "{}_{}".format(self.prefix, name)
+            lines.append("# HELP {} {}".format(name, doc))
+            lines.append("# TYPE {} gauge".format(name))
+            for labels, gauges in self._gauges.items():
+                if k in gauges:
+                    label_str = ",".join('{}="{}"'.format(*lb)
+                                         for lb in labels)
+                    lines.append("{}{{{}}} {!r}".format(name, label_str,
+                                                        gauges[k]))
+
+        tmp = "{}.tmp.{}".format(self.path, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+
+class _MultiSink(EventSink):
+    """Send every event to each of several sinks.
+    """
+
+    def __init__(self, sinks):
+        self.sinks = tuple(sinks)
+
+    def emit(self, event):
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def _parse_events(events):
+    """Turn the ``events`` option into an ``EventSink``, or ``None``:
+
+        - an ``EventSink`` is used as is,
+        - a path ending in ``'.prom'`` gives a ``PrometheusSink``,
+        - any other path gives a ``JSONLinesSink``,
+        - a callable gives a ``CallbackSink``,
+        - a sequence of any of the above sends events to all of them.
+    """
+    if events is None or isinstance(events, EventSink):
+        return events
+
+    if isinstance(events, (str, os.PathLike)):
+        events = os.fspath(events)
+        if events.endswith('.prom'):
+            return PrometheusSink(events)
+        return JSONLinesSink(events)
+
+    if callable(events):
+        return CallbackSink(events)
+
+    if isinstance(events, (tuple, list)):
+        return _MultiSink(_parse_events(e) for e in events)
+
+    raise ValueError("``events`` should be an ``EventSink``, a file path, "
+                     "a callable or a sequence of these, got {}."
+                     .format(events))
+
+
+def _new_run_id(source):
+    """Generate a unique identifier for a run of ``source``.
+    """
+    return "{}-{}".format(source, uuid.uuid4().hex[:12])
+
+
+def _make_event(kind, run, source, **fields):
+    """Create an event ``dict`` with the standard fields filled in.
+    """
+    return {'event': kind, 'time': time.time(), 'run': run, 'source': source,
+            'host': socket.gethostname(), 'pid': os.getpid(), **fields}
+
+
+class _RunMonitor:
+    """Track the progress of a single run, emitting events to ``sink``.
+
+    Parameters
+    ----------
+    sink : EventSink
+        Where to send the events.
+    source : str
+        What is running, e.g. ``'combo_runner'``.
+    total : int
+        The total number of tasks.
+    args : sequence of str, optional
+        The names of the arguments that vary between tasks, used to pick out
+        the case from the keyword arguments of each call.
+    num_workers : int, optional
+        The number of workers, to compute their utilization.
+    progress_interval : float, optional
+        The minimum time in seconds between ``'progress'`` events.
+    info : dict, optional
+        Extra fields to add to every event.
+    """
+
+    def __init__(self, sink, source, total, args=(), num_workers=None,
+                 progress_interval=1.0, info=None):
+        self.sink = sink
+        self.total = total
+        self.args = tuple(args)
+        self.num_workers = num_workers
+        self.progress_interval = progress_interval
+        self.source = source
+        self.run = _new_run_id(source)
+        self.info = dict(info or {})
+        self.num_submitted = 0
+        self.num_done = 0
+        self.num_failed = 0
+        self.busy = 0.0
+        self.t0 = None
+        self._last_progress = 0.0
+
+    def emit(self, kind, **fields):
+        self.sink.emit(_make_event(kind, self.run, self.source,
+                                   **self.info, **fields))
+
+    def describe(self, kwargs):
+        """Pick out the case from the keyword arguments of a call, expanding
+        any cases supplied as a single ``dict`` argument.
+        """
+        case = {}
+        for arg in self.args:
+            value = kwargs[arg]
+            if isinstance(value, dict):
+                case.update(value)
+            else:
+                case[arg] = value
+        return case
+
+    def start(self):
+        self.t0 = time.time()
+        self.emit('run_started', total=self.total,
+                  num_workers=self.num_workers)
+
+    def submitted(self, k=1):
+        self.num_submitted += k
+
+    def task_started(self, case):
+        self.emit('task_started', case=case)
+
+    def task_finished(self, case, seconds=None, error=None):
+        """Record that a task has finished, or failed if ``error`` is given.
+        ``seconds`` is the time spent in the task itself, if known.
+        """
+        self.num_done += 1
+        if seconds is not None:
+            self.busy += seconds
+
+        if error is None:
+            self.emit('task_finished', case=case, seconds=seconds)
+        else:
+            self.num_failed += 1
+            self.emit('task_failed', case=case, seconds=seconds, error=error)
+
+        if time.time() - self._last_progress >= self.progress_interval:
+            self.progress()
+
+    def stats(self):
+        """The current throughput, ETA, queue depth and utilization.
+        """
+        elapsed = time.time() - self.t0
+        throughput = self.num_done / elapsed if elapsed > 0 else None
+        remaining = self.total - self.num_done
+        eta = remaining / throughput if throughput else None
+        if self.num_workers and elapsed > 0:
+            utilization = self.busy / (elapsed * self.num_workers)
+        else:
+            utilization = None
+        return {'total': self.total, 'done': self.num_done,
+                'failed': self.num_failed,
+                'pending': max(self.num_submitted - self.num_done, 0),
+                'elapsed': elapsed, 'throughput': throughput, 'eta': eta,
+                'utilization': utilization}
+
+    def progress(self):
+        self._last_progress = time.time()
+        self.emit('progress', **self.stats())
+
+    def finish(self, error=None):
+        """Emit the final progress and finish the run, as ``'failed'`` if
+        ``error`` is given, ``'incomplete'`` if not every task finished, or
+        else ``'completed'``.
+        """
+        self.progress()
+        if error is not None:
+            status = 'failed'
+        elif self.num_done < self.total:
+            status = 'incomplete'
+        else:
+            status = 'completed'
+        fields = {'status': status, **self.stats()}
+        if error is not None:
+            fields['error'] = "{}: {}".format(type(error).__name__, error)
+        self.emit('run_finished', **fields)
+
+    def watch(self, fn, on_result):
+        """Wrap ``fn``, called sequentially with keyword arguments, to emit
+        an event when each task starts, and call ``on_result(case, result)``
+        once it has finished.
+        """
+
+        @functools.wraps(fn)
+        def watched(**kwargs):
+            case = self.describe(kwargs)
+            self.submitted()
+            self.task_started(case)
+            result = fn(**kwargs)
+            on_result(case, result)
+            return result
+
+        return watched
+
+
+@contextlib.contextmanager
+def _monitoring(monitor):
+    """Start the run tracked by ``monitor``, if any, and finish it once the
+    block exits, recording any error raised.
+    """
+    if monitor is None:
+        yield
+        return
+
+    monitor.start()
+    try:
+        yield
+    except BaseException as e:
+        monitor.finish(error=e)
+        raise
+    monitor.finish()
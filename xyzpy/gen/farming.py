@@ -4,6 +4,7 @@
 import os
 import shutil
 import functools
+from time import perf_counter
 
 import numpy as np
 import pandas as pd
@@ -23,6 +24,7 @@ from .prepare import (
 from .combo_runner import combo_runner_to_ds
 from .case_runner import case_runner_to_ds
 from .batch import Crop
+from .events import _parse_events, _make_event, _new_run_id
 from ..manage import load_ds, save_ds, load_df, save_df
 
 
@@ -225,7 +227,10 @@ class Runner(object):
              parent_dir=None,
              save_fn=None,
              batchsize=None,
-             num_batches=None):
+             num_batches=None,
+             target_time=None,
+             serializer=None,
+             checkpoint=False):
         """Return a Crop instance with this runner, from which ``fn``
         will be set, and then combos can be sown, grown, and reaped into the
         ``Runner.last_ds``. See :class:`~xyzpy.Crop`.
@@ -239,7 +244,10 @@ class Runner(object):
                     parent_dir=parent_dir,
                     save_fn=save_fn,
                     batchsize=batchsize,
-                    num_batches=num_batches)
+                    num_batches=num_batches,
+                    target_time=target_time,
+                    serializer=serializer,
+                    checkpoint=checkpoint)
 
     def __repr__(self):
         string = "<xyzpy.Runner>\n"
@@ -352,6 +360,11 @@ class Harvester(object):
     full_ds : xarray.Dataset, optional
         Initialize the Harvester with this dataset as the intitial full
         dataset.
+    events : EventSink, str, callable or sequence of these, optional
+        Where to send structured events, see :func:`~xyzpy.combo_runner`.
+        Used for every harvesting run unless overridden, and a
+        ``'ds_merged'`` event is also emitted each time new data is merged
+        into the full dataset.
 
     Members
     -------
@@ -362,13 +375,17 @@ class Harvester(object):
         Dataset containing just the data from the last harvesting run.
     """
 
+    # default for harvesters pickled, e.g. by a Crop, before events existed
+    events = None
+
     def __init__(self, runner, data_name=None, chunks=None,
-                 engine='h5netcdf', full_ds=None):
+                 engine='h5netcdf', full_ds=None, events=None):
         self.runner = runner
         self.data_name = data_name
         self.engine = engine
         self.chunks = chunks
         self._full_ds = full_ds
+        self.events = _parse_events(events)
 
     @property
     def last_ds(self):
@@ -476,6 +493,8 @@ class Harvester(object):
         engine : str, optional
             Engine to use to save and load datasets.
         """
+        t0 = perf_counter()
+
         if isinstance(new_ds, xr.DataArray):
             new_ds = new_ds.to_dataset()
 
@@ -512,6 +531,14 @@ class Harvester(object):
         else:
             self._full_ds = new_full_ds
 
+        if self.events is not None:
+            self.events.emit(_make_event(
+                'ds_merged', _new_run_id('harvester'), 'harvester',
+                data_name=self.data_name, synced=sync_with_disk,
+                seconds=perf_counter() - t0,
+                new_sizes=dict(new_ds.sizes),
+                full_sizes=dict(new_full_ds.sizes)))
+
     def harvest_combos(self, combos, *,
                        sync=True,
                        overwrite=None,
@@ -543,6 +570,7 @@ class Harvester(object):
         runner_settings
             Supplied to :func:`~xyzpy.combo_runner`.
         """
+        runner_settings.setdefault('events', self.events)
 
         ds = self.runner.run_combos(combos, **runner_settings)
         self.add_ds(ds, sync=sync, overwrite=overwrite,
@@ -580,6 +608,8 @@ class Harvester(object):
         runner_settings
             Supplied to :func:`~xyzpy.case_runner`.
         """
+        runner_settings.setdefault('events', self.events)
+
         ds = self.runner.run_cases(cases, **runner_settings)
         self.add_ds(ds, sync=sync, overwrite=overwrite, chunks=chunks,
                     engine=engine)
@@ -589,7 +619,10 @@ class Harvester(object):
              parent_dir=None,
              save_fn=None,
              batchsize=None,
-             num_batches=None):
+             num_batches=None,
+             target_time=None,
+             serializer=None,
+             checkpoint=False):
         """Return a Crop instance with this Harvester, from which `fn`
         will be set, and then combos can be sown, grown, and reaped into the
         ``Harvester.full_ds``. See :class:`~xyzpy.Crop`.
@@ -603,7 +636,10 @@ class Harvester(object):
                     parent_dir=parent_dir,
                     save_fn=save_fn,
                     batchsize=batchsize,
-                    num_batches=num_batches)
+                    num_batches=num_batches,
+                    target_time=target_time,
+                    serializer=serializer,
+                    checkpoint=checkpoint)
 
     def __repr__(self):
         string = ("<xyzpy.Harvester>\n"
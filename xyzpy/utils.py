@@ -3,10 +3,14 @@
 import functools
 import operator
 import itertools
+import contextlib
+import gc
 import warnings
 import time
 import math
 import sys
+import os
+import threading
 
 import tqdm
 from cytoolz import isiterable
@@ -104,6 +108,51 @@ def _get_fn_name(fn):
         raise ValueError("Could not extract function name from {}".format(fn))
 
 
+def _current_rss():
+    """The current resident set size of this process in bytes, or ``nan`` if
+    this can't be determined on this platform.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:  # pragma: no cover
+        return float('nan')
+
+
+class _RSSSampler:
+    """Context manager that samples the resident set size in a background
+    thread every ``interval`` seconds, recording in ``peak`` the largest
+    increase over the size on entry.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.peak = float('nan')
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._max = max(self._max, _current_rss())
+
+    def __enter__(self):
+        self._stop = threading.Event()
+        self._base = self._max = _current_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._max = max(self._max, _current_rss())
+        self._stop.set()
+        self._thread.join()
+        self.peak = self._max - self._base
+
+
 def progbar(it=None, nb=False, **kwargs):
     """Turn any iterable into a progress bar, with notebook option
 
@@ -149,7 +198,25 @@ class Timer:
         self.t = self.time = self.interval = self.end - self.start
 
 
-def _auto_min_time(timer, min_t=0.2, repeats=5, get='min'):
+def _timing_stats(ts):
+    """Summarize the per-call times ``ts`` of each repeat of a benchmark.
+    """
+    ts = np.asarray(ts, dtype=float)
+    rs = RunningStatistics()
+    rs.update_from_array(ts)
+    q25, q50, q75 = np.percentile(ts, [25, 50, 75])
+    return {'min': ts.min(), 'median': q50, 'iqr': q75 - q25,
+            'mean': rs.mean, 'stderr': rs.err, 'repeats': rs.count}
+
+
+def _auto_min_time(timer, min_t=0.2, repeats=5, get='min', warmup=0):
+    """Time ``timer`` with enough calls per repeat to take at least ``min_t``
+    seconds. Each ``timer.timeit`` call runs the timer's setup once, so the
+    ``warmup`` calls are made in a single one, costing only one extra setup.
+    """
+    if warmup:
+        timer.timeit(warmup)
+
     tot_t = 0
     number = 1
 
@@ -161,15 +228,99 @@ def _auto_min_time(timer, min_t=0.2, repeats=5, get='min'):
 
     results = [tot_t] + timer.repeat(repeats - 1, number)
 
+    if get == 'stats':
+        return _timing_stats([t / number for t in results])
+
     if get == 'mean':
         return sum(results) / (number * len(results))
 
     return min(t / number for t in results)
 
 
+_MEMORY_MEASURES = ('peak_mem', 'allocs', 'peak_rss')
+
+
+def _measure_memory(fn, setup, n, starmap, measure):
+    """Call ``fn`` once, after any ``setup``, measuring its memory usage:
+
+        - ``'peak_mem'``: the peak memory traced by ``tracemalloc``, in
+          bytes, above that before the call,
+        - ``'allocs'``: the number of memory blocks allocated during the call
+          and still live when it returns, including its result, as traced
+          by ``tracemalloc``,
+        - ``'peak_rss'``: the peak increase in resident set size, in bytes,
+          sampled in a background thread, which also catches memory not
+          traced by python.
+
+    """
+    import tracemalloc
+
+    args = () if n is None else (n,)
+    if setup is not None:
+        X = setup(*args)
+        args = X if starmap else (X,)
+
+    gc.collect()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+
+    try:
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        base_mem = tracemalloc.get_traced_memory()[0]
+        if 'allocs' in measure:
+            before = tracemalloc.take_snapshot()
+
+        with _RSSSampler() as rss:
+            result = fn(*args)
+
+        peak_mem = tracemalloc.get_traced_memory()[1] - base_mem
+        if 'allocs' in measure:
+            after = tracemalloc.take_snapshot()
+            allocs = sum(stat.count_diff for stat in
+                         after.compare_to(before, 'filename'))
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    del result
+    results = {'peak_mem': peak_mem, 'peak_rss': rss.peak}
+    if 'allocs' in measure:
+        results['allocs'] = allocs
+
+    return {k: v for k, v in results.items() if k in measure}
+
+
+@contextlib.contextmanager
+def _pinned_to(cpus):
+    """Pin this process to the set of ``cpus`` for the duration of the
+    context, if supported by the platform.
+    """
+    if cpus is None:
+        yield
+        return
+
+    if not hasattr(os, 'sched_setaffinity'):  # pragma: no cover
+        warnings.warn("CPU pinning is not supported on this platform.")
+        yield
+        return
+
+    if isinstance(cpus, int):
+        cpus = (cpus,)
+
+    old_cpus = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cpus)
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, old_cpus)
+
+
 def benchmark(fn, setup=None, n=None, min_t=0.1,
-              repeats=3, get='min', starmap=False):
-    """Benchmark the time it takes to run ``fn``.
+              repeats=3, get='min', starmap=False, warmup=0,
+              enable_gc=False, cpus=None, isolate=False, measure=('time',)):
+    """Benchmark the time, and optionally memory, it takes to run ``fn``.
 
     Parameters
     ----------
@@ -184,15 +335,40 @@ def benchmark(fn, setup=None, n=None, min_t=0.1,
     repeats : int, optional
         Repeat the whole procedure (with setup) this many times in order to
         take the minimum run time.
-    get : {'min', 'mean'}, optional
-        Return the minimum or mean time for each run.
+    get : {'min', 'mean', 'stats'}, optional
+        Return the minimum or mean time for each run, or a dict of the
+        ``'min'``, ``'median'``, interquartile range ``'iqr'``, ``'mean'``
+        and standard error on the mean ``'stderr'`` of the per-call time of
+        each repeat, along with the number of ``'repeats'``.
     starmap : bool, optional
         Unpack the arguments from ``setup``, if given.
+    warmup : int, optional
+        Call ``fn`` this many times before timing, e.g. to trigger any
+        compilation or caching. These calls all share the output of a single
+        extra call to ``setup``, which is not timed.
+    enable_gc : bool, optional
+        Whether to leave garbage collection enabled while timing, by default
+        it is disabled to reduce the noise of collections.
+    cpus : int or sequence of int, optional
+        If given, pin the process to these CPUs while benchmarking, to avoid
+        migration between cores.
+    isolate : bool, optional
+        Whether to run the benchmark in a fresh subprocess, isolated from the
+        memory layout, caches and any threads of this process.
+    measure : sequence of {'time', 'peak_mem', 'allocs', 'peak_rss'}
+        What to measure. As well as the time, ``fn`` can be called once more
+        to measure its peak traced memory ``'peak_mem'`` and number of live
+        memory blocks allocated ``'allocs'``, both using ``tracemalloc``,
+        and its peak increase in resident set size ``'peak_rss'``, sampled
+        in the background - all in bytes.
 
     Returns
     -------
-    t : float
-        The minimum, averaged, time to run ``fn`` in seconds.
+    t : float or dict
+        The minimum, averaged, time to run ``fn`` in seconds, or the timing
+        statistics if ``get='stats'``. If any memory is measured, a dict
+        with these also included, and the time as ``'time'`` unless
+        ``get='stats'``.
 
     Examples
     --------
@@ -213,6 +389,35 @@ def benchmark(fn, setup=None, n=None, min_t=0.1,
     """
     from timeit import Timer
 
+    if isolate:
+        from joblib.externals import loky
+
+        with loky.ProcessPoolExecutor(max_workers=1) as executor:
+            return executor.submit(
+                benchmark, fn, setup=setup, n=n, min_t=min_t,
+                repeats=repeats, get=get, starmap=starmap, warmup=warmup,
+                enable_gc=enable_gc, cpus=cpus, measure=measure).result()
+
+    if isinstance(measure, str):
+        measure = (measure,)
+
+    bad = set(measure) - {'time', *_MEMORY_MEASURES}
+    if bad:
+        raise ValueError("Unknown measures {}, should be from 'time', "
+                         "'peak_mem', 'allocs' and 'peak_rss'.".format(bad))
+
+    memory_measure = tuple(m for m in measure if m in _MEMORY_MEASURES)
+    if memory_measure:
+        t = benchmark(fn, setup=setup, n=n, min_t=min_t, repeats=repeats,
+                      get=get, starmap=starmap, warmup=warmup,
+                      enable_gc=enable_gc, cpus=cpus)
+        with _pinned_to(cpus):
+            results = _measure_memory(fn, setup, n, starmap, memory_measure)
+
+        if get == 'stats':
+            return {**t, **results}
+        return {'time': t, **results}
+
     if n is None:
         n = ""
 
@@ -223,16 +428,180 @@ def benchmark(fn, setup=None, n=None, min_t=0.1,
         setup_str = "X=setup({})".format(n)
         stmnt_str = "fn(*X)" if starmap else "fn(X)"
 
+    if enable_gc:
+        # timeit disables garbage collection by default
+        setup_str = "gc.enable()\n" + setup_str
+
     timer = Timer(setup=setup_str, stmt=stmnt_str,
-                  globals={'setup': setup, 'fn': fn})
+                  globals={'setup': setup, 'fn': fn, 'gc': gc})
+
+    with _pinned_to(cpus):
+        return _auto_min_time(timer, min_t=min_t, repeats=repeats, get=get,
+                              warmup=warmup)
+
+
+_SCALING_MODELS = ('power', 'nlogn')
+
+
+def _scaling_log_model(model, log_n):
+    """The part of ``log(y)`` not fitted for scaling ``model``, i.e.
+    ``log(log(n))`` for an extra factor of ``log(n)``.
+    """
+    if model == 'nlogn':
+        return np.log(log_n)
+    return np.zeros_like(log_n)
+
+
+def _fit_scaling(ns, ys, errs=None, model='auto'):
+    """Fit ``ys = prefactor * ns**exponent``, with an extra factor of
+    ``log(ns)`` if ``model='nlogn'``, by weighted least squares in log-log
+    space. If ``model='auto'`` the model with the smallest residual is
+    chosen. Returns a dict of the fitted parameters, with the standard error
+    on the exponent from the fit covariance.
+    """
+    ns, ys = np.asarray(ns, dtype=float), np.asarray(ys, dtype=float)
+    ok = np.isfinite(ys) & (ys > 0) & (ns > 1)
+    if errs is not None:
+        errs = np.asarray(errs, dtype=float)
+        ok &= np.isfinite(errs)
+    ns, ys = ns[ok], ys[ok]
+
+    nan_fit = {'model': model, 'exponent': np.nan, 'exponent_err': np.nan,
+               'prefactor': np.nan, 'residual': np.nan}
+
+    # need an extra point to estimate the covariance
+    if ns.size < 3:
+        return nan_fit
+
+    if model == 'auto':
+        fits = [_fit_scaling(ns, ys, None if errs is None else errs[ok],
+                             model=m) for m in _SCALING_MODELS]
+        return min(fits, key=lambda f: f['residual'])
+
+    if model not in _SCALING_MODELS:
+        raise ValueError("``model`` should be 'auto' or one of {}, got {}."
+                         "".format(_SCALING_MODELS, model))
+
+    log_n = np.log(ns)
+    log_y = np.log(ys) - _scaling_log_model(model, log_n)
+
+    # relative errors become absolute errors in log space
+    w = None
+    if errs is not None:
+        rel_errs = errs[ok] / ys
+        if np.all(rel_errs > 0):
+            w = 1 / rel_errs
+
+    if ns.size == 3:
+        # too few points for ``cov=True`` to scale the covariance
+        (k, c), (res,), *_ = np.polyfit(log_n, log_y, 1, w=w, full=True)
+        k_err = np.nan
+    else:
+        (k, c), cov = np.polyfit(log_n, log_y, 1, w=w, cov=True)
+        res = np.sum((np.polyval((k, c), log_n) - log_y)**2)
+        k_err = cov[0, 0]**0.5
+
+    return {'model': model, 'exponent': k, 'exponent_err': k_err,
+            'prefactor': np.exp(c), 'residual': res / ns.size}
+
+
+def _scaling_crossover(fit1, fit2, n_max=1e15):
+    """Find the size ``n`` at which the fitted scaling ``fit2`` overtakes
+    ``fit1``, by bisection on the difference of their logs, else ``nan``.
+    """
+    def log_diff(log_n):
+        return sum(sign * (np.log(f['prefactor']) + f['exponent'] * log_n +
+                           _scaling_log_model(f['model'], log_n))
+                   for sign, f in ((1, fit1), (-1, fit2)))
+
+    # scan a grid for a change of sign, then refine
+    log_ns = np.linspace(np.log(2), np.log(n_max), 1001)
+    diffs = log_diff(log_ns)
+    flips = np.flatnonzero(np.diff(np.sign(diffs)) != 0)
+    if (not np.all(np.isfinite(diffs))) or (flips.size == 0):
+        return np.nan
+
+    lo, hi = log_ns[flips[0]], log_ns[flips[0] + 1]
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if np.sign(log_diff(mid)) == np.sign(log_diff(lo)):
+            lo = mid
+        else:
+            hi = mid
+
+    return np.exp((lo + hi) / 2)
+
+
+def environment_fingerprint():
+    """A short string identifying the environment benchmarks are run in: the
+    python implementation and version, platform, machine, number of CPUs and
+    numpy version, followed by a hash of these and the processor and
+    hostname, so that results from different environments aren't confused.
+    """
+    import hashlib
+    import platform
+    import socket
+
+    parts = (platform.python_implementation().lower(),
+             platform.python_version(),
+             sys.platform,
+             platform.machine(),
+             "{}cpu".format(os.cpu_count()),
+             "np{}".format(np.__version__))
+    details = parts + (platform.platform(), platform.processor(),
+                       socket.gethostname())
+    digest = hashlib.sha1("|".join(details).encode()).hexdigest()[:8]
+
+    return "-".join(parts + (digest,))
+
+
+def _auto_version():
+    """The git description of the current working directory, if it is a git
+    repository, else the version of xyzpy itself.
+    """
+    import subprocess
+
+    try:
+        return subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty', '--tags'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        import xyzpy
+        return "xyzpy-{}".format(xyzpy.__version__)
+
+
+def _select_version(ds, version=None, env=None):
+    """Select the results of a single ``version`` and environment ``env``
+    from a dataset of benchmarks, if it has these dimensions. If either is
+    not given, there should be only one with results.
+    """
+    for dim, value in (('version', version), ('env', env)):
+        if dim not in ds.dims:
+            continue
+
+        if value is None:
+            present = ds.dropna(dim, how='all')[dim].values
+            if len(present) != 1:
+                raise ValueError("Results for several {}s {} are present, "
+                                 "specify which to use.".format(dim, present))
+            value = present[0]
+
+        ds = ds.sel({dim: value})
+
+        if dim == 'version' and 'env' in ds.dims:
+            ds = ds.dropna('env', how='all')
 
-    return _auto_min_time(timer, min_t=min_t, repeats=repeats, get=get)
+    return ds
 
 
 class Benchmarker:
     """Compare the performance of various ``kernels``. Internally this makes
     use of :func:`~xyzpy.benchmark`, :func:`~xyzpy.Harvester` and xyzpys
-    plotting functionality.
+    plotting functionality. As well as the ``'time'`` itself, the median,
+    interquartile range and standard error of the per-call time over the
+    repeats are recorded as ``'time_median'``, ``'time_iqr'`` and
+    ``'time_stderr'``, along with any memory measures requested with the
+    ``measure`` option of ``benchmark_opts``.
 
     Parameters
     ----------
@@ -245,10 +614,20 @@ class Benchmarker:
     names : sequence of str, optional
         Alternate names to give the function, else they will be inferred.
     benchmark_opts : dict, optional
-        Supplied to :func:`~xyzpy.benchmark`.
+        Supplied to :func:`~xyzpy.benchmark`, for example ``warmup``,
+        ``enable_gc``, ``cpus`` or ``isolate`` to control noise. Since the
+        spread of times is recorded, a ``repeats`` of at least 5 or so is
+        sensible.
     data_name : str, optional
         If given, the file name the internal harvester will use to store
         results persistently.
+    version : str, optional
+        If given, tag every run with this version as a ``'version'``
+        dimension, along with an ``'env'`` dimension holding the
+        :func:`~xyzpy.environment_fingerprint`, so that the results of
+        different releases or commits can be accumulated and compared with
+        :meth:`~xyzpy.Benchmarker.compare`. If ``'auto'``, the current git
+        commit description is used, falling back to the xyzpy version.
 
     Attributes
     ----------
@@ -259,19 +638,32 @@ class Benchmarker:
     """
 
     def __init__(self, kernels, setup=None, names=None,
-                 benchmark_opts=None, data_name=None):
+                 benchmark_opts=None, data_name=None, version=None):
         import xyzpy as xyz
 
         self.kernels = kernels
         self.names = [f.__name__ for f in kernels] if names is None else names
         self.setup = setup
         self.benchmark_opts = {} if benchmark_opts is None else benchmark_opts
+        self.version = _auto_version() if version == 'auto' else version
+        self.env = None if version is None else environment_fingerprint()
 
-        def time(n, kernel):
-            fn = self.kernels[self.names.index(kernel)]
-            return xyz.benchmark(fn, self.setup, n, **self.benchmark_opts)
+        measure = self.benchmark_opts.get('measure', ('time',))
+        if isinstance(measure, str):
+            measure = (measure,)
+        memory_measure = [m for m in measure if m in _MEMORY_MEASURES]
 
-        self.runner = xyz.Runner(time, ['time'])
+        def time(n, kernel, version=None, env=None):
+            fn = self.kernels[self.names.index(kernel)]
+            opts = {**self.benchmark_opts, 'get': 'stats'}
+            stats = xyz.benchmark(fn, self.setup, n, **opts)
+            return (stats[self.benchmark_opts.get('get', 'min')],
+                    stats['median'], stats['iqr'], stats['stderr'],
+                    *(stats[m] for m in memory_measure))
+
+        self.runner = xyz.Runner(
+            time, ['time', 'time_median', 'time_iqr', 'time_stderr',
+                   *memory_measure])
         self.harvester = xyz.Harvester(self.runner, data_name=data_name)
 
     def run(self, ns, kernels=None, **harvest_opts):
@@ -294,25 +686,254 @@ class Benchmarker:
             kernels = self.names
 
         combos = {'n': ns, 'kernel': kernels}
+        if self.version is not None:
+            combos['version'] = [self.version]
+            combos['env'] = [self.env]
+
         self.harvester.harvest_combos(combos, **harvest_opts)
 
     @property
     def ds(self):
         return self.harvester.full_ds
 
-    def lineplot(self, **plot_opts):
-        """Plot the benchmarking results.
+    def fit_scaling(self, y='time', model='auto', min_n=None, kernels=None,
+                    ds=None, version=None):
+        """Fit the asymptotic scaling of each kernel, either as a power law,
+        ``y ~ prefactor * n**exponent``, or as
+        ``y ~ prefactor * n**exponent * log(n)``, using a weighted least
+        squares fit in log-log space.
+
+        Parameters
+        ----------
+        y : str, optional
+            The variable to fit, e.g. ``'time'`` or ``'peak_mem'``. For
+            ``'time'``, the recorded standard errors are used as weights.
+        model : {'auto', 'power', 'nlogn'}, optional
+            Which model to fit, ``'auto'`` picks the best fitting for each
+            kernel.
+        min_n : int, optional
+            Only fit sizes at least this large, by default the largest half
+            of the sizes, to capture the asymptotic behaviour.
+        kernels : sequence of str, optional
+            Only fit these kernels.
+        ds : xarray.Dataset, optional
+            Fit this dataset rather than the current results, e.g. a baseline.
+        version : str, optional
+            If the results are tagged by version, which to fit. Defaults to
+            this benchmarker's version for its own results.
+
+        Returns
+        -------
+        fit : xarray.Dataset
+            The ``'model'``, ``'exponent'``, its standard error
+            ``'exponent_err'``, ``'prefactor'`` and mean square log
+            ``'residual'`` for each kernel.
+        """
+        import xarray as xr
+
+        if ds is None:
+            ds = self.ds
+            version = self.version if version is None else version
+        ds = _select_version(ds, version)
+
+        if kernels is None:
+            kernels = list(ds['kernel'].values)
+
+        ns = ds['n'].values
+        if min_n is None:
+            min_n = np.sort(ns)[len(ns) // 2] if len(ns) >= 6 else ns.min()
+        ds = ds.sel(n=ns[ns >= min_n])
+
+        fits = []
+        for kernel in kernels:
+            dsk = ds.sel(kernel=kernel)
+            errs = (dsk['time_stderr'].values if
+                    (y == 'time') and ('time_stderr' in dsk) else None)
+            fits.append(_fit_scaling(dsk['n'].values, dsk[y].values, errs,
+                                     model=model))
+
+        return xr.Dataset(
+            {k: ('kernel', [f[k] for f in fits]) for k in fits[0]},
+            coords={'kernel': list(kernels)})
+
+    def crossovers(self, fit=None, **fit_opts):
+        """Predict the sizes at which each kernel's fitted scaling overtakes
+        each other's, i.e. where ``kernel`` becomes more expensive than
+        ``kernel_other`` (``nan`` if never, within a range of sizes up to
+        ``1e15``).
+
+        Parameters
+        ----------
+        fit : xarray.Dataset, optional
+            A fit from :meth:`~xyzpy.Benchmarker.fit_scaling`, else made with
+            ``fit_opts``.
+
+        Returns
+        -------
+        xarray.DataArray
+        """
+        import xarray as xr
+
+        if fit is None:
+            fit = self.fit_scaling(**fit_opts)
+
+        kernels = list(fit['kernel'].values)
+        fits = [{k: fit[k].values[i] for k in fit.data_vars}
+                for i in range(len(kernels))]
+
+        data = [[np.nan if i == j else _scaling_crossover(fi, fj)
+                 for j, fj in enumerate(fits)] for i, fi in enumerate(fits)]
+
+        return xr.DataArray(data, dims=('kernel', 'kernel_other'),
+                            coords={'kernel': kernels,
+                                    'kernel_other': kernels},
+                            name='crossover_n')
+
+    def check_scaling(self, baseline, sigma=2.0, raise_on_regression=False,
+                      **fit_opts):
+        """Compare the fitted scaling exponents with those of a stored
+        ``baseline``, flagging any kernels whose exponent has increased by
+        more than ``sigma`` combined standard errors.
+
+        Parameters
+        ----------
+        baseline : xarray.Dataset or str
+            A previous :attr:`~xyzpy.Benchmarker.ds`, or the file it was
+            saved to, e.g. the ``data_name`` of another ``Benchmarker``.
+        sigma : float, optional
+            How many standard errors of increase to count as a regression.
+        raise_on_regression : bool, optional
+            Raise a ``RuntimeError`` if any kernel has regressed.
+        fit_opts
+            Supplied to :meth:`~xyzpy.Benchmarker.fit_scaling`.
+
+        Returns
+        -------
+        xarray.Dataset
+            The baseline and current exponents and whether each kernel has
+            ``'regressed'``.
+        """
+        if isinstance(baseline, str):
+            from .manage import load_ds
+            baseline = load_ds(baseline)
+
+        kernels = [k for k in self.ds['kernel'].values
+                   if k in baseline['kernel'].values]
+        fit_opts.setdefault('kernels', kernels)
+
+        current = self.fit_scaling(**fit_opts)
+        base = self.fit_scaling(ds=baseline, **fit_opts)
+
+        err = np.hypot(current['exponent_err'].fillna(0.0),
+                       base['exponent_err'].fillna(0.0))
+        change = current['exponent'] - base['exponent']
+
+        result = current[['exponent', 'exponent_err']]
+        result['baseline_exponent'] = base['exponent']
+        result['baseline_exponent_err'] = base['exponent_err']
+        result['regressed'] = change > sigma * err
+
+        if raise_on_regression and result['regressed'].any():
+            bad = list(result['kernel'].values[result['regressed'].values])
+            raise RuntimeError("The scaling of kernels {} has regressed "
+                               "compared to the baseline.".format(bad))
+
+        return result
+
+    def compare(self, baseline, current=None, y='time', threshold=0.05,
+                confidence=0.95, baseline_ds=None, raise_on_regression=False):
+        """Compare the results of two tagged versions, computing the speedup
+        of ``current`` over ``baseline`` for each kernel and size, with
+        confidence intervals from the recorded standard errors.
+
+        Parameters
+        ----------
+        baseline : str or dict
+            The baseline version, or a dict of ``'version'`` and ``'env'`` if
+            the baseline was run in several environments.
+        current : str or dict, optional
+            The current version, by default this benchmarker's version and
+            environment.
+        y : str, optional
+            The measured variable to compare.
+        threshold : float, optional
+            Flag a regression if ``current`` is confidently slower than
+            ``baseline`` by more than this fraction.
+        confidence : float, optional
+            The confidence level of the intervals.
+        baseline_ds : xarray.Dataset or str, optional
+            Take the baseline results from this dataset, or file, rather
+            than the results stored by this benchmarker.
+        raise_on_regression : bool, optional
+            Raise a ``RuntimeError`` if any regression is found, so that e.g.
+            a CI script exits with a nonzero status.
+
+        Returns
+        -------
+        xarray.Dataset
+            The ``'speedup'`` - greater than one if ``current`` is faster -
+            its lower and upper confidence bounds ``'speedup_lo'`` and
+            ``'speedup_hi'``, and whether each kernel and size has
+            ``'regressed'``.
+        """
+        from scipy.stats import norm
+
+        if isinstance(baseline_ds, str):
+            from .manage import load_ds
+            baseline_ds = load_ds(baseline_ds)
+        if baseline_ds is None:
+            baseline_ds = self.ds
+
+        if current is None:
+            current = {'version': self.version, 'env': self.env}
+
+        def select(ds, tag):
+            tag = tag if isinstance(tag, dict) else {'version': tag}
+            return _select_version(ds, **tag)
+
+        base = select(baseline_ds, baseline)
+        curr = select(self.ds, current)
+
+        # relative standard errors combine for a ratio, use log-normal bounds
+        ratio = base[y] / curr[y]
+        err_name = '{}_stderr'.format(y)
+        if (err_name in base) and (err_name in curr):
+            rel_err = ((base[err_name] / base[y])**2 +
+                       (curr[err_name] / curr[y])**2)**0.5
+        else:
+            rel_err = 0.0 * ratio
+        z = norm.ppf((1 + confidence) / 2)
+
+        result = ratio.to_dataset(name='speedup')
+        result['speedup_lo'] = ratio * np.exp(-z * rel_err)
+        result['speedup_hi'] = ratio * np.exp(z * rel_err)
+        result['regressed'] = result['speedup_hi'] < 1 - threshold
+        result.attrs['threshold'] = threshold
+        result.attrs['confidence'] = confidence
+
+        if raise_on_regression and result['regressed'].any():
+            bad = result['regressed'].to_series()
+            raise RuntimeError(
+                "Regressions of more than {:.0%} found for (n, kernel) in "
+                "{}.".format(threshold, list(bad[bad].index)))
+
+        return result
+
+    def lineplot(self, y='time', **plot_opts):
+        """Plot the benchmarking results, ``y`` can be any measured variable
+        such as ``'peak_mem'``.
         """
         plot_opts.setdefault('xlog', True)
         plot_opts.setdefault('ylog', True)
-        return self.ds.xyz.lineplot('n', 'time', 'kernel', **plot_opts)
+        return self.ds.xyz.lineplot('n', y, 'kernel', **plot_opts)
 
-    def ilineplot(self, **plot_opts):
-        """Interactively plot the benchmarking results.
+    def ilineplot(self, y='time', **plot_opts):
+        """Interactively plot the benchmarking results, ``y`` can be any
+        measured variable such as ``'peak_mem'``.
         """
         plot_opts.setdefault('xlog', True)
         plot_opts.setdefault('ylog', True)
-        return self.ds.xyz.ilineplot('n', 'time', 'kernel', **plot_opts)
+        return self.ds.xyz.ilineplot('n', y, 'kernel', **plot_opts)
 
 
 @jitclass([
@@ -357,6 +978,16 @@ class RunningStatistics:  # pragma: no cover
         >>> rs.err  # error on the mean
         0.06972167422092768
 
+    Whole arrays of samples can be added in a single compiled pass, and the
+    statistics of separately gathered samples combined:
+
+        >>> rs.update_from_array(np.random.rand(1000))
+        >>> other = RunningStatistics()
+        >>> other.update_from_array(np.random.rand(1000))
+        >>> rs.merge(other)
+        >>> rs.count
+        2006
+
     """
 
     def __init__(self):
@@ -379,6 +1010,41 @@ class RunningStatistics:  # pragma: no cover
         for x in xs:
             self.update(x)
 
+    def update_from_array(self, xs):
+        """Add all values from the array ``xs``, of any shape, to the
+        statistics. The array's own statistics are computed in a single pass
+        then merged in, which is also more accurate than adding each value.
+        """
+        n = 0
+        mean = 0.0
+        M2 = 0.0
+        for x in xs.ravel():
+            n += 1
+            delta = x - mean
+            mean += delta / n
+            M2 += delta * (x - mean)
+        self.merge_moments(n, mean, M2)
+
+    def merge_moments(self, count, mean, M2):
+        """Merge in the statistics of another set of samples, given as their
+        ``count``, ``mean`` and sum of squared differences from the mean
+        ``M2``, using Chan et al.'s parallel algorithm.
+        """
+        if count == 0:
+            return
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.M2 += M2 + delta**2 * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+
+    def merge(self, other):
+        """Merge the statistics of ``other``, another ``RunningStatistics``
+        instance, into these statistics.
+        """
+        self.merge_moments(other.count, other.mean, other.M2)
+
     def converged(self, rtol, atol):
         """Check if the stats have converged with respect to relative and
         absolute tolerance ``rtol`` and ``atol``.
@@ -410,8 +1076,261 @@ class RunningStatistics:  # pragma: no cover
         return self.err / abs(self.mean)
 
 
+class RunningArrayStatistics:
+    """Running elementwise mean & standard deviation of array valued samples,
+    e.g. a vector of observables computed for each sample, using Welford's
+    algorithm for single samples and Chan et al.'s parallel algorithm for
+    batches and merging.
+
+    Attributes
+    ----------
+    mean : numpy.ndarray
+        Current elementwise mean.
+    count : int
+        Current count.
+    std : numpy.ndarray
+        Current elementwise standard deviation.
+    var : numpy.ndarray
+        Current elementwise variance.
+    err : numpy.ndarray
+        Current elementwise error on the mean.
+    rel_err: numpy.ndarray
+        The current elementwise relative error.
+
+    Examples
+    --------
+
+        >>> rs = RunningArrayStatistics()
+        >>> rs.update(np.array([1.0, 2.0]))
+        >>> rs.update(np.array([3.0, 2.0]))
+        >>> rs.update_from_array(np.array([[2.0, 5.0], [2.0, -1.0]]))
+        >>> rs.mean
+        array([2., 2.])
+
+        >>> rs.var
+        array([0.5, 4.5])
+
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+
+    def update(self, x):
+        """Add a single array sample ``x`` to the statistics.
+        """
+        x = np.asarray(x, dtype=float)
+        self.count += 1
+        delta = x - self.mean
+        self.mean = self.mean + delta / self.count
+        self.M2 = self.M2 + delta * (x - self.mean)
+
+    def update_from_it(self, xs):
+        """Add all array samples from iterable ``xs`` to the statistics.
+        """
+        for x in xs:
+            self.update(x)
+
+    def update_from_array(self, xs, axis=0):
+        """Add a batch of array samples, stacked along ``axis`` of ``xs``, to
+        the statistics in one vectorized step.
+        """
+        xs = np.moveaxis(np.asarray(xs, dtype=float), axis, 0)
+        if xs.shape[0] == 0:
+            return
+        mean = xs.mean(axis=0)
+        M2 = ((xs - mean)**2).sum(axis=0)
+        self.merge_moments(xs.shape[0], mean, M2)
+
+    def merge_moments(self, count, mean, M2):
+        """Merge in the statistics of another set of samples, given as their
+        ``count``, elementwise ``mean`` and elementwise sum of squared
+        differences from the mean ``M2``.
+        """
+        if count == 0:
+            return
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.M2 = self.M2 + M2 + delta**2 * self.count * count / total
+        self.mean = self.mean + delta * count / total
+        self.count = total
+
+    def merge(self, other):
+        """Merge the statistics of ``other``, another
+        ``RunningArrayStatistics`` instance, into these statistics.
+        """
+        self.merge_moments(other.count, other.mean, other.M2)
+
+    def converged(self, rtol, atol):
+        """Check if the stats have converged for every element with respect
+        to relative and absolute tolerance ``rtol`` and ``atol``.
+        """
+        return bool(np.all(self.err < rtol * abs(self.mean) + atol))
+
+    @property
+    def var(self):
+        if self.count == 0:
+            return np.inf
+        return self.M2 / self.count
+
+    @property
+    def std(self):
+        if self.count == 0:
+            return np.inf
+        return self.var**0.5
+
+    @property
+    def err(self):
+        if self.count == 0:
+            return np.inf
+        return self.std / self.count**0.5
+
+    @property
+    def rel_err(self):
+        if self.count == 0:
+            return np.inf
+        return self.err / abs(self.mean)
+
+    def __repr__(self):
+        return "<RunningArrayStatistics(count={}, shape={})>".format(
+            self.count, np.shape(self.mean))
+
+
+def _sample_batch(fn, fn_args, fn_kwargs, n, keep_samples=False):
+    """Draw ``n`` samples from ``fn``, returning their partial statistics
+    ``(count, mean, M2)`` and, if ``keep_samples``, the samples themselves.
+    """
+    xs = [fn(*fn_args, **fn_kwargs) for _ in range(n)]
+    rs = RunningStatistics()
+    rs.update_from_array(np.asarray(xs, dtype=float))
+    return rs.count, rs.mean, rs.M2, (xs if keep_samples else None)
+
+
+def _estimate_from_repeats_sequential(rs, fn, fn_args, fn_kwargs, rtol,
+                                      tol_scale, keep_samples, verbosity,
+                                      min_samples, max_samples):
+    """Sample ``fn`` one value at a time, updating ``rs``, until converged.
+    """
+    repeats = itertools.count()
+
+    if verbosity >= 1:
+        repeats = progbar(repeats)
+        prec = abs(round(math.log10(tol_scale * rtol))) + 1
+
+    xs = []
+
+    try:
+        for i in repeats:
+            x = fn(*fn_args, **fn_kwargs)
+            if keep_samples:
+                xs.append(x)
+            rs.update(x)
+
+            if verbosity >= 2:
+                desc = '{}: mean: {:.{prec}f} err: {:.{prec}f}'
+                repeats.set_description(
+                    desc.format(rs.count, rs.mean, rs.err, prec=prec))
+
+            # need at least min_samples to check convergence
+            if (i > min_samples):
+                if rs.converged(rtol, tol_scale * rtol):
+                    break
+
+            # reached the maximum number of samples to try
+            if i >= max_samples - 1:
+                break
+
+    # allow user to cleanly interupt sampling with keyboard
+    except KeyboardInterrupt:
+        pass
+
+    if verbosity >= 1:
+        repeats.close()
+
+    return xs
+
+
+def _estimate_from_repeats_parallel(rs, fn, fn_args, fn_kwargs, rtol,
+                                    tol_scale, keep_samples, verbosity,
+                                    min_samples, max_samples, num_workers,
+                                    batch_size):
+    """Sample ``fn`` in batches spread over a pool of workers, merging each
+    batch's statistics into ``rs`` as it completes. Once converged, batches
+    not yet started are cancelled, while those already running are waited
+    for and merged too, rather than their samples being thrown away.
+    """
+    import concurrent.futures as cf
+    from joblib.externals import loky
+
+    executor = loky.get_reusable_executor(num_workers)
+    num_in_flight = 2 * executor._max_workers
+    xs = []
+    submitted = 0
+    futures = set()
+
+    def submit():
+        nonlocal submitted
+        n = min(batch_size, max_samples - submitted)
+        if n > 0:
+            futures.add(executor.submit(_sample_batch, fn, fn_args,
+                                        fn_kwargs, n, keep_samples))
+            submitted += n
+
+    def merge(f):
+        count, mean, M2, batch_xs = f.result()
+        rs.merge_moments(count, mean, M2)
+        if keep_samples:
+            xs.extend(batch_xs)
+        pbar.update(count)
+
+    pbar = progbar(disable=verbosity <= 0)
+    if verbosity >= 1:
+        prec = abs(round(math.log10(tol_scale * rtol))) + 1
+
+    try:
+        for _ in range(num_in_flight):
+            submit()
+
+        while futures:
+            done, futures = cf.wait(futures, return_when=cf.FIRST_COMPLETED)
+            for f in done:
+                merge(f)
+
+            if verbosity >= 2:
+                desc = '{}: mean: {:.{prec}f} err: {:.{prec}f}'
+                pbar.set_description(
+                    desc.format(rs.count, rs.mean, rs.err, prec=prec))
+
+            # check for convergence between batches
+            if (rs.count > min_samples and
+                    rs.converged(rtol, tol_scale * rtol)):
+                running = [f for f in futures if not f.cancel()]
+                futures = set()
+                for f in cf.as_completed(running):
+                    merge(f)
+                break
+
+            for _ in range(len(done)):
+                submit()
+
+    # allow user to cleanly interupt sampling with keyboard
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        # any batch already running is short, so just let it finish
+        for f in futures:
+            f.cancel()
+        pbar.close()
+
+    return xs
+
+
 def estimate_from_repeats(fn, *fn_args, rtol=0.02, tol_scale=1.0, get='stats',
                           verbosity=0, min_samples=5, max_samples=1000000,
+                          parallel=False, num_workers=None, batch_size=32,
                           **fn_kwargs):
     """
     Parameters
@@ -439,6 +1358,18 @@ def estimate_from_repeats(fn, *fn_args, rtol=0.02, tol_scale=1.0, get='stats',
         Take at least this many samples before checking for convergence.
     max_samples : int, optional
         Take at maximum this many samples.
+    parallel : bool, optional
+        Draw samples in parallel, using a pool of worker processes. Each
+        worker draws ``batch_size`` samples at a time and the statistics of
+        each batch are merged as they complete. Convergence is checked
+        between batches, and once reached any outstanding batches are
+        cancelled. ``fn`` should seed its own randomness independently, or
+        rely on the fresh state of each worker process.
+    num_workers : int, optional
+        How many workers to use if ``parallel``, None for automatic. Setting
+        this implies ``parallel=True``.
+    batch_size : int, optional
+        How many samples each worker draws at a time if ``parallel``.
     fn_kwargs, optional
         Supplied to ``fn``.
 
@@ -467,42 +1398,20 @@ def estimate_from_repeats(fn, *fn_args, rtol=0.02, tol_scale=1.0, get='stats',
     """
 
     rs = RunningStatistics()
-    repeats = itertools.count()
-
-    if verbosity >= 1:
-        repeats = progbar(repeats)
-        prec = abs(round(math.log10(tol_scale * rtol))) + 1
-
-    if get == 'samples':
-        xs = []
-
-    try:
-        for i in repeats:
-            x = fn(*fn_args, **fn_kwargs)
-            if get == 'samples':
-                xs.append(x)
-            rs.update(x)
-
-            if verbosity >= 2:
-                desc = '{}: mean: {:.{prec}f} err: {:.{prec}f}'
-                repeats.set_description(
-                    desc.format(rs.count, rs.mean, rs.err, prec=prec))
 
-            # need at least min_samples to check convergence
-            if (i > min_samples):
-                if rs.converged(rtol, tol_scale * rtol):
-                    break
-
-            # reached the maximum number of samples to try
-            if i >= max_samples - 1:
-                break
+    if parallel or num_workers:
+        run = functools.partial(_estimate_from_repeats_parallel,
+                                num_workers=num_workers,
+                                batch_size=batch_size)
+    else:
+        run = _estimate_from_repeats_sequential
 
-    # allow user to cleanly interupt sampling with keyboard
-    except KeyboardInterrupt:
-        pass
+    xs = run(rs, fn, fn_args, fn_kwargs, rtol=rtol, tol_scale=tol_scale,
+             keep_samples=get == 'samples', verbosity=verbosity,
+             min_samples=min_samples, max_samples=max_samples)
 
     if verbosity >= 1:
-        repeats.close()
+        prec = abs(round(math.log10(tol_scale * rtol))) + 1
         sys.stderr.flush()
         print("<RunningStatistics(mean={:.{prec}f}, err={:.{prec}f}, "
               "count={})>".format(rs.mean, rs.err, rs.count, prec=prec))